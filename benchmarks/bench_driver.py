@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmark of the PN532 driver stack
+Runs against the PN532_Sim transport, so it works on any Linux host:
+
+    python3 benchmarks/bench_driver.py --iterations 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from pn532.sim import PN532_Sim, SimTag, MIFARE_CLASSIC_1K, NTAG215
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(name, func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    total = sum(samples)
+    print(f"{name:<28} mean {total / len(samples) * 1000:8.2f} ms"
+          f"   p50 {percentile(samples, 0.50) * 1000:8.2f} ms"
+          f"   p95 {percentile(samples, 0.95) * 1000:8.2f} ms"
+          f"   {len(samples) / total:8.1f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--link-baudrate', type=int,
+                        help='negotiate this speed with SetSerialBaudRate before measuring')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='multiplier for simulated latencies, 0 measures driver overhead only')
+    args = parser.parse_args()
+
+    ntag = SimTag(b'\x04\x11\x22\x33\x44\x55\x66', NTAG215)
+    classic = SimTag(b'\x01\x02\x03\x04', MIFARE_CLASSIC_1K)
+    reader = PN532_Sim(baudrate=args.baudrate, time_scale=args.time_scale)
+    reader.SAM_configuration()
+    if args.link_baudrate:
+        args.baudrate = reader.set_serial_baudrate(args.link_baudrate)
+
+    print(f"PN532_Sim at {args.baudrate} baud, time scale {args.time_scale}, "
+          f"{args.iterations} iterations\n")
+    measure('get_firmware_version', reader.get_firmware_version, args.iterations)
+
+    reader.place(ntag)
+    measure('read_passive_target', lambda: reader.read_passive_target(timeout=0.5), args.iterations)
+    measure('target_present (NTAG)', reader.target_present, args.iterations)
+    measure('NTAG215 dump (135 pages)',
+            lambda: [reader.ntag2xx_read_block(page) for page in range(135)],
+            max(1, args.iterations // 10))
+
+    reader.place(classic)
+    uid = reader.read_passive_target(timeout=0.5)
+    measure('target_present (Classic)', reader.target_present, args.iterations)
+    measure('Mifare 1K read_all', lambda: reader.mifare_classic_read_all(uid),
+            max(1, args.iterations // 10))
+
+    counts = ', '.join(f"0x{command:02X}: {count}"
+                       for command, count in sorted(reader.command_counts.items()))
+    print(f"\nFrames written: {reader.frames_written} ({counts})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Replay a PN532 frame capture through the daemon's polling loop
+Captures come from the reader daemon with nfc.capture_dir set, or from the
+simulator with --record. The session is played back at --speed (0: no
+delays, which measures the driver and debouncing alone) and the poll
+times, tag events and frames that differ from the capture are reported:
+
+    python3 benchmarks/bench_replay.py --record /tmp/session.cap --rf-profile fast_presence
+    python3 benchmarks/bench_replay.py /tmp/session.cap --speed 0
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'python'))
+
+from nfc_config import load_config
+from nfc_presence import PresenceTracker
+from nfc_supervisor import configure_reader
+from pn532.capture import FrameRecorder, PN532_Replay, ReplayFinished, capturing
+from pn532.sim import PN532_Sim, SimTag, NTAG215
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def poll(reader, last_seen, scan_interval):
+    """One poll as in nfc_reader_daemon.run_reader"""
+    if last_seen and reader.target_present():
+        return last_seen
+    uid = reader.read_passive_target(timeout=scan_interval)
+    return bytes(uid).hex() if uid else None
+
+
+def reader_config(args):
+    """config.json with the command line overrides; a replay has to send
+    the same configuration as the captured session"""
+    config = load_config()
+    if args.rf_profile:
+        config['nfc']['rf_profile'] = args.rf_profile
+    return config
+
+
+def record(args):
+    """Capture a simulated session with tags placed and removed at random"""
+    recorder = FrameRecorder(args.record)
+    reader = capturing(PN532_Sim)(recorder=recorder, seed=1)
+    configure_reader(reader, reader_config(args))
+    rng = random.Random(1)
+    tags = [SimTag(bytes([0x04, i, 0x22, 0x33, 0x44, 0x55, 0x66]), NTAG215) for i in range(4)]
+    end = time.monotonic() + args.seconds
+    due = time.monotonic()
+    last_seen = None
+    polls = 0
+    while time.monotonic() < end:
+        if time.monotonic() >= due:
+            reader.place(rng.choice(tags) if reader.tag is None else None)
+            due = time.monotonic() + rng.uniform(0.5, 2.0)
+        last_seen = poll(reader, last_seen, args.scan_interval)
+        polls += 1
+        time.sleep(args.min_poll_interval)
+    recorder.close()
+    print(f"Captured {polls} polls in {recorder.records} records to {args.record} "
+          f"({os.path.getsize(args.record)} bytes)")
+
+
+def replay(args):
+    config = reader_config(args)
+    reader = PN532_Replay(args.capture, speed=args.speed)
+    configure_reader(reader, config)
+    tracker = PresenceTracker.from_config(config['nfc'])
+    samples, events = [], []
+    last_seen = None
+    start = time.perf_counter()
+    while True:
+        poll_start = time.perf_counter()
+        try:
+            last_seen = poll(reader, last_seen, args.scan_interval)
+        except ReplayFinished:
+            break
+        except Exception as e:   # pylint: disable=broad-except
+            # The daemon's watchdog would step in here
+            print(f"Poll failed: {type(e).__name__}: {e}")
+            last_seen = None
+            continue
+        samples.append(time.perf_counter() - poll_start)
+        # Debounce on the captured clock, so events do not depend on --speed
+        event = tracker.update(last_seen, now=reader.position)
+        if event:
+            events.append(event.kind)
+    wall = time.perf_counter() - start
+    captured = reader.duration
+
+    print(f"Replayed {args.capture} at speed {args.speed or 'unlimited'}")
+    print(f"  captured session     {captured:8.2f} s")
+    print(f"  replay               {wall:8.2f} s")
+    if samples:
+        print(f"  polls                {len(samples):8d}")
+        print(f"  poll time            p50 {percentile(samples, 0.50) * 1000:8.3f} ms"
+              f"   p95 {percentile(samples, 0.95) * 1000:8.3f} ms")
+    print(f"  events               {len(events):8d} "
+          f"({events.count('PLACED')} placed, {events.count('REMOVED')} removed, "
+          f"{events.count('SWAPPED')} swapped)")
+    print(f"  frame mismatches     {reader.mismatches:8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('capture', nargs='?', help='capture file to replay')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='1 replays in real time, 0 without delays')
+    parser.add_argument('--record', metavar='PATH',
+                        help='capture a simulated session to PATH instead of replaying')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rf-profile',
+                        help="as nfc.rf_profile (default: config.json's); must match the capture")
+    parser.add_argument('--scan-interval', type=float, default=0.5)
+    parser.add_argument('--min-poll-interval', type=float, default=0.05)
+    args = parser.parse_args()
+    if args.record:
+        record(args)
+    elif args.capture:
+        replay(args)
+    else:
+        parser.error('give a capture file, or --record PATH')
+
+
+if __name__ == '__main__':
+    main()
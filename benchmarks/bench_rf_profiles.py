@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Detection latency of the RF profiles
+Polls like nfc_reader_daemon.py (presence check while a tag is known, full
+detection otherwise) and measures, per RF profile, how long an empty poll
+takes and how long it takes to notice a tag being placed and removed.
+Runs against PN532_Sim, or a real reader with --uart:
+
+    python3 benchmarks/bench_rf_profiles.py --iterations 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from pn532.pn532 import RF_PROFILES
+from pn532.sim import PN532_Sim, SimTag, MIFARE_CLASSIC_1K, NTAG215
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(name, samples):
+    print(f"  {name:<24} mean {sum(samples) / len(samples) * 1000:8.1f} ms"
+          f"   p50 {percentile(samples, 0.50) * 1000:8.1f} ms"
+          f"   p95 {percentile(samples, 0.95) * 1000:8.1f} ms")
+
+
+class Poller:
+    """The daemon's polling loop, one poll per call"""
+
+    def __init__(self, reader, scan_interval, min_poll_interval):
+        self.reader = reader
+        self.scan_interval = scan_interval
+        self.min_poll_interval = min_poll_interval
+        self.last_seen = None
+        self.started = 0.0
+
+    def poll(self):
+        pause = self.started + self.min_poll_interval - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self.started = time.monotonic()
+        if self.last_seen and self.reader.target_present():
+            return self.last_seen
+        uid = self.reader.read_passive_target(timeout=self.scan_interval)
+        self.last_seen = bytes(uid) if uid else None
+        return self.last_seen
+
+
+def wait_for(poller, expected, since):
+    while poller.poll() != expected:
+        pass
+    return time.monotonic() - since
+
+
+def bench_simulated(profile, tag, args):
+    reader = PN532_Sim(time_scale=1.0)
+    reader.SAM_configuration()
+    reader.rf_profile(profile)
+    poller = Poller(reader, args.scan_interval, args.min_poll_interval)
+    rng = random.Random(1)
+
+    empty = []
+    for _ in range(args.iterations):
+        start = time.monotonic()
+        reader.read_passive_target(timeout=args.scan_interval)
+        empty.append(time.monotonic() - start)
+
+    placed, removed = [], []
+    for _ in range(args.iterations):
+        delay = rng.uniform(0, args.max_delay)
+        reader.schedule(delay, tag)
+        placed.append(wait_for(poller, tag.uid, time.monotonic() + delay))
+        delay = rng.uniform(0, args.max_delay)
+        reader.schedule(delay, None)
+        removed.append(wait_for(poller, None, time.monotonic() + delay))
+    return empty, placed, removed
+
+
+def bench_hardware(profile, args):
+    from pn532 import PN532_UART
+
+    reader = PN532_UART(reset=args.reset_pin)
+    reader.SAM_configuration()
+    reader.rf_profile(profile)
+    poller = Poller(reader, args.scan_interval, args.min_poll_interval)
+
+    empty = []
+    input(f"[{profile}] Clear the reader and press Enter")
+    for _ in range(args.iterations):
+        start = time.monotonic()
+        reader.read_passive_target(timeout=args.scan_interval)
+        empty.append(time.monotonic() - start)
+
+    placed, removed = [], []
+    for i in range(args.iterations):
+        input(f"[{profile}] {i + 1}/{args.iterations}: press Enter while placing a tag")
+        start = time.monotonic()
+        uid = None
+        while uid is None:
+            uid = poller.poll()
+        placed.append(time.monotonic() - start)
+        input(f"[{profile}] press Enter while removing the tag")
+        removed.append(wait_for(poller, None, time.monotonic()))
+    return empty, placed, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--profiles', nargs='+', default=sorted(RF_PROFILES))
+    parser.add_argument('--scan-interval', type=float, default=0.5,
+                        help='read_passive_target timeout, as nfc.scan_interval')
+    parser.add_argument('--min-poll-interval', type=float, default=0.05,
+                        help='as nfc.min_poll_interval')
+    parser.add_argument('--max-delay', type=float, default=0.3,
+                        help='simulated tags are placed/removed at a random point up to this many seconds ahead')
+    parser.add_argument('--uart', action='store_true',
+                        help='measure a real PN532 on the UART instead of the simulator (interactive)')
+    parser.add_argument('--reset-pin', type=int, default=20)
+    args = parser.parse_args()
+
+    tags = [('NTAG215', SimTag(b'\x04\x11\x22\x33\x44\x55\x66', NTAG215)),
+            ('Mifare Classic', SimTag(b'\x01\x02\x03\x04', MIFARE_CLASSIC_1K))]
+    for profile in args.profiles:
+        if args.uart:
+            print(f"\n{profile} (hardware)")
+            empty, placed, removed = bench_hardware(profile, args)
+            report('empty poll', empty)
+            report('placement noticed', placed)
+            report('removal noticed', removed)
+            continue
+        for tag_name, tag in tags:
+            print(f"\n{profile}, {tag_name} (simulated)")
+            empty, placed, removed = bench_simulated(profile, tag, args)
+            report('empty poll', empty)
+            report('placement noticed', placed)
+            report('removal noticed', removed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the display and management servers
+Keeps one persistent (keep-alive) connection per worker and reports
+requests/s and tail latency per path:
+
+    python3 benchmarks/load_test.py --port 8080 --concurrency 16 --duration 10 \
+        /api/nfc_status /content/test1.html
+"""
+
+import argparse
+import http.client
+import threading
+import time
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def worker(host, port, paths, deadline, results, errors, lock):
+    latencies = {path: [] for path in paths}
+    failures = 0
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                failures += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            failures += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies[path].append(time.perf_counter() - start)
+    connection.close()
+    with lock:
+        for path, samples in latencies.items():
+            results[path].extend(samples)
+        errors[0] += failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['/api/nfc_status'])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {path: [] for path in args.paths}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker,
+                                args=(args.host, args.port, args.paths, deadline,
+                                      results, errors, lock))
+               for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{args.concurrency} connections, {args.duration:.0f}s, {errors[0]} errors\n")
+    print(f"{'path':<32} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path, samples in results.items():
+        if not samples:
+            print(f"{path:<32} {'-':>9}")
+            continue
+        print(f"{path:<32} {len(samples) / args.duration:9.1f}"
+              f" {percentile(samples, 0.50) * 1000:9.2f}"
+              f" {percentile(samples, 0.95) * 1000:9.2f}"
+              f" {percentile(samples, 0.99) * 1000:9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,11 +13,11 @@ else
 fi
 
 # Check if NFC player is running
-if pgrep -f "nfc_player.py" > /dev/null; then
-    echo "✓ NFC Player: RUNNING"
-    echo "  PID(s): $(pgrep -f 'nfc_player.py')"
+if pgrep -f "nfc_reader_daemon.py" > /dev/null; then
+    echo "✓ NFC Reader Daemon: RUNNING"
+    echo "  PID(s): $(pgrep -f 'nfc_reader_daemon.py')"
 else
-    echo "✗ NFC Player: NOT RUNNING"
+    echo "✗ NFC Reader Daemon: NOT RUNNING"
 fi
 
 # Check if port 5000 is in use
@@ -43,6 +43,6 @@ echo ""
 echo "========================================="
 echo "To start missing components:"
 echo "  Web Server only: python3 nfc_web_server.py"
-echo "  NFC Player only: python3 nfc_player.py"
+echo "  NFC Reader Daemon only: python3 nfc_reader_daemon.py"
 echo "  Both at once:    ./start_both.sh"
 echo "========================================="
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Catalog of the HTML content files
+Indexes the html_content directory once and then follows changes, through
+inotify where the platform has it and by polling file stats otherwise, so
+listing the content never touches the (possibly slow) storage.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# name: file name relative to the content directory
+# title: text of the <title> element, '' if none
+# size/mtime: from stat; sha256: hex digest of the contents
+# models: referenced 3D models (.gltf, .glb, ...); scripts: <script src=...>
+ContentEntry = namedtuple('ContentEntry',
+                          ['name', 'title', 'size', 'mtime', 'sha256', 'models', 'scripts'])
+
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+SCRIPT_RE = re.compile(rb'<script[^>]+src\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+MODEL_RE = re.compile(rb'["\']([^"\'\s]+\.(?:gltf|glb|obj|fbx|stl|usdz))["\']', re.IGNORECASE)
+
+# pylint: disable=bad-whitespace
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_CLOEXEC     = 0o2000000
+# pylint: enable=bad-whitespace
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def index_file(path, name):
+    """Build the ContentEntry of one file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+        stat = os.fstat(f.fileno())
+    title = TITLE_RE.search(data)
+    return ContentEntry(
+        name=name,
+        title=title.group(1).decode('utf-8', 'replace').strip() if title else '',
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        sha256=hashlib.sha256(data).hexdigest(),
+        models=sorted({m.decode('utf-8', 'replace') for m in MODEL_RE.findall(data)}),
+        scripts=[s.decode('utf-8', 'replace') for s in SCRIPT_RE.findall(data)])
+
+
+class _Inotify:
+    """Minimal inotify binding through ctypes; raises OSError where
+    inotify is not available"""
+
+    def __init__(self, path, mask):
+        name = ctypes.util.find_library('c')
+        try:
+            libc = ctypes.CDLL(name or 'libc.so.6', use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.fd = init(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f'inotify_add_watch failed for {path}')
+
+    def read(self):
+        """Block until events arrive; returns [(mask, name)]"""
+        data = os.read(self.fd, 65536)
+        events = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ContentCatalog:
+    """In-memory index of the *.html files in `root`.
+
+    start() indexes the directory once and starts a background thread that
+    keeps the index current: with inotify, only files that were written,
+    moved or deleted are re-read; without it, the directory is re-scanned
+    every poll_interval seconds and only files whose size or mtime changed
+    are re-read.
+    """
+
+    def __init__(self, root, extension='.html', poll_interval=5.0):
+        self.root = root
+        self.extension = extension
+        self.poll_interval = poll_interval
+        # 'inotify' or 'poll', once started
+        self.watcher = None
+        self._entries = {}
+        self._sorted = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.rescan()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def query(self, search=None, model=None, offset=0, limit=100):
+        """(total, entries) of the files matching `search` (in the name or
+        title, case insensitive) and `model` (a referenced model path
+        containing it), sorted by name, from offset on, at most limit"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._entries.values())
+            entries = self._sorted
+        if search:
+            search = search.lower()
+            entries = [e for e in entries
+                       if search in e.name.lower() or search in e.title.lower()]
+        if model:
+            entries = [e for e in entries if any(model in m for m in e.models)]
+        return len(entries), entries[offset:offset + limit]
+
+    def rescan(self):
+        """Bring the whole index up to date, re-reading only files whose
+        size or mtime changed"""
+        try:
+            with os.scandir(self.root) as it:
+                found = {entry.name: entry.stat() for entry in it
+                         if entry.name.endswith(self.extension) and entry.is_file()}
+        except OSError:
+            found = {}
+        for name in set(self._entries) - set(found):
+            self._remove(name)
+        for name, stat in found.items():
+            entry = self._entries.get(name)
+            if entry is None or entry.size != stat.st_size or entry.mtime != stat.st_mtime:
+                self._update(name)
+
+    def _update(self, name):
+        try:
+            entry = index_file(os.path.join(self.root, name), name)
+        except OSError:
+            # Deleted again before it could be read
+            self._remove(name)
+            return
+        with self._lock:
+            self._entries[name] = entry
+            self._sorted = None
+
+    def _remove(self, name):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._sorted = None
+
+    def _run(self):
+        while True:
+            try:
+                inotify = _Inotify(self.root, WATCH_MASK)
+            except OSError:
+                inotify = None
+            if inotify is None:
+                self.watcher = 'poll'
+                time.sleep(self.poll_interval)
+                self.rescan()
+                continue
+            self.watcher = 'inotify'
+            try:
+                # Catch up on anything that changed while not watching
+                self.rescan()
+                self._watch(inotify)
+            finally:
+                inotify.close()
+
+    def _watch(self, inotify):
+        """Apply inotify events until the watch is lost"""
+        while True:
+            for mask, name in inotify.read():
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # The directory itself is gone; watch it again once
+                    # it is back
+                    return
+                if mask & IN_Q_OVERFLOW:
+                    self.rescan()
+                elif not name.endswith(self.extension):
+                    continue
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove(name)
+                elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._update(name)
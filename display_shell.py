@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Display shell - the home base page of the display servers
+The template in web_interface/display.html is rendered once at startup
+from config.json's 'display' section and served from memory with an ETag
+and a precompressed gzip body. Shared by nfc_display.py and
+nfc_display_demo.py (demo=True adds the simulation controls).
+"""
+
+import gzip
+import hashlib
+import os
+
+from flask import Response, request
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'web_interface')
+TEMPLATE_NAME = 'display.html'
+
+# Colours of the home base; 'accent' is the three stop title gradient
+THEMES = {
+    'dark': {
+        'background': '#0a0a0a',
+        'glow': '#1a1a2e',
+        'text': '#ffffff',
+        'accent': ['#667eea', '#764ba2', '#f093fb'],
+        'panel': 'rgba(0,0,0,0.8)'
+    },
+    'light': {
+        'background': '#f4f4f8',
+        'glow': '#ffffff',
+        'text': '#1a1a2e',
+        'accent': ['#4c51bf', '#6b46c1', '#d53f8c'],
+        'panel': 'rgba(255,255,255,0.9)'
+    }
+}
+
+
+def render_shell(display_config, demo=False):
+    """Render the shell to a string. display_config is config['display'];
+    its 'theme' names one of THEMES and 'colors' overrides single entries."""
+    theme = dict(THEMES.get(display_config.get('theme'), THEMES['dark']))
+    theme.update(display_config.get('colors') or {})
+    if demo:
+        prompt = display_config['demo_prompt']
+        idle_status = display_config['demo_status']
+    else:
+        prompt = display_config['prompt']
+        idle_status = display_config['status']
+
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                      autoescape=select_autoescape(['html']))
+    return env.get_template(TEMPLATE_NAME).render(
+        title=display_config['title'],
+        heading=display_config['heading'].split('\n'),
+        prompt=prompt,
+        idle_status=idle_status,
+        theme=theme,
+        demo=demo)
+
+
+class DisplayShell:
+    """The rendered shell with its ETag and gzip body, built once"""
+
+    def __init__(self, display_config, demo=False):
+        self.body = render_shell(display_config, demo).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha1(self.body).hexdigest()[:16]
+
+    def response(self):
+        """Response for the current request: 304 when the browser's copy is
+        current, the gzip body when it is accepted, the plain body otherwise"""
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = Response(self.gzipped, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype='text/html')
+        response.set_etag(self.etag)
+        # Revalidate every load, so a restart with a new config shows up
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -1,7 +1,7 @@
 #!/bin/bash
 
 echo "========================================="
-echo "Setting up NFC Player as System Service"
+echo "Setting up NFC Reader Daemon as System Service"
 echo "========================================="
 
 # Get current user and directory
@@ -18,7 +18,7 @@ After=network.target
 Type=simple
 User=$CURRENT_USER
 WorkingDirectory=$CURRENT_DIR
-ExecStart=/usr/bin/python3 $CURRENT_DIR/nfc_player.py
+ExecStart=/usr/bin/python3 $CURRENT_DIR/nfc_reader_daemon.py
 Restart=always
 RestartSec=10
 StandardOutput=journal
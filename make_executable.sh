@@ -18,7 +18,7 @@ chmod +x start_demo.sh
 # Make Python scripts executable
 echo "Making Python scripts executable..."
 chmod +x nfc_web_server.py
-chmod +x nfc_player.py
+chmod +x nfc_reader_daemon.py
 chmod +x start_nfc_system.py
 chmod +x test_nfc.py
 chmod +x debug_nfc.py
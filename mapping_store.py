@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Versioned NFC to HTML mappings
+The mappings file stays a plain {uid: mapping} JSON object, but the
+management server keeps it in memory with a revision number that increases
+with every insert, update and delete, and a log of the recent changes. A
+client that knows a revision fetches only what changed since, and an
+unchanged collection costs a 304 instead of the whole file.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class MappingStore:
+    """The mappings in path, with revisions.
+
+    Revisions start at the time of loading in milliseconds, so they keep
+    increasing across server restarts and a client never mistakes the
+    revision of an older run for a current one. Changes made to the file by
+    other programs are picked up (and logged as changes) on the next access.
+    The last changelog_size changes are kept for changes_since().
+    """
+
+    def __init__(self, path, changelog_size=1000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._changes = deque(maxlen=changelog_size)
+        self._mappings = {}
+        self._stat = None
+        self.revision = int(time.time() * 1000)
+        # Revision up to which changes_since() cannot answer
+        self._base = self.revision
+        with self._lock:
+            self._mappings = self._read()
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _read(self):
+        self._stat = self._file_stat()
+        if self._stat is None:
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read {self.path}: {e}")
+            return dict(self._mappings)
+
+    def _refresh(self):
+        """Take in changes another program made to the file"""
+        if self._file_stat() == self._stat:
+            return
+        current = self._read()
+        for uid in set(self._mappings) | set(current):
+            if self._mappings.get(uid) != current.get(uid):
+                self._log(uid, current.get(uid))
+        self._mappings = current
+
+    def _log(self, uid, mapping):
+        self.revision += 1
+        if len(self._changes) == self._changes.maxlen:
+            self._base = self._changes[0][0]
+        self._changes.append((self.revision, uid, mapping))
+
+    def _write(self):
+        # Written to a temporary file and renamed, so the display never
+        # reads half a file
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self._mappings, f, indent=2)
+        os.replace(temporary, self.path)
+        self._stat = self._file_stat()
+
+    def __contains__(self, uid):
+        return self.get(uid) is not None
+
+    def get(self, uid):
+        with self._lock:
+            self._refresh()
+            return self._mappings.get(uid)
+
+    def snapshot(self):
+        """(revision, {uid: mapping}) of the current state"""
+        with self._lock:
+            self._refresh()
+            return self.revision, dict(self._mappings)
+
+    def current_revision(self):
+        with self._lock:
+            self._refresh()
+            return self.revision
+
+    def update(self, mappings):
+        """Insert or replace several mappings with one write; returns the
+        new revision"""
+        with self._lock:
+            self._refresh()
+            for uid, mapping in mappings.items():
+                if self._mappings.get(uid) != mapping:
+                    self._mappings[uid] = mapping
+                    self._log(uid, mapping)
+            self._write()
+            return self.revision
+
+    def delete(self, uid):
+        """Remove a mapping; returns the new revision, or None if there was
+        no mapping for uid"""
+        with self._lock:
+            self._refresh()
+            if self._mappings.pop(uid, None) is None:
+                return None
+            self._log(uid, None)
+            self._write()
+            return self.revision
+
+    def changes_since(self, revision):
+        """(current revision, {uid: mapping or None for deleted}) of what
+        changed after revision, or (current revision, None) if the changelog
+        does not reach back that far and the client has to reload"""
+        with self._lock:
+            self._refresh()
+            if revision < self._base or revision > self.revision:
+                return self.revision, None
+            changes = {}
+            for change_revision, uid, mapping in self._changes:
+                if change_revision > revision:
+                    changes[uid] = mapping
+            return self.revision, changes
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+NFC Bridge - serves the PN532 of this host over TCP
+Runs on a pedestal's Pi next to the reader; nfc_reader_daemon.py on the
+display Pi uses it with nfc.interface "tcp" (python/pn532/tcp.py has the
+protocol). The reader is opened from this host's config.json like the
+daemon would, and commands from all connections run one at a time.
+
+Anyone who can connect can write tags and reset the reader, so the bridge
+listens on localhost unless bridge.host says otherwise; on the network,
+set bridge.token and the same nfc.remote_token on the display Pi.
+"""
+
+import argparse
+import hmac
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Get the base directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add the python directory to the path so we can import pn532
+sys.path.append(os.path.join(BASE_DIR, 'python'))
+
+from pn532.pn532 import BusyError
+from nfc_config import CONFIG_FILE, load_config
+from nfc_supervisor import ReaderSupervisor, init_reader
+
+
+class BridgeServer:
+    """TCP server running PN532 commands for remote hosts.
+
+    Each connection is served by its own thread, which answers requests in
+    the order they arrive, so a client can send the next request before
+    the answer to the previous one (pipelining). A lock keeps commands from
+    different connections from interleaving on the reader. With a token,
+    a connection has to authenticate with it before anything else.
+    """
+
+    def __init__(self, supervisor, host='127.0.0.1', port=7532, ready_timeout=5.0, token=None):
+        self.supervisor = supervisor
+        self.host = host
+        self.port = port
+        self.token = token
+        self.ready_timeout = ready_timeout
+        self.connections = 0
+        self._reader_lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen(16)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Serving the NFC reader on {self.host}:{self.port}")
+        return self
+
+    def close(self):
+        if self._server:
+            self._server.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, address = self._server.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn, address), daemon=True).start()
+
+    def _serve(self, conn, address):
+        print(f"Bridge client connected: {address[0]}:{address[1]}")
+        self.connections += 1
+        try:
+            with conn, conn.makefile('r', encoding='utf-8') as stream:
+                authenticated = False
+                for line in stream:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not authenticated:
+                        answer = self.authenticate(request)
+                        authenticated = answer['error'] is None
+                        if request.get('op') == 'auth' or not authenticated:
+                            self._send(conn, answer)
+                            if not authenticated:
+                                print(f"Bridge client {address[0]}:{address[1]} refused: "
+                                      f"{answer['error']['message']}")
+                                break
+                            continue
+                    self._send(conn, self.execute(request))
+        except OSError:
+            pass
+        finally:
+            self.connections -= 1
+        print(f"Bridge client disconnected: {address[0]}:{address[1]}")
+
+    @staticmethod
+    def _send(conn, answer):
+        conn.sendall((json.dumps(answer, separators=(',', ':')) + '\n').encode('utf-8'))
+
+    def authenticate(self, request):
+        """Answer to the first request of a connection: an error unless it
+        is an auth request with the token, or the bridge has no token"""
+        error = None
+        if self.token is not None:
+            token = request.get('token') if request.get('op') == 'auth' else None
+            if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+                error = {'type': 'PermissionError', 'message': 'Bridge token missing or wrong'}
+        return {'id': request.get('id'), 'response': None, 'error': error, 'elapsed': 0.0}
+
+    def execute(self, request):
+        """Run one request on the reader and build its answer"""
+        received = time.perf_counter()
+        response = error = None
+        with self._reader_lock:
+            reader = self.supervisor.wait_ready(self.ready_timeout)
+            try:
+                if reader is None:
+                    raise BusyError(f'NFC reader is {self.supervisor.state}')
+                response = self._run(reader, request)
+            except Exception as e:
+                error = {'type': type(e).__name__, 'message': str(e)}
+                if isinstance(e, OSError):
+                    self.supervisor.reader_lost(e)
+        return {'id': request.get('id'),
+                'response': response.hex() if response is not None else None,
+                'error': error,
+                'elapsed': time.perf_counter() - received}
+
+    def _run(self, reader, request):
+        op = request.get('op')
+        if op == 'call':
+            return reader.call_function(request['command'],
+                                        response_length=request.get('response_length', 0),
+                                        params=bytes.fromhex(request.get('params', '')),
+                                        timeout=request.get('timeout', 1))
+        if op == 'reset':
+            if not reader._reset_pin:
+                raise RuntimeError('The bridge has no reset pin configured')
+            reader._reset(reader._reset_pin)
+        elif op == 'wakeup':
+            reader._wakeup()
+        elif op == 'resync':
+            reader.resync()
+        else:
+            raise ValueError(f'Unknown bridge operation {op!r}')
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the NFC reader of this host over TCP')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file (default: config.json)')
+    parser.add_argument('--host', help="address to listen on (default: config's bridge.host)")
+    parser.add_argument('--port', type=int, help="port to listen on (default: config's bridge.port)")
+    args = parser.parse_args()
+    config = load_config(args.config)
+    if config['nfc']['interface'] == 'tcp':
+        sys.exit("The bridge needs a local reader; nfc.interface must not be 'tcp'")
+
+    print("Initializing NFC reader...")
+    supervisor = ReaderSupervisor(lambda: init_reader(config))
+    supervisor.start()
+    host = args.host or config['bridge']['host']
+    if not config['bridge']['token'] and host not in ('127.0.0.1', 'localhost', '::1'):
+        print(f"Warning: serving the reader on {host} without bridge.token; anyone on "
+              f"the network can send it commands")
+    server = BridgeServer(supervisor, host=host, port=args.port or config['bridge']['port'],
+                          token=config['bridge']['token']).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
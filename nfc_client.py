@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Client side of nfc_reader_daemon.py
+Subscribes to the daemon's Unix socket and keeps the latest tag state, so the
+Flask apps never touch the reader hardware themselves
+"""
+
+import json
+import socket
+import threading
+import time
+
+
+class ReaderClient:
+    """Background subscriber to the reader daemon's event stream.
+
+    Every message from the daemon (a dict with a 'type' key) is passed to
+    on_message. reader_state mirrors the daemon's reader state
+    (initialising/ready/failed). When the connection drops, on_message receives
+    {'type': 'disconnected'} and the client keeps retrying. send() passes a
+    command (such as write_ndef) to the daemon.
+    """
+
+    def __init__(self, socket_path, on_message=None, retry_interval=1.0):
+        self.socket_path = socket_path
+        self.on_message = on_message
+        self.retry_interval = retry_interval
+        self.connected = False
+        self.uid = None
+        # initialising/ready/failed, as reported by the daemon
+        self.reader_state = 'initialising'
+        self.reader_error = None
+        # {'interface', 'baudrate'} of the reader while it is ready
+        self.reader_link = None
+        # Watchdog error counters and recovery times
+        self.health = {}
+        self._thread = None
+        self._sock = None
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def send(self, message):
+        """Send a message to the daemon; False if not connected"""
+        line = (json.dumps(message) + '\n').encode('utf-8')
+        with self._send_lock:
+            if self._sock is None:
+                return False
+            try:
+                self._sock.sendall(line)
+            except OSError:
+                return False
+        return True
+
+    def _run(self):
+        announced = False
+        while True:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                if not announced:
+                    print(f"Waiting for NFC reader daemon on {self.socket_path}...")
+                    announced = True
+                time.sleep(self.retry_interval)
+                continue
+
+            print("Connected to NFC reader daemon")
+            self._sock = sock
+            self.connected = True
+            announced = False
+            try:
+                with sock, sock.makefile('r', encoding='utf-8') as stream:
+                    for line in stream:
+                        try:
+                            message = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._handle(message)
+            except OSError:
+                pass
+
+            print("Lost connection to NFC reader daemon")
+            with self._send_lock:
+                self._sock = None
+            self.connected = False
+            self._handle({'type': 'disconnected'})
+            time.sleep(self.retry_interval)
+
+    def _handle(self, message):
+        if message.get('type') in ('state', 'event'):
+            self.uid = message.get('uid')
+        if message.get('type') in ('state', 'reader'):
+            self.reader_state = message.get('reader', self.reader_state)
+            self.reader_error = message.get('error')
+            self.reader_link = message.get('link')
+        if message.get('type') in ('state', 'health'):
+            self.health = message.get('health') or self.health
+        if message.get('type') == 'disconnected':
+            self.uid = None
+            self.reader_state = 'failed'
+            self.reader_error = 'Lost connection to NFC reader daemon'
+            self.reader_link = None
+        if self.on_message:
+            try:
+                self.on_message(message)
+            except Exception as e:
+                print(f"Error handling reader message: {e}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Configuration loading for the Haptic Collection Media Player
+Reads config.json and fills in defaults for anything that is missing
+"""
+
+import copy
+import json
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(BASE_DIR, 'config.json')
+
+DEFAULT_CONFIG = {
+    'server': {
+        'host': '0.0.0.0',
+        'port': 5000,
+        'display_port': 8080,
+        'debug': False,
+        'mode': 'development',
+        'threads': 32,
+        'connection_limit': 100,
+        'keepalive_timeout': 120
+    },
+    'nfc': {
+        'interface': 'uart',
+        'device': None,
+        'usb_reset_line': 'dtr',
+        'usb_serial_number': None,
+        'remote_host': None,
+        'remote_port': 7532,
+        'remote_token': None,
+        'capture_dir': None,
+        'capture_max_bytes': 52428800,
+        'replay_speed': 1.0,
+        'gpio': 'auto',
+        'gpio_chip': '/dev/gpiochip0',
+        'reset_pin': 20,
+        'cs_pin': 4,
+        'req_pin': 16,
+        'debug': False,
+        'scan_interval': 0.5,
+        'rf_profile': 'default',
+        'baudrate': 115200,
+        'min_poll_interval': 0.05,
+        'place_reads': 1,
+        'place_time_ms': 0,
+        'remove_reads': 2,
+        'remove_time_ms': 500,
+        'socket_path': '/tmp/hcmp_nfc.sock'
+    },
+    'display': {
+        'title': 'Haptic Collection Media Player',
+        'heading': 'Haptic Collection\nMedia Player',
+        'prompt': 'Place an object on the reader to begin',
+        'status': 'Waiting for NFC chip...',
+        'demo_prompt': 'Demo Mode - Click buttons below to simulate NFC chips',
+        'demo_status': 'Click a demo chip button below',
+        'theme': 'dark',
+        'colors': {},
+        'long_poll_timeout': 25,
+        'reader_sockets': []
+    },
+    'bridge': {
+        'host': '127.0.0.1',
+        'port': 7532,
+        'token': None
+    },
+    'catalog': {
+        'poll_interval': 5.0
+    },
+    'mappings': {
+        'changelog_size': 1000
+    },
+    'provisioning': {
+        'ndef_uri': 'urn:hcmp:{object_id}',
+        'long_poll_timeout': 25,
+        'max_events': 500
+    },
+    'journal': {
+        'enabled': True,
+        'path': 'logs/tag_journal.jsonl',
+        'max_bytes': 1048576,
+        'backups': 5,
+        'flush_interval': 1.0
+    },
+    'browser': {
+        'kiosk_mode': True,
+        'browser_command': 'chromium-browser'
+    },
+    'paths': {
+        'html_content': 'html_content',
+        'mappings_file': 'nfc_mappings.json'
+    }
+}
+
+
+def _merge(defaults, overrides):
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _upgrade(config):
+    """Map settings of older config files onto their replacements"""
+    nfc = config.get('nfc')
+    if isinstance(nfc, dict) and 'debounce_time' in nfc and 'remove_time_ms' not in nfc:
+        # debounce_time was in seconds
+        nfc['remove_time_ms'] = nfc['debounce_time'] * 1000
+    return config
+
+
+def resolve_path(path):
+    """Paths in the config are relative to the project directory"""
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def load_config(path=CONFIG_FILE):
+    """Load config.json merged over the defaults. A missing or broken file
+    falls back to the defaults so the servers can always start."""
+    if not os.path.exists(path):
+        return copy.deepcopy(DEFAULT_CONFIG)
+    try:
+        with open(path, 'r') as f:
+            return _merge(DEFAULT_CONFIG, _upgrade(json.load(f)))
+    except (OSError, ValueError) as e:
+        print(f"Could not read {path}: {e}, using defaults")
+        return copy.deepcopy(DEFAULT_CONFIG)
@@ -3,37 +3,37 @@
 NFC Display System - Shows home base and switches to mapped HTML when chip detected
 """
 
-from flask import Flask, render_template_string, jsonify, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, Response
 import json
 import os
-import sys
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
-import threading
 
-# Add the python directory to the path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'python'))
+from nfc_config import load_config
+from nfc_serve import run_app
+from display_shell import DisplayShell
+from nfc_client import ReaderClient
+from nfc_metrics import LatencyMetrics
+from nfc_state import ReaderStateStore
 
-# Initialize NFC reader
-nfc_reader = None
-nfc_available = False
-current_uid = None
-current_html = None
+config = load_config()
 
-print("Initializing NFC Display System...")
-try:
-    import RPi.GPIO as GPIO
-    from pn532 import *
-    
-    nfc_reader = PN532_UART(debug=False, reset=20)
-    ic, ver, rev, support = nfc_reader.get_firmware_version()
-    print(f'Found PN532 with firmware version: {ver}.{rev}')
-    nfc_reader.SAM_configuration()
-    nfc_available = True
-    print("NFC reader initialized successfully!")
-except Exception as e:
-    print(f"Could not initialize NFC reader: {e}")
-    nfc_available = False
+# Home base page, rendered once from config['display']
+display_shell = DisplayShell(config['display'])
+
+# Tag state, fed by the NFC reader daemon
+tag_state = ReaderStateStore()
+mappings = {}
+last_reload = 0
+
+# Latency of every stage between tag placement and content on screen
+metrics = LatencyMetrics()
+# trace id -> {'start': wall clock time of the detecting poll, 'received': ...}
+# filled by the reader client thread, read by the request threads
+pending_traces = OrderedDict()
+traces_lock = threading.Lock()
 
 # Flask app
 app = Flask(__name__)
@@ -45,291 +45,181 @@ def load_mappings():
             return json.load(f)
     return {}
 
-# NFC reading thread
-def nfc_reader_thread():
-    global current_uid, current_html
+def get_mappings():
+    """Mappings, reloaded from disk at most every 10 seconds"""
+    global mappings, last_reload
+    if time.time() - last_reload > 10:
+        with metrics.span('mapping_reload'):
+            mappings = load_mappings()
+        last_reload = time.time()
+    return mappings
+
+def start_trace(trace):
+    """Record the daemon's stage timings of an event and keep the trace open
+    until the browser reports the content as loaded"""
+    received = time.time()
+    metrics.increment('tag_events')
+    stages = trace.get('stages', {})
+    for stage, seconds in stages.items():
+        metrics.observe(stage, seconds)
+    metrics.observe('client_receipt', received - trace['published_at'])
+    with traces_lock:
+        pending_traces[trace['id']] = {
+            'start': trace['published_at'] - sum(stages.values()),
+            'received': time.monotonic(),
+            'served': False
+        }
+        while len(pending_traces) > 64:
+            pending_traces.popitem(last=False)
+
+def aggregate_reader_state():
+    """ready while any reader is ready, else initialising while any is
+    starting, else failed"""
+    states = {client.reader_state for client in reader_clients.values()}
+    for state in ('ready', 'initialising'):
+        if state in states:
+            return state
+    return 'failed'
+
+# Handle messages from the NFC reader daemons. With several readers the
+# display shows the most recently placed tag that is still on its reader.
+# Every reader's client thread calls this; the lock keeps reader_tags and
+# the comparison with the displayed tag consistent between them.
+reader_lock = threading.Lock()
+
+def handle_reader_message(source, message):
+    with reader_lock:
+        apply_reader_message(source, message)
+
+def apply_reader_message(source, message):
+    if message['type'] in ('reader', 'health'):
+        tag_state.update(reader=aggregate_reader_state())
+        return
+    if message['type'] not in ('state', 'event', 'disconnected'):
+        return
     
-    if not nfc_available:
+    reader_uid = message.get('uid')
+    if reader_uid is None:
+        reader_tags.pop(source, None)
+    elif reader_tags.get(source) != reader_uid:
+        reader_tags.pop(source, None)
+        reader_tags[source] = reader_uid
+    uid = next(reversed(reader_tags.values()), None)
+    if uid == tag_state.current.uid:
+        tag_state.update(reader=aggregate_reader_state())
         return
     
-    print("NFC monitoring started...")
-    mappings = load_mappings()
-    last_reload = time.time()
+    trace = None
+    if message.get('trace'):
+        start_trace(message['trace'])
+        trace = message['trace']['id']
     
-    while True:
-        try:
-            # Reload mappings every 10 seconds
-            if time.time() - last_reload > 10:
-                mappings = load_mappings()
-                last_reload = time.time()
-            
-            # Read NFC
-            uid = nfc_reader.read_passive_target(timeout=0.5)
-            
-            if uid:
-                uid_hex = ''.join([format(i, '02x') for i in uid])
-                if uid_hex != current_uid:
-                    current_uid = uid_hex
-                    print(f"Chip detected: {uid_hex}")
-                    
-                    # Check mapping
-                    if uid_hex in mappings:
-                        current_html = mappings[uid_hex]['html_file']
-                        print(f"Mapped to: {current_html}")
-                    else:
-                        current_html = None
-                        print("No mapping found")
-            else:
-                if current_uid:
-                    print("Chip removed")
-                current_uid = None
-                current_html = None
-                
-        except Exception as e:
-            print(f"Error in NFC thread: {e}")
-            time.sleep(1)
-
-# Main display page
-DISPLAY_HTML = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Haptic Collection Media Player</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            background-color: #0a0a0a;
-            color: #ffffff;
-            overflow: hidden;
-            height: 100vh;
-            width: 100vw;
-        }
-        
-        #homeBase {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            height: 100vh;
-            background: radial-gradient(ellipse at center, #1a1a2e 0%, #0a0a0a 100%);
-            animation: fadeIn 0.5s ease-out;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-        
-        .title {
-            font-size: clamp(2rem, 6vw, 4rem);
-            font-weight: 300;
-            letter-spacing: 0.1em;
-            text-transform: uppercase;
-            margin-bottom: 3rem;
-            text-align: center;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
-            background-clip: text;
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            animation: shimmer 3s ease-in-out infinite;
-        }
-        
-        @keyframes shimmer {
-            0%, 100% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-        }
-        
-        .prompt {
-            font-size: 1.5rem;
-            opacity: 0.8;
-            margin-bottom: 4rem;
-            text-align: center;
-        }
-        
-        .nfc-icon {
-            width: 120px;
-            height: 120px;
-            position: relative;
-            animation: pulse 2s ease-in-out infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); opacity: 0.8; }
-            50% { transform: scale(1.1); opacity: 1; }
-        }
-        
-        .nfc-icon svg {
-            width: 100%;
-            height: 100%;
-        }
-        
-        .status {
-            margin-top: 2rem;
-            font-size: 1.1rem;
-            opacity: 0.6;
-        }
-        
-        #contentFrame {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100vw;
-            height: 100vh;
-            border: none;
-            display: none;
-            background: white;
-        }
-        
-        .loading {
-            position: fixed;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            font-size: 1.5rem;
-            display: none;
-            z-index: 1000;
-            background: rgba(0,0,0,0.8);
-            padding: 2rem;
-            border-radius: 10px;
-        }
-        
-        .debug {
-            position: fixed;
-            bottom: 10px;
-            right: 10px;
-            background: rgba(0,0,0,0.8);
-            padding: 10px;
-            border-radius: 5px;
-            font-family: monospace;
-            font-size: 0.8rem;
-            opacity: 0.5;
-        }
-    </style>
-</head>
-<body>
-    <div id="homeBase">
-        <h1 class="title">Haptic Collection<br>Media Player</h1>
-        <p class="prompt">Place an object on the reader to begin</p>
-        <div class="nfc-icon">
-            <svg viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
-                <path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm0 18c-4.41 0-8-3.59-8-8s3.59-8 8-8 8 3.59 8 8-3.59 8-8 8z" fill="currentColor" opacity="0.3"/>
-                <path d="M12 6c-3.31 0-6 2.69-6 6s2.69 6 6 6 6-2.69 6-6-2.69-6-6-6zm0 10c-2.21 0-4-1.79-4-4s1.79-4 4-4 4 1.79 4 4-1.79 4-4 4z" fill="currentColor" opacity="0.5"/>
-                <path d="M12 10c-1.1 0-2 .9-2 2s.9 2 2 2 2-.9 2-2-.9-2-2-2z" fill="currentColor"/>
-                <circle cx="12" cy="12" r="10" stroke="currentColor" stroke-width="1" fill="none" opacity="0.2">
-                    <animate attributeName="r" values="10;12;10" dur="2s" repeatCount="indefinite"/>
-                    <animate attributeName="opacity" values="0.2;0.4;0.2" dur="2s" repeatCount="indefinite"/>
-                </circle>
-            </svg>
-        </div>
-        <p class="status" id="status">Waiting for NFC chip...</p>
-    </div>
+    if uid is None:
+        if tag_state.current.uid:
+            print("Chip removed")
+        tag_state.update(uid=None, html=None, trace=trace, reader=aggregate_reader_state())
+        return
     
-    <iframe id="contentFrame" src=""></iframe>
-    <div class="loading" id="loading">Loading content...</div>
-    <div class="debug" id="debug"></div>
+    print(f"Chip detected: {uid}")
     
-    <script>
-        let currentUID = null;
-        let checkInterval;
-        let isShowingContent = false;
-        
-        async function checkNFC() {
-            try {
-                const response = await fetch('/api/nfc_status');
-                const data = await response.json();
-                
-                document.getElementById('debug').textContent = `NFC: ${data.uid || 'none'} | HTML: ${data.html || 'none'}`;
-                
-                if (data.uid && data.html && data.uid !== currentUID) {
-                    // New chip detected with mapping
-                    currentUID = data.uid;
-                    showContent(data.html);
-                } else if (!data.uid && isShowingContent) {
-                    // Chip removed
-                    currentUID = null;
-                    showHomeBase();
-                } else if (data.uid && !data.html) {
-                    // Unmapped chip
-                    document.getElementById('status').textContent = `Unknown chip: ${data.uid}`;
-                } else if (!data.uid) {
-                    document.getElementById('status').textContent = 'Waiting for NFC chip...';
-                }
-            } catch (error) {
-                console.error('Error checking NFC:', error);
-            }
-        }
-        
-        function showContent(htmlFile) {
-            console.log('Showing content:', htmlFile);
-            isShowingContent = true;
-            document.getElementById('loading').style.display = 'block';
-            document.getElementById('homeBase').style.display = 'none';
-            
-            const iframe = document.getElementById('contentFrame');
-            iframe.src = `/content/${htmlFile}`;
-            iframe.style.display = 'block';
-            
-            iframe.onload = () => {
-                document.getElementById('loading').style.display = 'none';
-            };
-        }
-        
-        function showHomeBase() {
-            console.log('Returning to home base');
-            isShowingContent = false;
-            document.getElementById('homeBase').style.display = 'flex';
-            document.getElementById('contentFrame').style.display = 'none';
-            document.getElementById('contentFrame').src = '';
-            document.getElementById('loading').style.display = 'none';
-        }
-        
-        // Start checking for NFC
-        checkInterval = setInterval(checkNFC, 500);
-        
-        // Handle visibility change to stop/start polling
-        document.addEventListener('visibilitychange', () => {
-            if (document.hidden) {
-                clearInterval(checkInterval);
-            } else {
-                checkInterval = setInterval(checkNFC, 500);
-            }
-        });
-    </script>
-</body>
-</html>
-'''
+    # Check mapping
+    with metrics.span('mapping_lookup'):
+        mapping = get_mappings().get(uid)
+    if mapping:
+        html = mapping['html_file']
+        print(f"Mapped to: {html}")
+    else:
+        html = None
+        print("No mapping found")
+    tag_state.update(uid=uid, html=html, trace=trace, reader=aggregate_reader_state())
+
+# One client per reader daemon; display.reader_sockets lists them when
+# readers on other hosts are served through nfc_bridge.py
+reader_sockets = config['display']['reader_sockets'] or [config['nfc']['socket_path']]
+reader_clients = OrderedDict(
+    (path, ReaderClient(path, on_message=lambda message, path=path: handle_reader_message(path, message)))
+    for path in reader_sockets)
+# Socket path -> UID on that reader, in the order the tags were placed
+reader_tags = OrderedDict()
+
 
 @app.route('/')
 def index():
-    return render_template_string(DISPLAY_HTML)
+    return display_shell.response()
 
 @app.route('/api/nfc_status')
 def nfc_status():
-    """Return current NFC status"""
+    """Return current NFC status. With ?since=<version> the request is held
+    until the state moves past that version or the long-poll timeout
+    expires."""
+    snapshot = tag_state.current
+    since = request.args.get('since', type=int)
+    if since is not None and since == snapshot.version:
+        snapshot = tag_state.wait_for_change(since, config['display']['long_poll_timeout'])
+    with traces_lock:
+        trace = pending_traces.get(snapshot.trace)
+        first_served = trace is not None and not trace['served']
+        if first_served:
+            trace['served'] = True
+    if first_served:
+        # Time until the browser's poll picked up the change
+        metrics.observe('browser_poll', time.monotonic() - trace['received'])
     return jsonify({
-        'uid': current_uid,
-        'html': current_html,
+        'uid': snapshot.uid,
+        'html': snapshot.html,
+        'reader': snapshot.reader,
+        'trace': snapshot.trace,
+        'version': snapshot.version,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/trace', methods=['POST'])
+def report_trace():
+    """Called by the display page once the iframe for a trace has loaded"""
+    data = request.get_json(silent=True) or {}
+    with traces_lock:
+        trace = pending_traces.pop(data.get('trace'), None)
+    if trace is None:
+        return '', 204
+    metrics.observe('iframe_load', float(data.get('iframe_load_ms', 0)) / 1000.0)
+    metrics.observe('tag_to_screen', time.time() - trace['start'])
+    return '', 204
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Per-stage latencies in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def client_status(client):
+    return {
+        'state': client.reader_state,
+        'error': client.reader_error,
+        'link': client.reader_link,
+        'daemon_connected': client.connected,
+        'health': client.health
+    }
+
+@app.route('/api/reader_status')
+def reader_status():
+    """Return the state of the NFC reader (initialising/ready/failed). With
+    several readers, the fields describe the first one and 'readers' lists
+    all of them by socket path."""
+    status = client_status(next(iter(reader_clients.values())))
+    if len(reader_clients) > 1:
+        status['state'] = aggregate_reader_state()
+        status['readers'] = {path: dict(client_status(client), uid=client.uid)
+                             for path, client in reader_clients.items()}
+    return jsonify(status)
+
 @app.route('/content/<path:filename>')
 def serve_content(filename):
     """Serve HTML content files"""
     return send_from_directory('html_content', filename)
 
 if __name__ == '__main__':
-    # Start NFC reader thread if available
-    if nfc_available:
-        reader_thread = threading.Thread(target=nfc_reader_thread, daemon=True)
-        reader_thread.start()
+    # Subscribe to tag events from the NFC reader daemons
+    for reader_client in reader_clients.values():
+        reader_client.start()
     
     print("\n" + "="*50)
     print("NFC Display System Started")
@@ -338,5 +228,4 @@ if __name__ == '__main__':
     print("This runs on port 8080 (not 5000)")
     print("="*50)
     
-    # Run on different port to avoid conflict with management interface
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    run_app(app, config, config['server']['display_port'])
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tag event journal
+The reader daemon appends every PLACED/REMOVED/SWAPPED event to a JSONL
+file through a background writer, rotating it by size. JournalAnalytics
+follows the files and keeps dwell time histograms and placements per hour
+up to date, reading only what was appended since the last query.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Upper bounds of the dwell time histogram buckets, in seconds
+DWELL_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, float('inf'))
+
+
+def journal_files(path, backups):
+    """Existing journal files, oldest first: path.<backups> ... path.1, path"""
+    candidates = [f'{path}.{i}' for i in range(backups, 0, -1)] + [path]
+    return [name for name in candidates if os.path.exists(name)]
+
+
+class JournalWriter:
+    """Appends events from a queue in a background thread, so the reader
+    loop never waits for the disk.
+
+    Lines are flushed at least every flush_interval seconds. When the file
+    exceeds max_bytes it is rotated like logging's RotatingFileHandler
+    (path -> path.1 -> ... -> path.<backups>). If the disk falls behind by
+    more than max_pending events, new events are dropped and counted.
+    """
+
+    def __init__(self, path, max_bytes=1048576, backups=5, flush_interval=1.0,
+                 max_pending=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(max_pending)
+        self._file = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def append(self, event):
+        """Queue a TagEvent (or a dict with the same fields); never blocks"""
+        if not isinstance(event, dict):
+            event = event._asdict()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Write everything still queued and stop the writer"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Write everything that is queued in one go, then flush once
+            batch = [event]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                self._write([e for e in batch if e is not None])
+            except OSError as e:
+                print(f"Could not write tag journal {self.path}: {e}")
+                self._close_file()
+            if stop:
+                self._close_file()
+                return
+
+    def _write(self, events):
+        if not events:
+            return
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for event in events:
+            self._file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self.written += len(events)
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._close_file()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+class JournalAnalytics:
+    """Aggregates over the journal, updated incrementally.
+
+    Only the read position (inode and offset of the last file read) and the
+    aggregates are kept: a dwell time histogram per UID and the number of
+    placements per UID for each of the last `hours` hours. Every query first
+    reads the lines appended since the previous one; after a rotation the
+    file that was being read is found again by its inode.
+    """
+
+    def __init__(self, path, backups=5, hours=168):
+        self.path = path
+        self.backups = backups
+        self.hours = hours
+        self._position = None
+        self._open = None
+        self._dwell = {}
+        self._placements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Read new journal lines into the aggregates"""
+        with self._lock:
+            files = []
+            for name in journal_files(self.path, self.backups):
+                try:
+                    files.append((name, os.stat(name).st_ino))
+                except OSError:
+                    # Rotated between listing and stat; read next time
+                    pass
+            start = 0
+            if self._position is not None:
+                inodes = [inode for _, inode in files]
+                if self._position[0] in inodes:
+                    start = inodes.index(self._position[0])
+                else:
+                    # Rotated out of reach; start from the oldest file left
+                    self._position = None
+            for name, inode in files[start:]:
+                offset = self._position[1] if self._position and self._position[0] == inode else 0
+                self._position = (inode, self._read(name, offset))
+
+    def _read(self, name, offset):
+        try:
+            f = open(name, 'rb')
+        except OSError:
+            return offset
+        with f:
+            f.seek(offset)
+            for line in f:
+                # A line without its newline is still being written
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    self._add(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return offset
+
+    def _add(self, event):
+        timestamp = event['timestamp']
+        if event['kind'] in ('REMOVED', 'SWAPPED') and self._open:
+            uid, placed_at = self._open
+            if uid == event['previous_uid']:
+                self._add_dwell(uid, timestamp - placed_at)
+            self._open = None
+        if event['kind'] in ('PLACED', 'SWAPPED'):
+            # A PLACED while another tag is open means the daemon restarted;
+            # that dwell time is unknown and dropped
+            self._open = (event['uid'], timestamp)
+            hour = int(timestamp // 3600) * 3600
+            if hour not in self._placements:
+                self._placements[hour] = Counter()
+                while len(self._placements) > self.hours:
+                    self._placements.popitem(last=False)
+            self._placements[hour][event['uid']] += 1
+
+    def _add_dwell(self, uid, seconds):
+        buckets = self._dwell.get(uid)
+        if buckets is None:
+            buckets = self._dwell[uid] = [0] * len(DWELL_BUCKETS)
+        for i, bound in enumerate(DWELL_BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+                break
+
+    def dwell_histogram(self, uid=None):
+        """[(bucket upper bound, count)], for one UID or all of them"""
+        self.refresh()
+        with self._lock:
+            rows = [self._dwell.get(uid, [])] if uid else list(self._dwell.values())
+            totals = [sum(row[i] for row in rows if row) for i in range(len(DWELL_BUCKETS))]
+        return list(zip(DWELL_BUCKETS, totals))
+
+    def top_objects(self, hours=24, limit=10, now=None):
+        """[(hour start, [(uid, placements), ...])] for the last `hours`
+        hours, most recent first, with the `limit` most placed UIDs each"""
+        self.refresh()
+        now = time.time() if now is None else now
+        since = int(now // 3600) * 3600 - (hours - 1) * 3600
+        with self._lock:
+            return [(hour, counts.most_common(limit))
+                    for hour, counts in reversed(self._placements.items())
+                    if hour >= since]
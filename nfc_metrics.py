@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Latency metrics for the tag-to-screen path
+Per-stage latency samples with p50/p95/p99, rendered in the Prometheus
+text exposition format for /api/metrics
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySummary:
+    """Count and sum of all observations plus the most recent `window`
+    samples, from which the quantiles are computed"""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def quantile(self, fraction):
+        if not self.samples:
+            return float('nan')
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LatencyMetrics:
+    """Thread-safe collection of LatencySummary objects keyed by stage"""
+
+    def __init__(self, prefix='hcmp'):
+        self.prefix = prefix
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            summary = self._stages.get(stage)
+            if summary is None:
+                summary = self._stages[stage] = LatencySummary()
+            summary.observe(max(seconds, 0.0))
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, stage):
+        """Time the body of a with block as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """{stage: {'count', 'sum', 'p50', 'p95', 'p99'}} in seconds"""
+        with self._lock:
+            return {stage: {'count': summary.count,
+                            'sum': summary.total,
+                            'p50': summary.quantile(0.5),
+                            'p95': summary.quantile(0.95),
+                            'p99': summary.quantile(0.99)}
+                    for stage, summary in self._stages.items()}
+
+    def render_prometheus(self):
+        """Prometheus text format (version 0.0.4)"""
+        name = f'{self.prefix}_stage_latency_seconds'
+        lines = [f'# HELP {name} Latency of each stage between tag placement and content on screen.',
+                 f'# TYPE {name} summary']
+        with self._lock:
+            for stage in sorted(self._stages):
+                summary = self._stages[stage]
+                for fraction in QUANTILES:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{fraction}"}} '
+                                 f'{summary.quantile(fraction):.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {summary.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {summary.count}')
+            for counter in sorted(self._counters):
+                counter_name = f'{self.prefix}_{counter}_total'
+                lines.append(f'# TYPE {counter_name} counter')
+                lines.append(f'{counter_name} {self._counters[counter]}')
+        return '\n'.join(lines) + '\n'
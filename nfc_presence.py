@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Debounced tag presence tracking
+Turns the raw result of every poll into clean PLACED/REMOVED/SWAPPED events
+"""
+
+import time
+from collections import namedtuple
+
+PLACED = 'PLACED'
+REMOVED = 'REMOVED'
+SWAPPED = 'SWAPPED'
+
+# kind: PLACED/REMOVED/SWAPPED, uid: tag now on the reader (None when removed),
+# previous_uid: tag that was on the reader before, timestamp: wall clock time
+TagEvent = namedtuple('TagEvent', ['kind', 'uid', 'previous_uid', 'timestamp'])
+
+
+class PresenceTracker:
+    """Hysteresis between what the reader saw and what the display shows.
+
+    A new tag has to be seen place_reads times in a row over at least
+    place_time_ms before it counts as placed; the current tag has to be
+    missed remove_reads times over at least remove_time_ms before it counts
+    as removed. A single missed poll therefore no longer flips the display.
+    """
+
+    def __init__(self, place_reads=1, place_time_ms=0, remove_reads=2, remove_time_ms=500):
+        self.place_reads = max(1, int(place_reads))
+        self.place_time = place_time_ms / 1000.0
+        self.remove_reads = max(1, int(remove_reads))
+        self.remove_time = remove_time_ms / 1000.0
+        self.current_uid = None
+        self._candidate = None
+        self._candidate_reads = 0
+        self._candidate_since = None
+
+    @classmethod
+    def from_config(cls, nfc_config):
+        """Build a tracker from the 'nfc' section of config.json"""
+        return cls(place_reads=nfc_config.get('place_reads', 1),
+                   place_time_ms=nfc_config.get('place_time_ms', 0),
+                   remove_reads=nfc_config.get('remove_reads', 2),
+                   remove_time_ms=nfc_config.get('remove_time_ms', 500))
+
+    def update(self, uid, now=None):
+        """Feed the result of one poll (UID string or None). Returns a TagEvent
+        when the confirmed state changes, otherwise None."""
+        if now is None:
+            now = time.monotonic()
+
+        if uid == self.current_uid:
+            self._candidate = None
+            self._candidate_reads = 0
+            return None
+
+        if self._candidate_reads and uid == self._candidate:
+            self._candidate_reads += 1
+        else:
+            self._candidate = uid
+            self._candidate_reads = 1
+            self._candidate_since = now
+
+        if uid is None:
+            reads, hold = self.remove_reads, self.remove_time
+        else:
+            reads, hold = self.place_reads, self.place_time
+        if self._candidate_reads < reads or now - self._candidate_since < hold:
+            return None
+
+        previous = self.current_uid
+        self.current_uid = uid
+        self._candidate = None
+        self._candidate_reads = 0
+        if uid is None:
+            kind = REMOVED
+        elif previous is None:
+            kind = PLACED
+        else:
+            kind = SWAPPED
+        return TagEvent(kind, uid, previous, time.time())
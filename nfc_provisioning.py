@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Provisioning mode for the management interface
+While it is on, every tag placed on the reader that has no mapping yet is
+queued, so an operator can scan a whole batch of tags in a row and assign
+content to them afterwards, one by one or in bulk. Changes are numbered
+events the browser follows with long polls instead of sampling the current
+tag, so a tag that is on the reader for less than a poll is not missed.
+
+Bulk provisioning goes further: given a CSV of object IDs and content files,
+the reader daemon writes each tag placed on the reader with a compact NDEF
+URI record for the next object, verifies it, and the mapping is registered
+straight away. Run it from the interface or on the command line:
+
+    python3 nfc_provisioning.py objects.csv
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from urllib.parse import quote
+
+# Get the base directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add the python directory to the path so we can import pn532
+sys.path.append(os.path.join(BASE_DIR, 'python'))
+
+from pn532.ndef import uri_record
+
+
+class ProvisioningQueue:
+    """Queue of detected but unmapped UIDs, plus the tag on the reader.
+
+    Every change appends an event with the next sequence number:
+      tag       the tag on the reader changed (uid None when removed)
+      queued    an unmapped tag was placed for the first time
+      seen      a queued tag was placed again
+      dequeued  a queued tag was assigned or dismissed (reason)
+      mode      provisioning was switched on or off (active)
+      batch     a bulk provisioning run progressed (status)
+    The last max_events events are kept for events_since().
+    """
+
+    def __init__(self, max_events=500):
+        self.active = False
+        self.uid = None
+        # uid -> {'uid', 'detected_at', 'reads'} in detection order
+        self._pending = OrderedDict()
+        # BatchProvisioner.status() of the last bulk run, if any
+        self.batch = None
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+        self._changed = threading.Condition()
+
+    def _publish(self, kind, **fields):
+        # Called with self._changed held
+        self._seq += 1
+        self._events.append(dict(fields, seq=self._seq, type=kind, at=time.time()))
+        self._changed.notify_all()
+
+    def set_active(self, active):
+        with self._changed:
+            if active != self.active:
+                self.active = active
+                self._publish('mode', active=active)
+
+    def set_batch(self, status):
+        with self._changed:
+            self.batch = status
+            self._publish('batch', status=status)
+
+    def tag(self, uid, mapped):
+        """Record the tag now on the reader (None if none); queue it if
+        provisioning is on and mapped is False. Returns True if it was
+        queued just now."""
+        with self._changed:
+            if uid == self.uid:
+                # Still the same placement, e.g. a state resent on reconnect
+                return False
+            self.uid = uid
+            self._publish('tag', uid=uid, mapped=mapped if uid else None)
+            if uid is None or mapped or not self.active:
+                return False
+            entry = self._pending.get(uid)
+            if entry is not None:
+                entry['reads'] += 1
+                self._publish('seen', uid=uid, reads=entry['reads'])
+                return False
+            entry = {'uid': uid, 'detected_at': time.time(), 'reads': 1}
+            self._pending[uid] = entry
+            self._publish('queued', **entry)
+            return True
+
+    def remove(self, uids, reason):
+        """Take uids off the queue; returns the ones that were queued"""
+        removed = []
+        with self._changed:
+            for uid in uids:
+                if self._pending.pop(uid, None) is not None:
+                    removed.append(uid)
+                    self._publish('dequeued', uid=uid, reason=reason)
+        return removed
+
+    def clear(self):
+        with self._changed:
+            uids = list(self._pending)
+        return self.remove(uids, 'dismissed')
+
+    @property
+    def pending(self):
+        with self._changed:
+            return [dict(entry) for entry in self._pending.values()]
+
+    def snapshot(self):
+        """Everything a client needs to start following events"""
+        with self._changed:
+            return {'seq': self._seq,
+                    'active': self.active,
+                    'uid': self.uid,
+                    'batch': self.batch,
+                    'pending': [dict(entry) for entry in self._pending.values()]}
+
+    def events_since(self, seq, timeout=None):
+        """Events after seq, waiting up to timeout seconds for the first
+        one. Returns (latest seq, events), or (latest seq, None) if events
+        after seq were already dropped and the client has to start over
+        from snapshot()."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq != seq, timeout)
+            if seq > self._seq or (self._events and self._events[0]['seq'] > seq + 1):
+                return self._seq, None
+            return self._seq, [event for event in self._events if event['seq'] > seq]
+
+
+def load_batch(text):
+    """Rows of a provisioning CSV with the columns object_id, html_file and
+    optionally description, as dicts. Raises ValueError for a CSV without
+    those columns, with an incomplete row or with an object ID twice."""
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    if reader.fieldnames is None:
+        raise ValueError('The CSV is empty')
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    if not {'object_id', 'html_file'} <= set(reader.fieldnames):
+        raise ValueError('The CSV needs object_id and html_file columns')
+    rows = []
+    seen = set()
+    for line, row in enumerate(reader, start=2):
+        object_id = (row.get('object_id') or '').strip()
+        html_file = (row.get('html_file') or '').strip()
+        if not object_id and not html_file:
+            continue
+        if not object_id or not html_file:
+            raise ValueError(f'Line {line}: object_id and html_file are required')
+        if object_id in seen:
+            raise ValueError(f'Line {line}: object {object_id} is listed twice')
+        seen.add(object_id)
+        rows.append({'object_id': object_id, 'html_file': html_file,
+                     'description': (row.get('description') or '').strip()})
+    if not rows:
+        raise ValueError('The CSV has no rows')
+    return rows
+
+
+class BatchProvisioner:
+    """Writes the tags for a list of objects, one per tag placed, in order.
+
+    For each row, a write of the NDEF URI record uri_template (with
+    {object_id}) is armed in the reader daemon through send(message), which
+    is ReaderClient.send. The daemon writes the next tag placed and answers
+    with a write_result, passed in through handle_message(). On success the
+    next row is armed first, so the daemon is ready before the operator
+    reaches for the next tag, and then register(uid, row) records the
+    mapping. A failed write (a tag that is not blank, unless overwrite is
+    set, or one taken off too early) leaves the row armed for the next tag.
+    on_change(status) is called with status() after every change.
+    """
+
+    def __init__(self, rows, send, register, uri_template='urn:hcmp:{object_id}',
+                 overwrite=False, on_change=None):
+        self.rows = rows
+        self.send = send
+        self.register = register
+        self.uri_template = uri_template
+        self.overwrite = overwrite
+        self.on_change = on_change
+        # pending/running/done/cancelled
+        self.state = 'pending'
+        self.position = 0
+        self.written = []
+        self.last_error = None
+        self.started_at = None
+        self._run_id = f'{os.getpid()}-{int(time.time() * 1000)}'
+        self._lock = threading.RLock()
+
+    def message(self, row):
+        """The NDEF message for a row"""
+        return uri_record(self.uri_template.format(object_id=quote(row['object_id'], safe='')))
+
+    def _job_id(self):
+        return f'{self._run_id}-{self.position}'
+
+    def _arm(self):
+        # Not connected: armed again when the daemon sends its state
+        self.send({'type': 'write_ndef', 'id': self._job_id(),
+                   'ndef': self.message(self.rows[self.position]).hex(),
+                   'overwrite': self.overwrite})
+
+    def start(self):
+        with self._lock:
+            self.state = 'running'
+            self.started_at = time.time()
+            self._arm()
+        self._changed()
+
+    def cancel(self):
+        with self._lock:
+            if self.state != 'running':
+                return
+            self.state = 'cancelled'
+            self.send({'type': 'cancel_write'})
+        self._changed()
+
+    def handle_message(self, message):
+        """Pass every message from the reader daemon in here"""
+        with self._lock:
+            if self.state != 'running':
+                return
+            if message.get('type') == 'state':
+                # (Re)connected; a new daemon knows nothing of the armed write
+                self._arm()
+                return
+            if message.get('type') != 'write_result' or message.get('id') != self._job_id():
+                return
+            if not message.get('ok'):
+                self.last_error = f"{message.get('uid')}: {message.get('error')}"
+                row = None
+            else:
+                row = self.rows[self.position]
+                self.position += 1
+                self.last_error = None
+                self.written.append({'object_id': row['object_id'], 'uid': message['uid'],
+                                     'pages_written': message.get('pages_written'),
+                                     'elapsed': message.get('elapsed')})
+                if self.position < len(self.rows):
+                    self._arm()
+                else:
+                    self.state = 'done'
+        if row is not None:
+            try:
+                self.register(message['uid'], row)
+            except Exception as e:
+                self.last_error = f"{message['uid']}: written, but not registered: {e}"
+        self._changed()
+
+    def status(self):
+        with self._lock:
+            current = self.rows[self.position] if self.position < len(self.rows) else None
+            return {'state': self.state,
+                    'total': len(self.rows),
+                    'done': self.position,
+                    'next': current['object_id'] if current else None,
+                    'last': self.written[-1] if self.written else None,
+                    'error': self.last_error,
+                    'started_at': self.started_at}
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.status())
+
+
+def mapping_for(row):
+    """The mapping registered for a provisioned row"""
+    return {'html_file': row['html_file'],
+            'description': row['description'],
+            'object_id': row['object_id'],
+            'created': datetime.now().isoformat()}
+
+
+if __name__ == '__main__':
+    from nfc_config import CONFIG_FILE, load_config, resolve_path
+    from nfc_client import ReaderClient
+    from mapping_store import MappingStore
+
+    parser = argparse.ArgumentParser(description='Write and map a tag for every object in a CSV '
+                                                 '(columns object_id, html_file, description)')
+    parser.add_argument('csv', help='CSV file of the objects, in the order the tags are placed')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='also write tags that already hold an NDEF message')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file (default: config.json)')
+    args = parser.parse_args()
+    config = load_config(args.config)
+
+    with open(args.csv, 'r', encoding='utf-8-sig') as f:
+        try:
+            rows = load_batch(f.read())
+        except ValueError as e:
+            sys.exit(f"{args.csv}: {e}")
+    html_dir = resolve_path(config['paths']['html_content'])
+    for row in rows:
+        if not os.path.isfile(os.path.join(html_dir, row['html_file'])):
+            print(f"Warning: {row['html_file']} ({row['object_id']}) is not in {html_dir}")
+
+    store = MappingStore(resolve_path(config['paths']['mappings_file']))
+    finished = threading.Event()
+
+    def register(uid, row):
+        store.update({uid: mapping_for(row)})
+
+    def report(status):
+        last = status['last']
+        if status['error']:
+            print(f"  Not written: {status['error']}")
+        elif last and status['done']:
+            print(f"  {last['object_id']} -> {last['uid']} "
+                  f"({last['pages_written']} pages, {last['elapsed'] * 1000:.0f} ms)")
+        if status['state'] == 'running' and not status['error']:
+            print(f"[{status['done'] + 1}/{status['total']}] Place the tag for {status['next']}")
+        elif status['state'] != 'running':
+            finished.set()
+
+    batch = BatchProvisioner(rows, None, register, uri_template=config['provisioning']['ndef_uri'],
+                             overwrite=args.overwrite, on_change=report)
+    client = ReaderClient(config['nfc']['socket_path'], on_message=batch.handle_message)
+    batch.send = client.send
+    client.start()
+    batch.start()
+    try:
+        finished.wait()
+        print(f"Provisioned {batch.position} of {len(rows)} tags")
+    except KeyboardInterrupt:
+        batch.cancel()
+        print(f"\nCancelled after {batch.position} of {len(rows)} tags")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+NFC Reader Daemon - The only process that talks to the PN532
+Publishes tag events over a local Unix socket to any number of subscribers
+(nfc_display.py, nfc_web_server.py, ...)
+
+Protocol: one JSON object per line. A new subscriber first receives
+{"type": "state", "uid": ..., "reader": ..., "error": ..., "link": ...} with
+the tag currently on the reader and the reader state (initialising/ready/
+failed), then {"type": "event", "kind": "PLACED"|"REMOVED"|"SWAPPED", "uid": ...,
+"previous_uid": ..., "timestamp": ..., "trace": {...}} for every change
+(trace holds the id and per-stage timings of the poll behind the event),
+{"type": "reader", "reader": ..., "error": ..., "link": ...} whenever the
+reader state changes (link holds the interface and serial speed once the
+reader is ready) and {"type": "health", "health": {...}} with the
+watchdog's error counters and recovery times whenever they change.
+
+Subscribers may send {"type": "write_ndef", "id": ..., "ndef": hex,
+"overwrite": false} to have an NDEF message written to the next tag placed
+on the reader (nfc_tag_writer.py); only that subscriber receives the
+{"type": "write_result", ...} that follows. {"type": "cancel_write"} disarms.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Get the base directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add the python directory to the path so we can import pn532
+sys.path.append(os.path.join(BASE_DIR, 'python'))
+
+from nfc_config import CONFIG_FILE, load_config, resolve_path
+from nfc_journal import JournalWriter
+from nfc_presence import PresenceTracker
+from nfc_supervisor import READY, ReaderSupervisor, configure_reader, init_reader
+from nfc_tag_writer import TagWriter
+from nfc_watchdog import ReaderWatchdog
+
+
+class EventPublisher:
+    """Unix socket server that fans messages out to all subscribers.
+    Messages subscribers send are passed to on_command(conn, message), and
+    on_disconnect(conn) is called once a subscriber is gone."""
+
+    def __init__(self, socket_path, on_command=None, on_disconnect=None):
+        self.socket_path = socket_path
+        self.on_command = on_command
+        self.on_disconnect = on_disconnect
+        self.state = {'type': 'state', 'uid': None, 'reader': 'initialising', 'error': None,
+                      'link': None}
+        self._clients = []
+        self._lock = threading.RLock()
+        self._server = None
+
+    def start(self):
+        # A stale socket file is left behind if the daemon was killed
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o666)
+        self._server.listen(16)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Publishing tag events on {self.socket_path}")
+
+    def close(self):
+        if self._server:
+            self._server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def publish(self, message, **state):
+        """Send a message to every subscriber. Keyword arguments update the
+        state snapshot that new subscribers receive when they connect."""
+        line = (json.dumps(message) + '\n').encode('utf-8')
+        # Sending under the lock keeps the order of messages identical for
+        # every subscriber, including one that is just connecting
+        with self._lock:
+            self.state.update(state)
+            for conn in list(self._clients):
+                self._send(conn, line)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            # A stuck subscriber must never stall the reader loop
+            conn.settimeout(1.0)
+            with self._lock:
+                self._clients.append(conn)
+                self._send(conn, (json.dumps(self.state) + '\n').encode('utf-8'))
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def reply(self, conn, message):
+        """Send a message to one subscriber only"""
+        with self._lock:
+            if conn in self._clients:
+                self._send(conn, (json.dumps(message) + '\n').encode('utf-8'))
+
+    def _receive(self, conn):
+        buffer = b''
+        while True:
+            try:
+                data = conn.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not data:
+                break
+            *lines, buffer = (buffer + data).split(b'\n')
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if self.on_command and isinstance(message, dict):
+                    try:
+                        self.on_command(conn, message)
+                    except Exception as e:
+                        print(f"Error handling subscriber command: {e}")
+        self._drop(conn)
+
+    def _send(self, conn, line):
+        try:
+            conn.sendall(line)
+        except OSError:
+            self._drop(conn)
+
+    def _drop(self, conn):
+        with self._lock:
+            if conn not in self._clients:
+                return
+            self._clients.remove(conn)
+        conn.close()
+        if self.on_disconnect:
+            self.on_disconnect(conn)
+
+
+def run_reader(supervisor, publisher, config, journal=None, writer=None):
+    """Poll the reader forever and publish debounced tag events, appending
+    them to the journal if one is given, and carrying out the write armed
+    in the TagWriter, if one is given, on each newly placed tag"""
+    tracker = PresenceTracker.from_config(config['nfc'])
+    scan_interval = config['nfc']['scan_interval']
+    last_seen = None
+
+    def publish_health(metrics):
+        publisher.publish({'type': 'health', 'health': metrics}, health=metrics)
+
+    watchdog = ReaderWatchdog(supervisor, on_change=publish_health,
+                              configure=lambda reader: configure_reader(reader, config))
+    # RF profiles with limited retries return from an empty poll at once
+    min_poll_interval = config['nfc']['min_poll_interval']
+
+    print("NFC monitoring started...")
+    trace_id = 0
+    started = 0.0
+    while True:
+        # Picks up the new reader after the supervisor reopened it
+        nfc_reader = supervisor.wait_ready()
+        pause = started + min_poll_interval - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+        try:
+            # While a chip sits on the reader, a cheap presence check is
+            # enough; only re-run the full detection once it stops answering.
+            started = time.perf_counter()
+            # Remote readers (pn532.tcp) count the time spent on the network
+            network_before = getattr(nfc_reader, 'network_time', None)
+            if last_seen and nfc_reader.target_present():
+                uid_hex = last_seen
+                read_done = decoded = time.perf_counter()
+            else:
+                uid = nfc_reader.read_passive_target(timeout=scan_interval)
+                read_done = time.perf_counter()
+                uid_hex = ''.join([format(i, '02x') for i in uid]) if uid else None
+                decoded = time.perf_counter()
+            last_seen = uid_hex
+            # The chip answered; one that does not raises AckTimeoutError
+            watchdog.record_success()
+
+            event = tracker.update(uid_hex)
+            if event is None:
+                continue
+
+            stages = {'driver_command': read_done - started}
+            if network_before is not None:
+                network = nfc_reader.network_time - network_before
+                stages = {'driver_command': read_done - started - network,
+                          'network': network}
+            print(f"{event.kind}: {event.uid or event.previous_uid}")
+            if journal:
+                journal.append(event)
+            # Timings of the poll that produced the event, so subscribers
+            # can follow the whole tag-to-screen path
+            trace_id += 1
+            # Debouncing and journaling up to here; the message cannot carry
+            # the time it takes to send itself, the display's client_receipt
+            # covers that
+            handled = time.perf_counter()
+            publisher.publish({
+                'type': 'event',
+                'kind': event.kind,
+                'uid': event.uid,
+                'previous_uid': event.previous_uid,
+                'timestamp': event.timestamp,
+                'trace': {
+                    'id': f'{os.getpid()}-{trace_id}',
+                    'published_at': time.time(),
+                    'stages': dict(stages,
+                                   uid_decode=decoded - read_done,
+                                   event_handling=handled - decoded)
+                }
+            }, uid=event.uid)
+
+            if writer and event.uid:
+                result = writer.tag_placed(nfc_reader, event.uid)
+                if result:
+                    print(f"Write to {event.uid}: "
+                          f"{'ok' if result['ok'] else result['error']} "
+                          f"({result['pages_written']} pages, {result['elapsed'] * 1000:.0f} ms)")
+
+        except Exception as e:
+            last_seen = None
+            watchdog.record_failure(e)
+            time.sleep(0.05)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish tag events of one NFC reader')
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help='config file (default: config.json); run one daemon per '
+                             'remote reader, each with its own nfc.socket_path')
+    config = load_config(parser.parse_args().config)
+
+    # Writes subscribers arm for the next placed tag
+    writer = TagWriter()
+
+    def handle_command(conn, message):
+        if message.get('type') == 'write_ndef':
+            writer.arm(message.get('id'), bytes.fromhex(message.get('ndef', '')),
+                       overwrite=bool(message.get('overwrite')),
+                       reply=lambda result: publisher.reply(conn, result), owner=conn)
+        elif message.get('type') == 'cancel_write':
+            writer.cancel(owner=conn)
+
+    # Subscribers can connect right away; the reader is opened in the
+    # background and its state is published as it changes
+    publisher = EventPublisher(config['nfc']['socket_path'], on_command=handle_command,
+                               on_disconnect=lambda conn: writer.cancel(owner=conn))
+    publisher.start()
+
+    def publish_reader_state(state, error):
+        link = None
+        if state == READY and supervisor.reader is not None:
+            link = {'interface': config['nfc']['interface'],
+                    'baudrate': supervisor.reader.link_baudrate}
+        publisher.publish({'type': 'reader', 'reader': state, 'error': error, 'link': link},
+                          reader=state, error=error, link=link)
+
+    print("Initializing NFC reader...")
+    supervisor = ReaderSupervisor(lambda: init_reader(config),
+                                  on_state_change=publish_reader_state)
+    supervisor.start()
+    
+    journal = None
+    if config['journal']['enabled']:
+        journal_config = config['journal']
+        journal = JournalWriter(resolve_path(journal_config['path']),
+                                max_bytes=journal_config['max_bytes'],
+                                backups=journal_config['backups'],
+                                flush_interval=journal_config['flush_interval']).start()
+    try:
+        run_reader(supervisor, publisher, config, journal, writer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if journal:
+            journal.close()
+        publisher.close()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Launching the Flask apps
+Development mode uses Flask's built-in server; production mode serves the
+app with waitress (thread pool, keep-alive, graceful reload on SIGHUP and
+graceful shutdown on SIGTERM). Both are configured from config.json's
+'server' section.
+"""
+
+import os
+import signal
+import sys
+
+
+def run_app(app, config, port):
+    """Serve app on port according to config['server']"""
+    server_config = config['server']
+    host = server_config['host']
+
+    if server_config.get('mode', 'development') != 'production':
+        app.run(host=host, port=port, debug=server_config['debug'], threaded=True)
+        return
+
+    try:
+        from waitress import create_server
+    except ImportError:
+        print("waitress is not installed (pip install waitress), "
+              "falling back to the development server")
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+
+    server = create_server(app, host=host, port=port,
+                           threads=server_config.get('threads', 32),
+                           connection_limit=server_config.get('connection_limit', 100),
+                           channel_timeout=server_config.get('keepalive_timeout', 120),
+                           ident='HapticCollectionMediaPlayer')
+    reload_requested = []
+
+    def stop(signum, frame):
+        if signum == signal.SIGHUP:
+            reload_requested.append(True)
+        # waitress finishes running requests (up to 5 s) and closes all
+        # connections when run() is interrupted by SystemExit
+        raise SystemExit
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, stop)
+
+    print(f"Serving with waitress on http://{host}:{port} "
+          f"({server_config.get('threads', 32)} threads)")
+    server.run()
+
+    if reload_requested:
+        print("Reloading...")
+        os.execv(sys.executable, [sys.executable] + sys.argv)
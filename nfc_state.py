@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tag state shared between the reader thread and the Flask handlers
+A ReaderState is an immutable snapshot; ReaderStateStore swaps in a new one
+with a higher version on every change, so a handler always sees a UID with
+its own HTML file, and can wait for the next change instead of polling.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# version: increases by one with every change
+# uid/html: the tag on the reader and its mapped file, None if none
+# reader: initialising/ready/failed, as reported by the daemon
+# trace: id of the latency trace of the last tag event, if any
+# placed_at: wall clock time the current tag was placed, None if none
+# changed_at: wall clock time of this version
+ReaderState = namedtuple('ReaderState',
+                         ['version', 'uid', 'html', 'reader', 'trace', 'placed_at', 'changed_at'])
+
+
+class ReaderStateStore:
+    """Holder of the current ReaderState"""
+
+    def __init__(self, reader='initialising'):
+        self._state = ReaderState(0, None, None, reader, None, None, time.time())
+        self._changed = threading.Condition()
+
+    @property
+    def current(self):
+        """The current snapshot; replaced, never modified"""
+        return self._state
+
+    def update(self, if_version=None, **changes):
+        """Swap in a snapshot with the given fields changed and wake all
+        waiters. With if_version, only if the current version is still that
+        one. Returns the new snapshot, or the current one if nothing
+        changed."""
+        with self._changed:
+            state = self._state
+            if if_version is not None and state.version != if_version:
+                return state
+            if all(getattr(state, field) == value for field, value in changes.items()):
+                return state
+            now = time.time()
+            if 'uid' in changes and changes['uid'] != state.uid:
+                changes['placed_at'] = now if changes['uid'] is not None else None
+            self._state = state._replace(version=state.version + 1, changed_at=now, **changes)
+            self._changed.notify_all()
+            return self._state
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the version differs from `version` or timeout seconds
+        pass, then return the current snapshot"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._state.version != version, timeout)
+            return self._state
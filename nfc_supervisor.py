@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Background initialisation of the NFC reader hardware
+Keeps opening the PN532 off the startup path and reconnects with
+exponential backoff, so servers can listen immediately
+"""
+
+import os
+import threading
+import time
+
+from nfc_config import resolve_path
+
+INITIALISING = 'initialising'
+READY = 'ready'
+FAILED = 'failed'
+
+
+# Transport arguments taken from config['nfc'], besides reset and debug;
+# keys set to null in the config keep the transport's default
+TRANSPORT_OPTIONS = {
+    'uart': {'dev': 'device'},
+    'spi': {'cs': 'cs_pin'},
+    'i2c': {'req': 'req_pin'},
+    'usb': {'dev': 'device', 'reset': 'usb_reset_line', 'serial_number': 'usb_serial_number'},
+    'tcp': {'host': 'remote_host', 'port': 'remote_port', 'token': 'remote_token'},
+    'replay': {'path': 'device', 'speed': 'replay_speed'},
+}
+
+
+def init_reader(config):
+    """Open the PN532 on config['nfc']['interface'] and configure it for
+    reading tags"""
+    from pn532 import get_transport
+    from pn532.capture import FrameRecorder, capturing
+    from pn532.gpio import use_pins
+
+    nfc_config = config['nfc']
+    interface = nfc_config['interface']
+    kwargs = {'debug': nfc_config['debug']}
+    if interface != 'tcp':
+        # A remote reader is reset by its bridge, with the bridge's pin
+        kwargs['reset'] = nfc_config['reset_pin']
+    for argument, key in TRANSPORT_OPTIONS.get(interface, {}).items():
+        if nfc_config.get(key) is not None:
+            kwargs[argument] = nfc_config[key]
+        elif argument == 'reset':
+            kwargs[argument] = None
+    if interface not in ('sim', 'usb', 'tcp', 'replay'):
+        use_pins(nfc_config['gpio'], nfc_config['gpio_chip'])
+    transport = get_transport(interface)
+    if nfc_config['capture_dir'] and interface != 'replay':
+        # One capture file per opening of the reader
+        capture_dir = resolve_path(nfc_config['capture_dir'])
+        os.makedirs(capture_dir, exist_ok=True)
+        stem = os.path.join(capture_dir, time.strftime('pn532-%Y%m%d-%H%M%S'))
+        path, number = f'{stem}.cap', 1
+        while os.path.exists(path):
+            # Reopened within the same second
+            number += 1
+            path = f'{stem}-{number}.cap'
+        recorder = FrameRecorder(path, max_bytes=nfc_config['capture_max_bytes'])
+        print(f'Capturing PN532 frames to {path}')
+        try:
+            nfc_reader = capturing(transport)(recorder=recorder, **kwargs)
+        except Exception:
+            recorder.close()
+            raise
+    else:
+        nfc_reader = transport(**kwargs)
+    try:
+        ic, ver, rev, support = nfc_reader.get_firmware_version()
+        print(f'Found PN532 with firmware version: {ver}.{rev}')
+        configure_reader(nfc_reader, config)
+    except Exception:
+        nfc_reader.close()
+        raise
+    return nfc_reader
+
+
+def configure_reader(nfc_reader, config):
+    """Send the configuration that a reset of the PN532 loses: the serial
+    link speed from config['nfc']['baudrate'] (serial transports only), SAM configuration and the RF
+    profile from config['nfc']['rf_profile']"""
+    baudrate = config['nfc']['baudrate']
+    current = nfc_reader.link_baudrate
+    if current is not None and baudrate != current:
+        actual = nfc_reader.set_serial_baudrate(baudrate)
+        if actual != baudrate:
+            print(f"PN532 link does not work at {baudrate} baud, staying at {actual}")
+        else:
+            print(f"PN532 link switched to {actual} baud")
+    nfc_reader.SAM_configuration()
+    nfc_reader.rf_profile(config['nfc']['rf_profile'])
+
+
+class ReaderSupervisor:
+    """Opens the reader in a background thread and keeps it open.
+
+    state is one of INITIALISING, READY or FAILED. After a failed attempt
+    the supervisor waits min_delay seconds, doubling up to max_delay, before
+    trying again. Call reader_lost() when the reader stops working to have
+    it closed and opened again. on_state_change(state, error) is called on every change.
+    """
+
+    def __init__(self, open_reader, min_delay=1.0, max_delay=60.0, on_state_change=None):
+        self.open_reader = open_reader
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.on_state_change = on_state_change
+        self.state = INITIALISING
+        self.error = None
+        self.reader = None
+        self.attempts = 0
+        self._lost = threading.Event()
+        self._ready = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """Block until the reader is open. Returns the reader, or None if
+        it is still not available after timeout seconds."""
+        with self._ready:
+            self._ready.wait_for(lambda: self.state == READY, timeout)
+            return self.reader if self.state == READY else None
+
+    def reader_lost(self, error=None):
+        """Report that the open reader stopped working"""
+        if self.state == READY:
+            self._set_state(FAILED, error)
+            self._lost.set()
+
+    def _set_state(self, state, error=None):
+        with self._ready:
+            self.state = state
+            self.error = str(error) if error else None
+            if state != READY:
+                self.reader = None
+            self._ready.notify_all()
+        if self.on_state_change:
+            self.on_state_change(state, self.error)
+
+    def _run(self):
+        delay = self.min_delay
+        while True:
+            self.attempts += 1
+            if self.state != INITIALISING:
+                self._set_state(INITIALISING)
+            try:
+                reader = self.open_reader()
+            except Exception as e:
+                print(f"Could not initialize NFC reader: {e}, retrying in {delay:.0f}s")
+                self._set_state(FAILED, e)
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+                continue
+
+            print("NFC reader initialized successfully!")
+            delay = self.min_delay
+            with self._ready:
+                self.reader = reader
+            self._lost.clear()
+            self._set_state(READY)
+            self._lost.wait()
+            try:
+                # Free the serial port or socket before opening it again
+                reader.close()
+            except Exception as e:
+                print(f"Could not close NFC reader: {e}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Writing NDEF messages to tags as they are placed on the reader
+A subscriber of the reader daemon arms a write; the daemon carries it out in
+the same poll that detects the next tag, so there is no round trip between
+placing a tag and writing it. Each write costs a FAST_READ of the pages it
+covers, writes of only the pages that change, and a FAST_READ to verify.
+"""
+
+import threading
+import time
+
+from pn532.ndef import USER_PAGE, capacity, find_message, tlv
+from pn532.pn532 import BusyError, PN532Error
+
+
+# Data area of the smallest NTAG21x (NTAG213) in bytes
+SMALLEST_CAPACITY = 144
+
+
+class TagWriteError(RuntimeError):
+    """The placed tag cannot take the armed message"""
+
+
+def _check_capacity(capability_container, data):
+    size = capacity(capability_container)
+    if size is None:
+        raise TagWriteError('Tag is not formatted for NDEF')
+    if len(data) > size:
+        raise TagWriteError(f'Message of {len(data)} bytes does not fit in {size}')
+
+
+def write_ndef(reader, message, overwrite=False):
+    """Write an NDEF message to the NTAG selected by the last
+    read_passive_target. Unless overwrite is set, only a tag without a
+    message, or with this very message, is written. Returns the numbers of
+    the pages written, [] if the tag already held the message."""
+    data = tlv(message)
+    pages = (len(data) + 3) // 4
+    if len(data) > SMALLEST_CAPACITY:
+        # Reading past the end of a smaller tag would fail; check its size
+        # before
+        _check_capacity(reader.ntag2xx_fast_read(USER_PAGE - 1, USER_PAGE - 1), data)
+    # Capability container and the pages the message will cover
+    current = reader.ntag2xx_fast_read(USER_PAGE - 1, USER_PAGE + pages - 1)
+    _check_capacity(current[:4], data)
+    current = current[4:]
+    existing = find_message(current)
+    if existing and existing != message and not overwrite:
+        raise TagWriteError('Tag already holds an NDEF message')
+    written = reader.ntag2xx_write_pages(USER_PAGE, data, current)
+    if written:
+        verify = reader.ntag2xx_fast_read(USER_PAGE, USER_PAGE + pages - 1)
+        if bytes(verify[:len(data)]) != data:
+            raise TagWriteError('Verification read back different data')
+    return written
+
+
+class TagWriter:
+    """The write armed by a subscriber, carried out on the next placed tag.
+
+    arm() replaces any armed write. After a failed attempt (tag not blank,
+    too small, taken off mid-write) the write stays armed for the next tag;
+    after a successful one it is disarmed. reply(message) sends the result
+    to the subscriber that armed it: {"type": "write_result", "id", "uid",
+    "ok", "error", "pages_written", "elapsed", "armed"}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._job = None
+
+    @property
+    def armed(self):
+        return self._job is not None
+
+    def arm(self, job_id, message, overwrite=False, reply=None, owner=None):
+        with self._lock:
+            self._job = {'id': job_id, 'message': bytes(message), 'overwrite': overwrite,
+                         'reply': reply, 'owner': owner}
+
+    def cancel(self, owner=None):
+        """Disarm; with owner, only a write armed by that owner"""
+        with self._lock:
+            if self._job is not None and (owner is None or self._job['owner'] is owner):
+                self._job = None
+
+    def tag_placed(self, reader, uid):
+        """Carry out the armed write on the tag uid just detected. Returns
+        the result sent to the subscriber, None if nothing was armed."""
+        with self._lock:
+            job = self._job
+        if job is None:
+            return None
+        started = time.perf_counter()
+        result = {'type': 'write_result', 'id': job['id'], 'uid': uid,
+                  'ok': False, 'error': None, 'pages_written': 0}
+        try:
+            result['pages_written'] = len(write_ndef(reader, job['message'], job['overwrite']))
+            result['ok'] = True
+        except TagWriteError as e:
+            result['error'] = str(e)
+        except (PN532Error, BusyError, RuntimeError) as e:
+            # Mostly a tag taken off the reader mid-write
+            result['error'] = f"Write failed: {getattr(e, 'errmsg', None) or str(e) or type(e).__name__}"
+        except Exception as e:
+            # Reader trouble; the daemon's watchdog takes it from here
+            result['error'] = f'Write failed: {type(e).__name__}: {e}'
+            raise
+        finally:
+            result['elapsed'] = time.perf_counter() - started
+            with self._lock:
+                if result['ok'] and self._job is job:
+                    self._job = None
+                result['armed'] = self._job is not None
+            if job['reply']:
+                job['reply'](result)
+        return result
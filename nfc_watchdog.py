@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Reader watchdog - classifies PN532 errors and escalates recovery
+Consecutive failures lead from a re-sync, to waking and reconfiguring the
+chip, to a hardware reset through the reset pin, and finally to reopening
+the reader through the supervisor. Recovery times are measured.
+"""
+
+import time
+
+# Error classes
+TIMEOUT = 'timeout'
+BAD_ACK = 'bad_ack'
+CHECKSUM = 'checksum'
+FRAME = 'frame'
+CARD = 'card'
+IO = 'io'
+OTHER = 'other'
+
+# Recovery actions, in order of escalation
+RESYNC = 'resync'
+WAKEUP = 'wakeup'
+RESET = 'reset'
+REOPEN = 'reopen'
+
+
+def classify_error(err):
+    """Map an exception raised while talking to the PN532 to an error class"""
+    from pn532.pn532 import AckError, BusyError, ChecksumError, FrameError, PN532Error
+
+    if isinstance(err, PN532Error):
+        return TIMEOUT if err.err == 0x01 else CARD
+    if isinstance(err, BusyError):
+        return TIMEOUT
+    if isinstance(err, AckError):
+        return BAD_ACK
+    if isinstance(err, ChecksumError):
+        return CHECKSUM
+    if isinstance(err, FrameError):
+        return FRAME
+    if isinstance(err, OSError):
+        return IO
+    return OTHER
+
+
+class ReaderWatchdog:
+    """Tracks consecutive reader failures and recovers the reader.
+
+    After `resync_after` consecutive failures the current command is aborted,
+    after `wakeup_after` the chip is woken and configured again
+    (`configure(reader)`, SAM_configuration by default), after `reset_after`
+    the reset line the reader was opened with (a GPIO pin, or DTR/RTS on USB
+    adapters) is toggled and after `reopen_after` the supervisor is asked to
+    reopen the reader. An outage
+    lasts from the first failure to the next successful poll; its length is
+    what visitors saw as a dead reader.
+    """
+
+    def __init__(self, supervisor, resync_after=1, wakeup_after=3,
+                 reset_after=5, reopen_after=8, on_change=None, configure=None):
+        self.supervisor = supervisor
+        # Sends the chip configuration again after a wakeup or reset
+        self.configure = configure or (lambda reader: reader.SAM_configuration())
+        self.thresholds = [(reopen_after, REOPEN), (reset_after, RESET),
+                           (wakeup_after, WAKEUP), (resync_after, RESYNC)]
+        self.on_change = on_change
+        self.consecutive_failures = 0
+        self.errors = {}
+        self.actions = {}
+        self.last_error = None
+        self.outage_started = None
+        self.outages = 0
+        self.dead_seconds = 0.0
+        self.longest_outage = 0.0
+
+    def record_success(self):
+        """Call after every poll that talked to the chip without an error"""
+        if self.outage_started is None:
+            return
+        duration = time.monotonic() - self.outage_started
+        self.outage_started = None
+        self.consecutive_failures = 0
+        self.outages += 1
+        self.dead_seconds += duration
+        self.longest_outage = max(self.longest_outage, duration)
+        print(f"NFC reader recovered after {duration:.2f}s")
+        self._changed()
+
+    def record_failure(self, err):
+        """Call with the exception of a failed poll; runs the recovery action
+        for the current number of consecutive failures"""
+        error_class = classify_error(err)
+        self.errors[error_class] = self.errors.get(error_class, 0) + 1
+        self.last_error = f"{error_class}: {getattr(err, 'errmsg', None) or err}"
+        self.consecutive_failures += 1
+        if self.outage_started is None:
+            self.outage_started = time.monotonic()
+
+        for threshold, action in self.thresholds:
+            if self.consecutive_failures >= threshold:
+                break
+        else:
+            action = None
+        if action == REOPEN:
+            # Start the escalation again once the reader is reopened
+            self.consecutive_failures = 0
+        if action:
+            self._recover(action, err)
+        self._changed()
+        return action
+
+    def _recover(self, action, err):
+        self.actions[action] = self.actions.get(action, 0) + 1
+        print(f"NFC reader error ({self.last_error}), recovery: {action}")
+        reader = self.supervisor.reader
+        try:
+            if action == REOPEN or reader is None:
+                self.supervisor.reader_lost(err)
+            elif action == RESYNC:
+                reader.resync()
+            elif action == WAKEUP:
+                reader._wakeup()
+                self.configure(reader)
+            elif action == RESET:
+                if reader._reset_pin:
+                    reader._reset(reader._reset_pin)
+                reader._wakeup()
+                self.configure(reader)
+        except Exception as e:
+            # The next poll fails again and escalates further
+            print(f"Recovery '{action}' failed: {e}")
+
+    def metrics(self):
+        """Counters and recovery times, as a JSON friendly dict"""
+        current = 0.0
+        if self.outage_started is not None:
+            current = time.monotonic() - self.outage_started
+        return {
+            'consecutive_failures': self.consecutive_failures,
+            'errors': dict(self.errors),
+            'recovery_actions': dict(self.actions),
+            'last_error': self.last_error,
+            'outages': self.outages,
+            'mean_time_to_recover': self.dead_seconds / self.outages if self.outages else None,
+            'longest_outage': self.longest_outage,
+            'dead_seconds': self.dead_seconds + current,
+            'current_outage': current
+        }
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.metrics())
@@ -5,95 +5,77 @@ This server provides a web interface to map NFC chips to HTML files
 """
 
 from flask import Flask, render_template, jsonify, request, send_from_directory
-import json
 import os
-import threading
-import time
 from datetime import datetime
-import sys
 
 # Get the base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Add the python directory to the path so we can import pn532
-sys.path.append(os.path.join(BASE_DIR, 'python'))
+from nfc_config import load_config, resolve_path
+from nfc_journal import JournalAnalytics
+from content_catalog import ContentCatalog
+from nfc_serve import run_app
+from nfc_client import ReaderClient
+from mapping_store import MappingStore
+from nfc_provisioning import BatchProvisioner, ProvisioningQueue, load_batch, mapping_for
 
-# Initialize NFC reader at module level (like the working simple server)
-nfc_reader = None
-nfc_available = False
-
-print("Attempting to initialize NFC reader...")
-try:
-    import RPi.GPIO as GPIO
-    from pn532 import *  # Use same import as working example
-    
-    nfc_reader = PN532_UART(debug=False, reset=20)
-    ic, ver, rev, support = nfc_reader.get_firmware_version()
-    print(f'Found PN532 with firmware version: {ver}.{rev}')
-    nfc_reader.SAM_configuration()
-    nfc_available = True
-    print("NFC reader initialized successfully!")
-except Exception as e:
-    print(f"Could not initialize NFC reader: {e}")
-    print("Running in development mode without NFC reader")
-    nfc_available = False
+config = load_config()
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='web_interface', template_folder='web_interface')
 
 # Global variables
 current_uid = None
-is_reading = False
-mappings_file = os.path.join(BASE_DIR, "nfc_mappings.json")
-
-# Load or create mappings file
-def load_mappings():
-    if os.path.exists(mappings_file):
-        with open(mappings_file, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_mappings(mappings):
-    with open(mappings_file, 'w') as f:
-        json.dump(mappings, f, indent=2)
-
-# Background thread to continuously read NFC tags
-def nfc_reader_thread():
-    global current_uid, is_reading
-    
-    if not nfc_available:
-        print("NFC reader not available, skipping reader thread")
-        return
-    
-    print("Starting NFC reader thread...")
-    is_reading = True
-    read_count = 0
+html_dir = resolve_path(config['paths']['html_content'])
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Sample Content</title>
+    <style>
+        body { font-family: Arial, sans-serif; padding: 20px; }
+        h1 { color: #333; }
+    </style>
+</head>
+<body>
+    <h1>Sample Content</h1>
+    <p>This is a sample HTML file that can be associated with an NFC chip.</p>
+    <p>Place your custom HTML files in the 'html_content' directory.</p>
+</body>
+</html>"""
+
+# NFC to HTML mappings, with revisions for the management UI's delta sync
+mapping_store = MappingStore(resolve_path(config['paths']['mappings_file']),
+                             changelog_size=config['mappings']['changelog_size'])
+
+# Unmapped tags scanned in provisioning mode, and the tag on the reader as
+# events for the interface
+provisioning = ProvisioningQueue(max_events=config['provisioning']['max_events'])
+# The bulk provisioning run started from the interface, if any
+batch = None
+
+# Tag state comes from the NFC reader daemon, which owns the hardware
+def handle_reader_message(message):
+    global current_uid
     
-    while is_reading:
-        try:
-            # Print debug every 10 reads
-            read_count += 1
-            if read_count % 10 == 0:
-                print(f"NFC reader thread active, attempts: {read_count}")
-            
-            # Check if a card is available to read
-            uid = nfc_reader.read_passive_target(timeout=0.5)
-            
-            if uid is not None:
-                # Convert UID to hex string
-                uid_hex = ''.join([format(i, '02x') for i in uid])
-                current_uid = uid_hex
-                print(f"Detected NFC chip with UID: {uid_hex}")
-                # Wait a bit before reading again to avoid multiple reads
-                time.sleep(2)
-            else:
-                current_uid = None
-                
-        except Exception as e:
-            print(f"Error reading NFC: {e}")
-            import traceback
-            traceback.print_exc()
-            time.sleep(1)
+    if batch:
+        batch.handle_message(message)
+    if message['type'] in ('state', 'event', 'disconnected'):
+        current_uid = message.get('uid')
+        mapped = bool(current_uid) and current_uid in mapping_store
+        if provisioning.tag(current_uid, mapped):
+            print(f"Queued unmapped NFC chip: {current_uid}")
+        elif current_uid:
+            print(f"Detected NFC chip with UID: {current_uid}")
+
+reader_client = ReaderClient(config['nfc']['socket_path'], on_message=handle_reader_message)
+
+# Index of the HTML files, kept current in the background
+catalog = ContentCatalog(html_dir, poll_interval=config['catalog']['poll_interval'])
+
+# Visitor analytics from the reader daemon's tag event journal
+journal = JournalAnalytics(resolve_path(config['journal']['path']),
+                           backups=config['journal']['backups'])
 
 # Routes
 @app.route('/')
@@ -105,14 +87,51 @@ def get_current_nfc():
     """Get the currently detected NFC chip UID"""
     return jsonify({
         'uid': current_uid,
+        'reader': reader_client.reader_state,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/reader_status')
+def reader_status():
+    """Return the state of the NFC reader (initialising/ready/failed)"""
+    return jsonify({
+        'state': reader_client.reader_state,
+        'error': reader_client.reader_error,
+        'link': reader_client.reader_link,
+        'daemon_connected': reader_client.connected,
+        'health': reader_client.health
+    })
+
+def mappings_etag(revision):
+    return f'mappings-{revision}'
+
 @app.route('/api/mappings')
 def get_mappings():
-    """Get all NFC to HTML mappings"""
-    mappings = load_mappings()
-    return jsonify(mappings)
+    """Get all NFC to HTML mappings. The ETag carries the revision, and an
+    If-None-Match with the current one is answered with 304."""
+    revision = mapping_store.current_revision()
+    if request.if_none_match.contains(mappings_etag(revision)):
+        response = app.response_class(status=304)
+    else:
+        revision, mappings = mapping_store.snapshot()
+        response = jsonify(mappings)
+    response.set_etag(mappings_etag(revision))
+    # Cached, but revalidated on every use
+    response.cache_control.no_cache = True
+    response.headers['X-Mappings-Revision'] = str(revision)
+    return response
+
+@app.route('/api/mappings/changes')
+def mapping_changes():
+    """Mappings inserted, updated or deleted (null) after ?since=<revision>.
+    'reset' means the changes are no longer known; 'mappings' then holds all
+    of them instead."""
+    since = request.args.get('since', type=int)
+    revision, changes = mapping_store.changes_since(since) if since is not None else (None, None)
+    if changes is None:
+        revision, mappings = mapping_store.snapshot()
+        return jsonify({'revision': revision, 'reset': True, 'mappings': mappings})
+    return jsonify({'revision': revision, 'reset': False, 'changes': changes})
 
 @app.route('/api/mapping', methods=['POST'])
 def save_mapping():
@@ -125,76 +144,177 @@ def save_mapping():
     if not uid or not html_file:
         return jsonify({'error': 'UID and HTML file are required'}), 400
     
-    mappings = load_mappings()
-    mappings[uid] = {
+    revision = mapping_store.update({uid: {
         'html_file': html_file,
         'description': description,
         'created': datetime.now().isoformat()
-    }
-    save_mappings(mappings)
+    }})
+    provisioning.remove([uid], 'assigned')
     
-    return jsonify({'success': True, 'message': 'Mapping saved successfully'})
+    return jsonify({'success': True, 'revision': revision,
+                    'message': 'Mapping saved successfully'})
 
 @app.route('/api/mapping/<uid>', methods=['DELETE'])
 def delete_mapping(uid):
     """Delete an NFC to HTML mapping"""
-    mappings = load_mappings()
-    if uid in mappings:
-        del mappings[uid]
-        save_mappings(mappings)
-        return jsonify({'success': True, 'message': 'Mapping deleted successfully'})
+    revision = mapping_store.delete(uid)
+    if revision is not None:
+        return jsonify({'success': True, 'revision': revision,
+                        'message': 'Mapping deleted successfully'})
     return jsonify({'error': 'Mapping not found'}), 404
 
-@app.route('/api/html_files')
-def list_html_files():
-    """List all HTML files in the html_content directory"""
-    html_dir = os.path.join(BASE_DIR, 'html_content')
-    if not os.path.exists(html_dir):
-        os.makedirs(html_dir)
-        # Create a sample HTML file
-        sample_path = os.path.join(html_dir, 'sample.html')
-        with open(sample_path, 'w') as f:
-            f.write("""<!DOCTYPE html>
-<html>
-<head>
-    <title>Sample Content</title>
-    <style>
-        body { font-family: Arial, sans-serif; padding: 20px; }
-        h1 { color: #333; }
-    </style>
-</head>
-<body>
-    <h1>Sample Content</h1>
-    <p>This is a sample HTML file that can be associated with an NFC chip.</p>
-    <p>Place your custom HTML files in the 'html_content' directory.</p>
-</body>
-</html>""")
+@app.route('/api/provisioning', methods=['GET', 'POST'])
+def provisioning_mode():
+    """Provisioning mode and the queue of unmapped tags; POST
+    {"active": true/false} switches the mode"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        provisioning.set_active(bool(data.get('active')))
+    return jsonify(provisioning.snapshot())
+
+@app.route('/api/provisioning/events')
+def provisioning_events():
+    """Provisioning events after ?since=<seq>, held until there is one or
+    the long-poll timeout expires. 'reset' means events were missed (or the
+    server restarted) and the client has to start over from the snapshot
+    included in the answer."""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify(dict(provisioning.snapshot(), reset=True, events=[]))
+    seq, events = provisioning.events_since(since, config['provisioning']['long_poll_timeout'])
+    if events is None:
+        return jsonify(dict(provisioning.snapshot(), reset=True, events=[]))
+    return jsonify({'seq': seq, 'reset': False, 'events': events})
+
+@app.route('/api/provisioning/assign', methods=['POST'])
+def assign_queued():
+    """Map queued tags in bulk: {"assignments": [{"uid", "html_file",
+    "description"}, ...]}, all written at once"""
+    data = request.get_json(silent=True) or {}
+    assignments = data.get('assignments') or []
+    invalid = [index for index, item in enumerate(assignments)
+               if not isinstance(item, dict) or not item.get('uid') or not item.get('html_file')]
+    if not assignments or invalid:
+        return jsonify({'error': 'Every assignment needs a UID and an HTML file',
+                        'invalid': invalid}), 400
     
-    html_files = []
-    for file in os.listdir(html_dir):
-        if file.endswith('.html'):
-            html_files.append(file)
+    created = datetime.now().isoformat()
+    revision = mapping_store.update({item['uid']: {
+        'html_file': item['html_file'],
+        'description': item.get('description', ''),
+        'created': created
+    } for item in assignments})
+    provisioning.remove([item['uid'] for item in assignments], 'assigned')
     
-    return jsonify(html_files)
+    return jsonify({'success': True, 'assigned': len(assignments), 'revision': revision,
+                    'message': f'{len(assignments)} mappings saved'})
+
+def register_batch_tag(uid, row):
+    mapping_store.update({uid: mapping_for(row)})
+    provisioning.remove([uid], 'assigned')
+
+@app.route('/api/provisioning/batch', methods=['GET', 'POST', 'DELETE'])
+def provisioning_batch():
+    """Bulk provisioning: POST {"csv": "object_id,html_file,description\\n...",
+    "overwrite": false} starts writing one tag per row as they are placed,
+    DELETE cancels. Returns the run's status; progress also arrives as
+    'batch' events."""
+    global batch
+    if request.method == 'DELETE':
+        if batch:
+            batch.cancel()
+    elif request.method == 'POST':
+        if batch and batch.state == 'running':
+            return jsonify({'error': 'A provisioning run is already in progress'}), 409
+        data = request.get_json(silent=True) or {}
+        try:
+            rows = load_batch(data.get('csv') or '')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        missing = sorted({row['html_file'] for row in rows
+                          if not os.path.isfile(os.path.join(html_dir, row['html_file']))})
+        if missing:
+            return jsonify({'error': 'HTML files not found: ' + ', '.join(missing)}), 400
+        if not reader_client.connected:
+            return jsonify({'error': 'The NFC reader daemon is not running'}), 503
+        batch = BatchProvisioner(rows, reader_client.send, register_batch_tag,
+                                 uri_template=config['provisioning']['ndef_uri'],
+                                 overwrite=bool(data.get('overwrite')),
+                                 on_change=provisioning.set_batch)
+        batch.start()
+    return jsonify(batch.status() if batch else None)
+
+@app.route('/api/provisioning/queue', methods=['DELETE'])
+@app.route('/api/provisioning/queue/<uid>', methods=['DELETE'])
+def dismiss_queued(uid=None):
+    """Drop one tag, or all of them, from the queue without mapping it"""
+    removed = provisioning.clear() if uid is None else provisioning.remove([uid], 'dismissed')
+    if uid is not None and not removed:
+        return jsonify({'error': 'UID not queued'}), 404
+    return jsonify({'success': True, 'dismissed': len(removed)})
+
+@app.route('/api/html_files')
+def list_html_files():
+    """List the HTML files in the content catalog. Optional filters:
+    ?q= (in the name or title), ?model= (referenced model path), with
+    ?offset= and ?limit= (at most 1000) for paging."""
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+    total, entries = catalog.query(search=request.args.get('q'),
+                                   model=request.args.get('model'),
+                                   offset=offset, limit=limit)
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'files': [entry._asdict() for entry in entries]
+    })
+
+@app.route('/api/analytics/dwell')
+def dwell_histogram():
+    """Histogram of how long objects stayed on the reader, optionally for
+    one UID (?uid=...)"""
+    uid = request.args.get('uid')
+    buckets = journal.dwell_histogram(uid)
+    return jsonify({
+        'uid': uid,
+        'buckets': [{'le': 'inf' if bound == float('inf') else bound, 'count': count}
+                    for bound, count in buckets],
+        'total': sum(count for _, count in buckets)
+    })
+
+@app.route('/api/analytics/top_objects')
+def top_objects():
+    """Most placed objects per hour (?hours=24&limit=10)"""
+    hours = request.args.get('hours', 24, type=int)
+    limit = request.args.get('limit', 10, type=int)
+    _, mappings = mapping_store.snapshot()
+    return jsonify([{
+        'hour': datetime.fromtimestamp(hour).isoformat(),
+        'objects': [{'uid': uid,
+                     'placements': count,
+                     'description': mappings.get(uid, {}).get('description', '')}
+                    for uid, count in counts]
+    } for hour, counts in journal.top_objects(hours, limit)])
 
 @app.route('/api/test_nfc/<uid>')
 def test_nfc(uid):
     """Test endpoint to simulate NFC detection (for development)"""
-    global current_uid
-    current_uid = uid
+    handle_reader_message({'type': 'event', 'kind': 'PLACED', 'uid': uid})
     return jsonify({'success': True, 'uid': uid})
 
 if __name__ == '__main__':
-    # Start NFC reader thread if available
-    if nfc_available:
-        reader_thread = threading.Thread(target=nfc_reader_thread, daemon=True)
-        reader_thread.start()
+    # Subscribe to tag events from the NFC reader daemon
+    reader_client.start()
     
-    # Create necessary directories
-    os.makedirs(os.path.join(BASE_DIR, 'html_content'), exist_ok=True)
+    # Create the content directory with a sample file on first start
+    if not os.path.exists(html_dir):
+        os.makedirs(html_dir)
+        with open(os.path.join(html_dir, 'sample.html'), 'w') as f:
+            f.write(SAMPLE_HTML)
+    catalog.start()
     
     print("Starting NFC Web Server...")
     print("Access the interface at: http://localhost:5000")
     
-    # Run the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    run_app(app, config, config['server']['port'])
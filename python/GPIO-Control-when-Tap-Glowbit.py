@@ -7,7 +7,7 @@ After initialization, try waving various 13.56MHz RFID cards over it and watch i
 
 import glowbit
 
-from pn532 import *
+from pn532 import PN532_UART   # or PN532_SPI or PN532_I2C, see below
 
 import RPi.GPIO as GPIO
 
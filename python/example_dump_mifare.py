@@ -6,7 +6,7 @@ type RFID tag
 import RPi.GPIO as GPIO
 
 import pn532.pn532 as nfc
-from pn532 import *
+from pn532 import PN532_SPI   # or PN532_I2C or PN532_UART, see below
 
 pn532 = PN532_SPI(cs=4, reset=20, debug=False)
 #pn532 = PN532_I2C(debug=False, reset=20, req=16)
@@ -28,15 +28,16 @@ while True:
         break
 print('Found card with UID:', [hex(i) for i in uid])
 
-key_a = b'\xFF\xFF\xFF\xFF\xFF\xFF'
-# Now we try to go through all 16 sectors (each having 4 blocks)
-for i in range(64):
-    try:
-        pn532.mifare_classic_authenticate_block(
-            uid, block_number=i, key_number=nfc.MIFARE_CMD_AUTH_A, key=key_a)
-        print(i, ':', ' '.join(['%02X' % x
-            for x in pn532.mifare_classic_read_block(i)]))
-    except nfc.PN532Error as e:
-        print(e.errmsg)
-        break
+# Go through all 16 sectors (each having 4 blocks), authenticating once per
+# sector with the first of the well-known keys that opens it.
+for sector in pn532.mifare_classic_read_all(uid, keys=nfc.MIFARE_DEFAULT_KEYS):
+    if sector['key'] is None:
+        print('Sector', sector['sector'], ':', sector['error'])
+        continue
+    for block_number, data in zip(pn532.mifare_classic_sector_blocks(sector['sector']),
+                                  sector['blocks']):
+        if data is None:
+            print(block_number, ':', sector['error'])
+        else:
+            print(block_number, ':', ' '.join(['%02X' % x for x in data]))
 GPIO.cleanup()
@@ -6,7 +6,7 @@ type RFID tag
 import RPi.GPIO as GPIO
 
 import pn532.pn532 as nfc
-from pn532 import *
+from pn532 import PN532_UART   # or PN532_SPI or PN532_I2C, see below
 
 #pn532 = PN532_SPI(cs=4, reset=20, debug=False)
 #pn532 = PN532_I2C(debug=False, reset=20, req=16)
@@ -8,7 +8,7 @@ After initialization, try waving various 13.56MHz RFID cards over it!
 import RPi.GPIO as GPIO
 
 
-from pn532 import *
+from pn532 import PN532_UART   # or PN532_SPI or PN532_I2C, see below
 
 
 if __name__ == '__main__':
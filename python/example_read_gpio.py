@@ -4,7 +4,7 @@ This example shows connecting to the PN532 and reading the GPIOs.
 
 import RPi.GPIO as GPIO
 
-from pn532 import *
+from pn532 import PN532_SPI   # or PN532_I2C or PN532_UART, see below
 
 pn532 = PN532_SPI(reset=20, cs=4, debug=False)
 #pn532 = PN532_I2C(debug=False, reset=20, req=16)
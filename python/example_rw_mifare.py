@@ -14,7 +14,7 @@ since 'KEY A' is unreadable. In contrast, the last 6 bytes (KEY B) of the
 import RPi.GPIO as GPIO
 
 import pn532.pn532 as nfc
-from pn532 import *
+from pn532 import PN532_SPI   # or PN532_I2C or PN532_UART, see below
 
 
 pn532 = PN532_SPI(debug=False, reset=20, cs=4)
@@ -1,13 +1,57 @@
+
 __all__ = [
     'pn532',
-    'i2c',
-    'spi',
-    'uart',
-    'PN532_I2C',
-    'PN532_SPI',
-    'PN532_UART'
+    'TRANSPORTS',
+    'get_transport',
+    'open_reader',
+    'register_transport'
 ]
+import importlib
+
 from . import pn532
-from .i2c import PN532_I2C
-from .spi import PN532_SPI
-from .uart import PN532_UART
+
+# Transports by name, as config.json's nfc.interface: module and class.
+# The hardware transports need spidev, pyserial or /dev/i2c, so they are
+# imported only when first used; a UART-only install never loads spidev,
+# and only tests and benchmarks load the simulator.
+TRANSPORTS = {
+    'uart': ('.uart', 'PN532_UART'),
+    'i2c': ('.i2c', 'PN532_I2C'),
+    'spi': ('.spi', 'PN532_SPI'),
+    'usb': ('.usb', 'PN532_USBSerial'),
+    'tcp': ('.tcp', 'PN532_TCP'),
+    'replay': ('.capture', 'PN532_Replay'),
+    'sim': ('.sim', 'PN532_Sim'),
+}
+
+
+def register_transport(name, module, class_name):
+    """Make a transport available to get_transport() under name. module is
+    an absolute module path, or relative to this package if it starts with
+    a dot."""
+    TRANSPORTS[name] = (module, class_name)
+
+
+def get_transport(name):
+    """The transport class registered as name, importing its module"""
+    try:
+        module, class_name = TRANSPORTS[name]
+    except KeyError:
+        raise ValueError(f'Unknown PN532 interface {name!r}, expected one of '
+                         f'{sorted(TRANSPORTS)}') from None
+    return getattr(importlib.import_module(module, __name__), class_name)
+
+
+def open_reader(interface, **kwargs):
+    """Instantiate the transport registered as interface with kwargs"""
+    return get_transport(interface)(**kwargs)
+
+
+def __getattr__(name):
+    # PN532_UART, PN532_Sim, ... and their modules, on first access
+    for module, class_name in TRANSPORTS.values():
+        if name == class_name:
+            return getattr(importlib.import_module(module, __name__), class_name)
+        if module.startswith('.') and name == module[1:]:
+            return importlib.import_module(module, __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,312 @@
+"""
+Raw frame capture and replay.
+
+capturing(PN532_UART) is a transport class that also records every frame
+written to and read from the PN532, each ready/timeout of the wait for a
+response, and the start and end of hardware resets and wake-ups, with
+monotonic timestamps, plus the serial link speed (0 if the link is not
+serial) whenever it changes, to a compact binary file:
+
+    header  b'PN532CAP' + version (1 byte) + wall clock start (double)
+    record  kind (1 byte) + time since the previous record in us (uint32)
+            + payload length (uint16) + payload
+
+PN532_Replay reads such a file and plays the PN532's side back to the
+driver, at the recorded speed, faster, or without any delays, so a session
+from the field can be re-run off-device, exactly.
+"""
+
+import struct
+import time
+
+from .pn532 import PN532, BusyError
+
+
+# pylint: disable=bad-whitespace
+MAGIC               = b'PN532CAP'
+VERSION             = 1
+HEADER              = struct.Struct('<8sBd')
+RECORD              = struct.Struct('<cIH')
+
+WRITE               = b'W'
+WRITE_ERROR         = b'w'
+READ                = b'R'
+READ_ERROR          = b'r'
+READY               = b'Y'
+NOT_READY           = b'N'
+RESET_BEGIN         = b'X'
+RESET_END           = b'x'
+WAKEUP_BEGIN        = b'K'
+WAKEUP_END          = b'k'
+LINK                = b'L'
+LINK_SPEED          = struct.Struct('<I')
+
+# Errors a read may have raised, raised again on replay
+READ_ERRORS = {'BusyError': BusyError, 'OSError': OSError}
+
+
+class FrameRecorder:
+    """Appends capture records to path. Records are buffered and flushed
+    every flush_interval seconds; once the file reaches max_bytes, recording
+    stops."""
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, flush_interval=1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.full = False
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._size = HEADER.size
+        self._last = time.monotonic_ns()
+        self._flushed = time.monotonic()
+
+    def record(self, kind, payload=b''):
+        if self._file is None or self.full:
+            return
+        now = time.monotonic_ns()
+        delta = min((now - self._last) // 1000, 0xFFFFFFFF)
+        self._last = now
+        payload = bytes(payload)
+        self._file.write(RECORD.pack(kind, delta, len(payload)) + payload)
+        self.records += 1
+        self._size += RECORD.size + len(payload)
+        if self._size >= self.max_bytes:
+            print(f"Frame capture {self.path} reached {self.max_bytes} bytes, stopped")
+            self.full = True
+            self._file.flush()
+        elif time.monotonic() - self._flushed >= self.flush_interval:
+            self._file.flush()
+            self._flushed = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_capture(path):
+    """(wall clock start, [(seconds since start, kind, payload), ...]) of a
+    capture file; a record cut off at the end of the file is ignored"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, started = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a version {VERSION} PN532 capture')
+    records = []
+    offset = HEADER.size
+    elapsed = 0
+    while offset + RECORD.size <= len(data):
+        kind, delta, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break
+        elapsed += delta
+        records.append((elapsed / 1e6, kind, data[offset:offset + length]))
+        offset += length
+    return started, records
+
+
+class CaptureMixin:
+    """Records the I/O of the transport it is mixed into; see capturing()"""
+
+    def __init__(self, *args, recorder, **kwargs):
+        # Set before the transport's __init__, so the reset, wake-up and
+        # firmware query it does are captured too
+        self.recorder = recorder
+        self._link_recorded = False
+        super().__init__(*args, **kwargs)
+
+    def _record_link(self, baudrate):
+        self.recorder.record(LINK, LINK_SPEED.pack(baudrate or 0))
+        self._link_recorded = True
+
+    def _link_baudrate(self, baudrate=None):
+        speed = super()._link_baudrate(baudrate)
+        if baudrate is not None:
+            self._record_link(speed)
+        return speed
+
+    def _write_data(self, framebytes):
+        if not self._link_recorded:
+            self._record_link(super()._link_baudrate())
+        try:
+            super()._write_data(framebytes)
+        except OSError:
+            self.recorder.record(WRITE_ERROR, framebytes)
+            raise
+        self.recorder.record(WRITE, framebytes)
+
+    def _read_data(self, count):
+        try:
+            data = super()._read_data(count)
+        except (BusyError, OSError) as e:
+            name = 'BusyError' if isinstance(e, BusyError) else 'OSError'
+            self.recorder.record(READ_ERROR, name.encode('ascii'))
+            raise
+        self.recorder.record(READ, data)
+        return data
+
+    def _wait_ready(self, timeout=1):
+        ready = super()._wait_ready(timeout)
+        self.recorder.record(READY if ready else NOT_READY)
+        return ready
+
+    def _reset(self, pin):
+        self.recorder.record(RESET_BEGIN)
+        try:
+            super()._reset(pin)
+        finally:
+            self.recorder.record(RESET_END)
+
+    def _wakeup(self):
+        self.recorder.record(WAKEUP_BEGIN)
+        try:
+            super()._wakeup()
+        finally:
+            self.recorder.record(WAKEUP_END)
+
+    def close(self):
+        """Close the transport, then the capture file, so the frames up to
+        the end are on disk"""
+        try:
+            super().close()
+        finally:
+            self.recorder.close()
+
+
+def capturing(transport):
+    """Subclass of the transport class that records its I/O; instantiate it
+    with the transport's arguments plus recorder=FrameRecorder(path)"""
+    return type(f'Capturing{transport.__name__}', (CaptureMixin, transport), {})
+
+
+class ReplayFinished(EOFError):
+    """The driver asked for more than the capture holds"""
+
+
+class ReplayMismatch(RuntimeError):
+    """The driver wrote a frame the captured session did not"""
+
+
+class PN532_Replay(PN532):
+    """Plays a capture back as a transport.
+
+    speed scales the recorded delays: 1.0 is real time, 10.0 ten times
+    faster and 0 no delays at all. Frames the driver writes are compared
+    with the captured ones; differences are counted in mismatches, or raise
+    ReplayMismatch with strict=True. Resets and wake-ups replay as a whole,
+    whatever the transport did inside them. The reader is reset on open if
+    the captured one was; reset is accepted for compatibility and ignored.
+    Past the end of the capture every call raises ReplayFinished.
+    """
+
+    def __init__(self, path, speed=1.0, strict=False, reset=None, debug=False):
+        self.debug = debug
+        self.path = path
+        self.speed = speed
+        self.strict = strict
+        self.mismatches = 0
+        self.started_at, records = read_capture(path)
+        # Link speed records only set the speed reported while replaying
+        self._records = [r for r in records if r[1] != LINK]
+        speeds = [LINK_SPEED.unpack(r[2])[0] for r in records if r[1] == LINK]
+        self._link = speeds[0] or None if speeds else None
+        self._position = 0
+        self._clock = time.monotonic()
+        # Reset on open exactly when the captured session did
+        reset = bool(self._records) and self._records[0][1] == RESET_BEGIN
+        super().__init__(debug=debug, reset=reset)
+
+    @property
+    def remaining(self):
+        """Records not replayed yet"""
+        return len(self._records) - self._position
+
+    @property
+    def position(self):
+        """Seconds into the captured session of the last replayed record"""
+        return self._records[self._position - 1][0] if self._position else 0.0
+
+    @property
+    def duration(self):
+        """Length of the captured session in seconds"""
+        return self._records[-1][0] if self._records else 0.0
+
+    def _next(self, kinds):
+        """Wait for the next record's time and return it, if it is one of
+        kinds; otherwise leave it for the next call and return None"""
+        if self._position >= len(self._records):
+            raise ReplayFinished(f'End of capture {self.path}')
+        elapsed, kind, payload = self._records[self._position]
+        if kind not in kinds:
+            return None
+        self._position += 1
+        if self.speed:
+            delay = self._clock + elapsed / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return kind, payload
+
+    def _skip_to(self, end):
+        """Replay a reset or wake-up: everything up to its end record"""
+        while True:
+            record = self._next((end,))
+            if record is not None:
+                return
+            self._position += 1
+
+    def _mismatch(self, message):
+        self.mismatches += 1
+        if self.strict:
+            raise ReplayMismatch(message)
+
+    def _gpio_init(self, **kwargs):
+        pass
+
+    def _link_baudrate(self, baudrate=None):
+        # The captured transport's speed; switching it changes nothing
+        if baudrate is not None:
+            self._link = baudrate
+        return self._link
+
+    def _reset(self, pin):
+        if self._next((RESET_BEGIN,)) is None:
+            self._mismatch('Reset that the capture does not have')
+            return
+        self._skip_to(RESET_END)
+
+    def _wakeup(self):
+        if self._next((WAKEUP_BEGIN,)) is None:
+            self._mismatch('Wake-up that the capture does not have')
+            return
+        self._skip_to(WAKEUP_END)
+
+    def _write_data(self, framebytes):
+        record = self._next((WRITE, WRITE_ERROR))
+        if record is None:
+            self._mismatch(f'Unexpected write of {bytes(framebytes).hex()}')
+            return
+        kind, payload = record
+        if payload != bytes(framebytes):
+            self._mismatch(f'Wrote {bytes(framebytes).hex()}, captured {payload.hex()}')
+        if kind == WRITE_ERROR:
+            raise OSError('Write failed in the captured session')
+
+    def _wait_ready(self, timeout=1):
+        record = self._next((READY, NOT_READY))
+        if record is None:
+            self._mismatch('Unexpected wait for the PN532')
+            return False
+        return record[0] == READY
+
+    def _read_data(self, count):
+        record = self._next((READ, READ_ERROR))
+        if record is None:
+            self._mismatch('Unexpected read')
+            raise BusyError('No data read from PN532')
+        kind, payload = record
+        if kind == READ_ERROR:
+            raise READ_ERRORS.get(payload.decode('ascii'), BusyError)('Read failed in the captured session')
+        return payload
@@ -0,0 +1,196 @@
+"""
+Host GPIO access for the PN532 transports
+The transports drive the reset, chip select and H_Request pins through a
+Pins object instead of RPi.GPIO directly, so the driver also runs on Linux
+hosts that only have the GPIO character device (gpiod), or none at all.
+Pin numbers are BCM numbers on the Raspberry Pi and line offsets of the
+chip with gpiod.
+"""
+
+BACKENDS = ('auto', 'rpi', 'gpiod', 'none')
+
+
+class Pins:
+    """Interface of a GPIO backend"""
+
+    name = None
+
+    def setup_output(self, pin, value=True):
+        raise NotImplementedError
+
+    def setup_input(self, pin):
+        raise NotImplementedError
+
+    def output(self, pin, value):
+        raise NotImplementedError
+
+    def input(self, pin):
+        raise NotImplementedError
+
+    def cleanup(self):
+        pass
+
+
+class NullPins(Pins):
+    """No GPIO: outputs are remembered but drive nothing, inputs read high.
+    For hosts where the PN532's control pins are not wired to the host."""
+
+    name = 'none'
+
+    def __init__(self):
+        self._levels = {}
+
+    def setup_output(self, pin, value=True):
+        self._levels[pin] = bool(value)
+
+    def setup_input(self, pin):
+        self._levels.setdefault(pin, True)
+
+    def output(self, pin, value):
+        self._levels[pin] = bool(value)
+
+    def input(self, pin):
+        return self._levels.get(pin, True)
+
+    def cleanup(self):
+        self._levels.clear()
+
+
+class RPiPins(Pins):
+    """RPi.GPIO, BCM numbering"""
+
+    name = 'rpi'
+
+    def __init__(self):
+        # RuntimeError when not running on a Raspberry Pi
+        import RPi.GPIO as GPIO
+        self._gpio = GPIO
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+
+    def setup_output(self, pin, value=True):
+        self._gpio.setup(pin, self._gpio.OUT, initial=self._gpio.HIGH if value else self._gpio.LOW)
+
+    def setup_input(self, pin):
+        self._gpio.setup(pin, self._gpio.IN)
+
+    def output(self, pin, value):
+        self._gpio.output(pin, bool(value))
+
+    def input(self, pin):
+        return bool(self._gpio.input(pin))
+
+    def cleanup(self):
+        self._gpio.cleanup()
+
+
+class GpiodPins(Pins):
+    """The GPIO character device through libgpiod's Python bindings, version
+    2 (gpiod.request_lines) or 1 (gpiod.Chip.get_line)"""
+
+    name = 'gpiod'
+    CONSUMER = 'pn532'
+
+    def __init__(self, chip='/dev/gpiochip0'):
+        import gpiod
+        self._gpiod = gpiod
+        self._chip = chip
+        self._v2 = hasattr(gpiod, 'request_lines')
+        if not self._v2:
+            self._chip = gpiod.Chip(chip)
+        self._lines = {}
+
+    def _request(self, pin, output, value):
+        self._release(pin)
+        gpiod = self._gpiod
+        if self._v2:
+            from gpiod.line import Direction, Value
+            settings = gpiod.LineSettings(
+                direction=Direction.OUTPUT if output else Direction.INPUT,
+                output_value=Value.ACTIVE if value else Value.INACTIVE)
+            self._lines[pin] = gpiod.request_lines(
+                self._chip, consumer=self.CONSUMER, config={pin: settings})
+        else:
+            line = self._chip.get_line(pin)
+            if output:
+                line.request(consumer=self.CONSUMER, type=gpiod.LINE_REQ_DIR_OUT,
+                             default_vals=[int(bool(value))])
+            else:
+                line.request(consumer=self.CONSUMER, type=gpiod.LINE_REQ_DIR_IN)
+            self._lines[pin] = line
+
+    def _release(self, pin):
+        line = self._lines.pop(pin, None)
+        if line is not None:
+            line.release()
+
+    def setup_output(self, pin, value=True):
+        self._request(pin, True, value)
+
+    def setup_input(self, pin):
+        self._request(pin, False, False)
+
+    def output(self, pin, value):
+        line = self._lines[pin]
+        if self._v2:
+            from gpiod.line import Value
+            line.set_value(pin, Value.ACTIVE if value else Value.INACTIVE)
+        else:
+            line.set_value(int(bool(value)))
+
+    def input(self, pin):
+        line = self._lines[pin]
+        if self._v2:
+            from gpiod.line import Value
+            return line.get_value(pin) == Value.ACTIVE
+        return bool(line.get_value())
+
+    def cleanup(self):
+        for pin in list(self._lines):
+            self._release(pin)
+
+
+def open_pins(backend='auto', chip='/dev/gpiochip0'):
+    """Pins for backend (one of BACKENDS). 'auto' tries RPi.GPIO, then gpiod,
+    and falls back to NullPins when neither is usable."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown GPIO backend {backend!r}, expected one of {BACKENDS}')
+    if backend == 'rpi':
+        return RPiPins()
+    if backend == 'gpiod':
+        return GpiodPins(chip)
+    if backend == 'none':
+        return NullPins()
+    for factory in (RPiPins, lambda: GpiodPins(chip)):
+        try:
+            return factory()
+        except (ImportError, RuntimeError, OSError):
+            continue
+    return NullPins()
+
+
+_default = None
+
+
+def default_pins():
+    """The Pins shared by transports that are not given their own; chosen
+    with open_pins('auto') on first use. use_pins() replaces it."""
+    global _default
+    if _default is None:
+        _default = open_pins()
+    return _default
+
+
+def use_pins(pins, chip='/dev/gpiochip0'):
+    """Make pins (a Pins, or a backend name for open_pins) the default.
+    A backend name that the current default already satisfies keeps it, so
+    reopening a reader does not request its lines twice."""
+    global _default
+    if isinstance(pins, str):
+        if _default is not None and pins in ('auto', _default.name):
+            return _default
+        pins = open_pins(pins, chip)
+    if _default is not None and _default is not pins:
+        _default.cleanup()
+    _default = pins
+    return _default
@@ -32,7 +32,7 @@ using I2C on the Raspberry Pi.
 import fcntl
 import os
 import time
-import RPi.GPIO as GPIO
+from .gpio import default_pins
 from .pn532 import PN532, BusyError
 
 # pylint: disable=bad-whitespace
@@ -62,58 +62,62 @@ class I2CDevice:
         """Wrapper method of os.read"""
         return os.read(self.i2c, count)
 
+    def close(self):
+        os.close(self.i2c)
+
 
 class PN532_I2C(PN532):
     """Driver for the PN532 connected over I2C."""
-    def __init__(self, irq=None, reset=None, req=None, debug=False):
+    def __init__(self, irq=None, reset=None, req=None, debug=False, pins=None):
         """Create an instance of the PN532 class using I2C. Note that PN532
         uses clock stretching. Optional IRQ pin (not used),
-        reset pin and debugging output.
+        reset pin and debugging output. pins is the gpio.Pins driving them,
+        gpio.default_pins() if None.
         """
         self.debug = debug
         self._irq = irq
         self._req = req
-        GPIO.setmode(GPIO.BCM)
+        self._pins = pins
         # With I2C, we recommend connecting RSTPD_N (reset) to a digital pin for manual
         # harware reset
-        GPIO.setup(reset, GPIO.OUT)
         # On Raspberry Pi, you must also connect a pin to P32 "H_Request" for hardware
         # wakeup! this means we don't need to do the I2C clock-stretch thing
-        GPIO.setup(req, GPIO.OUT)
         self._gpio_init(irq=irq, req=req, reset=reset)
         self._i2c = I2CDevice(I2C_CHANNEL, I2C_ADDRESS)
         super().__init__(debug=debug, reset=reset)
 
+    def close(self):
+        self._i2c.close()
+
     def _gpio_init(self, reset, irq=None, req=None):
         self._irq = irq
         self._req = req
-        GPIO.setmode(GPIO.BCM)
+        if (reset or irq or req) and self._pins is None:
+            self._pins = default_pins()
         if reset:
-            GPIO.setup(reset, GPIO.OUT)
-            GPIO.output(reset, True)
+            self._pins.setup_output(reset, True)
         if irq:
-            GPIO.setup(irq, GPIO.IN)
+            self._pins.setup_input(irq)
         if req:
-            GPIO.setup(req, GPIO.OUT)
-            GPIO.output(req, True)
+            self._pins.setup_output(req, True)
 
     def _reset(self, pin):
         """Perform a hardware reset toggle"""
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
-        GPIO.output(pin, False)
+        self._pins.output(pin, False)
         time.sleep(0.5)
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
 
     def _wakeup(self): # pylint: disable=no-self-use
         """Send any special commands/data to wake up PN532"""
         if self._req:
-            GPIO.output(self._req, True)
+            self._pins.output(self._req, True)
             time.sleep(0.1)
-            GPIO.output(self._req, False)
+            self._pins.output(self._req, False)
             time.sleep(0.1)
-            GPIO.output(self._req, True)
+            self._pins.output(self._req, True)
         time.sleep(0.5)
 
     def _wait_ready(self, timeout=10):
@@ -145,10 +149,7 @@ class PN532_I2C(PN532):
                 print(err)
             return
 
-        if self.debug:
-            print("Reading: ", [hex(i) for i in frame[1:]])
-        else:
-            time.sleep(0.1)
+        time.sleep(0.1)
         return frame[1:]   # don't return the status byte
 
     def _write_data(self, framebytes):
@@ -0,0 +1,107 @@
+"""
+Compact NDEF for NFC Forum Type 2 tags (NTAG21x).
+
+uri_record() builds a one-record message holding a URI with the standard
+prefix abbreviations (a short record: 4 header bytes plus the URI minus its
+abbreviated prefix), tlv() wraps a message for tag memory from page 4 on,
+and find_message() gets the message back out of tag memory.
+"""
+
+# pylint: disable=bad-whitespace
+# URI identifier codes of the URI record type (NDEF_URIPREFIX_* in pn532.py)
+URI_PREFIXES = (
+    '', 'http://www.', 'https://www.', 'http://', 'https://', 'tel:', 'mailto:',
+    'ftp://anonymous:anonymous@', 'ftp://ftp.', 'ftps://', 'sftp://', 'smb://',
+    'nfs://', 'ftp://', 'dav://', 'news:', 'telnet://', 'imap:', 'rtsp://', 'urn:',
+    'pop:', 'sip:', 'sips:', 'tftp:', 'btspp://', 'btl2cap://', 'btgoep://',
+    'tcpobex://', 'irdaobex://', 'file://', 'urn:epc:id:', 'urn:epc:tag:',
+    'urn:epc:pat:', 'urn:epc:raw:', 'urn:epc:', 'urn:nfc:',
+)
+
+TNF_WELL_KNOWN      = 0x01
+FLAG_MB             = 0x80
+FLAG_ME             = 0x40
+FLAG_SR             = 0x10
+FLAG_IL             = 0x08
+
+TLV_NULL            = 0x00
+TLV_NDEF            = 0x03
+TLV_TERMINATOR      = 0xFE
+
+CC_MAGIC            = 0xE1
+# First page of the data area; page 3 is the capability container
+USER_PAGE           = 4
+# pylint: enable=bad-whitespace
+
+
+def uri_record(uri):
+    """NDEF message with one URI record for uri"""
+    code = max(range(len(URI_PREFIXES)),
+               key=lambda i: len(URI_PREFIXES[i]) if uri.startswith(URI_PREFIXES[i]) else -1)
+    payload = bytes([code]) + uri[len(URI_PREFIXES[code]):].encode('utf-8')
+    if len(payload) < 256:
+        header = bytes([FLAG_MB | FLAG_ME | FLAG_SR | TNF_WELL_KNOWN, 1, len(payload)])
+    else:
+        header = bytes([FLAG_MB | FLAG_ME | TNF_WELL_KNOWN, 1]) + len(payload).to_bytes(4, 'big')
+    return header + b'U' + payload
+
+
+def parse_uri_record(message):
+    """The URI of a message whose first record is a URI record, else None"""
+    if len(message) < 3 or message[0] & 0x07 != TNF_WELL_KNOWN:
+        return None
+    flags, type_length = message[0], message[1]
+    if flags & FLAG_SR:
+        payload_length, offset = message[2], 3
+    else:
+        payload_length, offset = int.from_bytes(message[2:6], 'big'), 6
+    if flags & FLAG_IL:
+        id_length = message[offset]
+        offset += 1
+    else:
+        id_length = 0
+    record_type = bytes(message[offset:offset + type_length])
+    offset += type_length + id_length
+    payload = bytes(message[offset:offset + payload_length])
+    if record_type != b'U' or not payload or len(payload) != payload_length:
+        return None
+    prefix = URI_PREFIXES[payload[0]] if payload[0] < len(URI_PREFIXES) else ''
+    return prefix + payload[1:].decode('utf-8', 'replace')
+
+
+def tlv(message):
+    """message as an NDEF TLV followed by the terminator TLV"""
+    if len(message) < 0xFF:
+        length = bytes([len(message)])
+    else:
+        length = b'\xFF' + len(message).to_bytes(2, 'big')
+    return bytes([TLV_NDEF]) + length + bytes(message) + bytes([TLV_TERMINATOR])
+
+
+def find_message(data):
+    """The NDEF message of the first NDEF TLV in data (tag memory from page
+    4 on): b'' for an empty message, None if data has no NDEF TLV. A message
+    running past the end of data is returned as far as data reaches."""
+    offset = 0
+    while offset < len(data):
+        tag = data[offset]
+        if tag == TLV_NULL:
+            offset += 1
+            continue
+        if tag == TLV_TERMINATOR or offset + 1 >= len(data):
+            return None
+        length, offset = data[offset + 1], offset + 2
+        if length == 0xFF:
+            length, offset = int.from_bytes(data[offset:offset + 2], 'big'), offset + 2
+        if tag == TLV_NDEF:
+            return bytes(data[offset:offset + length])
+        offset += length
+    return None
+
+
+def capacity(capability_container):
+    """Bytes in the data area of a tag with this capability container (page
+    3), or None if the tag is not formatted for NDEF"""
+    if len(capability_container) < 4 or capability_container[0] != CC_MAGIC:
+        return None
+    return capability_container[2] * 8
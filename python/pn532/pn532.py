@@ -32,7 +32,7 @@ This module will let you communicate with a PN532 NFC Hat using I2C, SPI or UART
 The main difference is the interfaces implements.
 """
 
-import RPi.GPIO as GPIO
+import time
 
 
 # pylint: disable=bad-whitespace
@@ -95,6 +95,79 @@ MIFARE_CMD_DECREMENT                = 0xC0
 MIFARE_CMD_INCREMENT                = 0xC1
 MIFARE_CMD_STORE                    = 0xC2
 MIFARE_ULTRALIGHT_CMD_WRITE         = 0xA2
+NTAG_CMD_FAST_READ                  = 0x3A
+
+# Well-known Mifare Classic keys tried by mifare_classic_read_sector()
+MIFARE_DEFAULT_KEYS = (
+    b'\xFF\xFF\xFF\xFF\xFF\xFF',   # factory default
+    b'\xA0\xA1\xA2\xA3\xA4\xA5',   # MAD key A
+    b'\xD3\xF7\xD3\xF7\xD3\xF7',   # NDEF key A
+    b'\x00\x00\x00\x00\x00\x00',
+)
+
+# SetSerialBaudRate codes of the supported host link speeds
+SERIAL_BAUD_RATES = {
+    9600: 0x00,
+    19200: 0x01,
+    38400: 0x02,
+    57600: 0x03,
+    115200: 0x04,
+    230400: 0x05,
+    460800: 0x06,
+    921600: 0x07,
+    1288000: 0x08,
+}
+
+# RFConfiguration items
+RFCONFIG_FIELD                      = 0x01
+RFCONFIG_TIMINGS                    = 0x02
+RFCONFIG_MAX_RTY_COM                = 0x04
+RFCONFIG_MAX_RETRIES                = 0x05
+RFCONFIG_ANALOG_106A                = 0x0A
+
+# Retry count meaning "retry forever"
+RF_RETRY_FOREVER                    = 0xFF
+
+# Analog settings for 106 kbps type A (CIU_RFCfg, CIU_GsNOn, CIU_CWGsP,
+# CIU_ModGsP, CIU_DemodWhenRFOn, CIU_RxThreshold, CIU_DemodWhenRFOff,
+# CIU_GsNOff, CIU_ModWidth, CIU_MifNFC, CIU_TxBitPhase)
+RF_ANALOG_106A_DEFAULT = (0x59, 0xF4, 0x3F, 0x11, 0x4D, 0x85, 0x61, 0x6F, 0x26, 0x62, 0x87)
+# Maximum receiver gain (48 dB) to pick up weak answers from far tags
+RF_ANALOG_106A_LONG_RANGE = (0x79, 0xF4, 0x3F, 0x11, 0x4D, 0x55, 0x61, 0x6F, 0x26, 0x62, 0x87)
+# Weaker carrier (lower CWGsP conductance) to draw less current
+RF_ANALOG_106A_LOW_POWER = (0x59, 0xF4, 0x20, 0x11, 0x4D, 0x85, 0x61, 0x6F, 0x26, 0x62, 0x87)
+
+# Named settings for rf_profile().  max_retries is (MxRtyATR, MxRtyPSL,
+# MxRtyPassiveActivation), timeouts is (ATR_RES timeout, retry timeout) in
+# seconds.
+RF_PROFILES = {
+    # Chip defaults: InListPassiveTarget searches until the host gives up
+    'default': {
+        'max_retries': (RF_RETRY_FOREVER, 0x01, RF_RETRY_FOREVER),
+        'timeouts': (0.1024, 0.0512),
+        'analog_106a': RF_ANALOG_106A_DEFAULT,
+    },
+    # Few activation attempts and short timeouts: an empty field or a
+    # removed tag is reported within milliseconds
+    'fast_presence': {
+        'max_retries': (0x00, 0x01, 0x02),
+        'timeouts': (0.0512, 0.0128),
+        'analog_106a': RF_ANALOG_106A_DEFAULT,
+    },
+    # Keep searching with maximum receiver gain and generous timeouts
+    'long_range': {
+        'max_retries': (RF_RETRY_FOREVER, 0x02, RF_RETRY_FOREVER),
+        'timeouts': (0.2048, 0.1024),
+        'analog_106a': RF_ANALOG_106A_LONG_RANGE,
+    },
+    # One activation attempt per poll with a weaker carrier; pair it with
+    # a long pause between polls
+    'low_power': {
+        'max_retries': (0x00, 0x00, 0x00),
+        'timeouts': (0.0512, 0.0256),
+        'analog_106a': RF_ANALOG_106A_LOW_POWER,
+    },
+}
 
 # Prefixes for NDEF Records (to identify record type)
 NDEF_URIPREFIX_NONE                 = 0x00
@@ -136,6 +209,15 @@ NDEF_URIPREFIX_URN_NFC              = 0x23
 
 _GPIO_VALIDATIONBIT            = 0x80
 
+# Registers per ReadRegister (2 address bytes each) and WriteRegister (2
+# address bytes and the value) frame; a frame carries up to 252 parameters
+_REGISTERS_PER_READ            = 126
+_REGISTERS_PER_WRITE           = 84
+# NTAG pages per FAST_READ that fit in one response frame
+_NTAG_PAGES_PER_FAST_READ      = 60
+# Mifare Classic cards whose sector keys mifare_classic_read_all() remembers
+_CLASSIC_KEY_CACHE_CARDS       = 16
+
 _ACK                           = b'\x00\x00\xFF\x00\xFF\x00'
 _FRAME_START                   = b'\x00\x00\xFF'
 # pylint: enable=bad-whitespace
@@ -182,6 +264,99 @@ class BusyError(Exception):
     """Base class for exceptions in this module."""
     pass
 
+class AckTimeoutError(BusyError):
+    """No ACK from the PN532: it is silent or wedged"""
+    pass
+
+class ResponseTimeoutError(BusyError):
+    """The PN532 acknowledged a command but did not answer in time"""
+    pass
+
+class FrameError(RuntimeError):
+    """Malformed or unexpected response frame"""
+    pass
+
+class ChecksumError(FrameError):
+    """Response frame with a bad length or data checksum"""
+    pass
+
+class AckError(RuntimeError):
+    """The PN532 did not acknowledge a command"""
+    pass
+
+
+class FrameParser:
+    """Splits a byte stream from the PN532 into frames as bytes arrive.
+
+    feed() returns the frames completed by the new bytes, each as its raw
+    bytes normalised to start with 00 00 FF and end with the postamble, so
+    _read_frame() can parse them: ACK and NACK frames and normal information
+    frames (extended frames are not used by this driver). Other non-zero
+    bytes are dropped and counted in discarded; a frame whose
+    length checksum is wrong is dropped the same way. The data checksum is
+    left to _read_frame().
+    """
+
+    NACK = b'\x00\x00\xFF\xFF\x00\x00'
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.discarded = 0
+
+    def reset(self):
+        self.discarded += len(self._buffer)
+        self._buffer.clear()
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = buffer.find(b'\x00\xFF')
+            if start < 0:
+                # Keep a trailing 0x00, it may be the start of the next frame
+                keep = 1 if buffer.endswith(b'\x00') else 0
+                self.discarded += len(buffer[:len(buffer) - keep].strip(b'\x00'))
+                del buffer[:len(buffer) - keep]
+                return frames
+            # Preambles and postambles are zeros and not counted
+            self.discarded += len(buffer[:start].strip(b'\x00'))
+            del buffer[:start]
+            if len(buffer) < 4:
+                return frames
+            length, length_checksum = buffer[2], buffer[3]
+            if (length, length_checksum) in ((0x00, 0xFF), (0xFF, 0x00)):
+                # ACK / NACK; the postamble may follow
+                frames.append(_ACK if length == 0x00 else self.NACK)
+                del buffer[:4]
+                continue
+            if (length + length_checksum) & 0xFF != 0:
+                self.discarded += 2
+                del buffer[:2]
+                continue
+            if len(buffer) < 5 + length:
+                return frames
+            frames.append(b'\x00' + bytes(buffer[:5 + length]) + b'\x00')
+            del buffer[:5 + length]
+
+
+def rf_timeout_code(seconds):
+    """Smallest RFConfiguration timeout code (100 us * 2^(n-1)) that is at
+    least `seconds`; 0 means no timeout"""
+    if seconds <= 0:
+        return 0x00
+    for code in range(0x01, 0x10):
+        if 0.0001 * 2 ** (code - 1) >= seconds - 1e-9:
+            return code
+    return 0x10
+
+
+def _error_message(err):
+    """Readable message for an exception raised while talking to a card."""
+    if isinstance(err, PN532Error):
+        return err.errmsg
+    return str(err) or type(err).__name__
+
 
 class PN532:
     """PN532 driver base, must be extended for I2C/SPI/UART interfacing"""
@@ -190,6 +365,18 @@ class PN532:
         """Create an instance of the PN532 class
         """
         self.debug = debug
+        self._hooks = []
+        if debug:
+            from .profiler import DebugHook
+            self.add_hook(DebugHook())
+        self._target_uid = None
+        self._target_sak = None
+        # uid -> {sector: (key_number, key)} of recently read Mifare Classic
+        # cards, see mifare_classic_read_all()
+        self._classic_keys = {}
+        self._reset_pin = reset
+        # Last known P3/P7 levels, see write_gpio()
+        self._gpio_shadow = None
         if reset:
             if debug:
                 print("Resetting")
@@ -199,7 +386,7 @@ class PN532:
             self._wakeup()
             self.get_firmware_version() # first time often fails, try 2ce
             return
-        except (BusyError, RuntimeError):
+        except (BusyError, RuntimeError, OSError):
             pass
         self.get_firmware_version()
 
@@ -230,6 +417,22 @@ class PN532:
         # Send special command to wake up
         raise NotImplementedError
 
+    def _discard_input(self):
+        # Drop bytes that arrived but were not read yet.  Only transports
+        # that buffer input (serial links) implement this.
+        pass
+
+    def close(self):
+        """Release the port or device the transport opened; the reader
+        cannot be used afterwards"""
+        pass
+
+    def _link_baudrate(self, baudrate=None):
+        # Return the host side speed of a serial link, after switching it
+        # to baudrate if given.  Only serial transports implement this;
+        # None means there is no serial link (I2C, SPI).
+        return None
+
     def _write_frame(self, data):
         """Write a frame to the PN532 with the specified data bytearray."""
         assert data is not None and 1 < len(data) < 255, 'Data must be array of 1 to 255 bytes.'
@@ -254,8 +457,6 @@ class PN532:
         frame[-2] = ~checksum & 0xFF
         frame[-1] = _POSTAMBLE
         # Send frame.
-        if self.debug:
-            print('Write frame: ', [hex(i) for i in frame])
         self._write_data(bytes(frame))
 
     def _read_frame(self, length):
@@ -266,28 +467,26 @@ class PN532:
         """
         # Read frame with expected length of data.
         response = self._read_data(length+7)
-        if self.debug:
-            print('Read frame:', [hex(i) for i in response])
 
         # Swallow all the 0x00 values that preceed 0xFF.
         offset = 0
         while response[offset] == 0x00:
             offset += 1
             if offset >= len(response):
-                raise RuntimeError('Response frame preamble does not contain 0x00FF!')
+                raise FrameError('Response frame preamble does not contain 0x00FF!')
         if response[offset] != 0xFF:
-            raise RuntimeError('Response frame preamble does not contain 0x00FF!')
+            raise FrameError('Response frame preamble does not contain 0x00FF!')
         offset += 1
         if offset >= len(response):
-            raise RuntimeError('Response contains no data!')
+            raise FrameError('Response contains no data!')
         # Check length & length checksum match.
         frame_len = response[offset]
         if (frame_len + response[offset+1]) & 0xFF != 0:
-            raise RuntimeError('Response length checksum did not match length!')
+            raise ChecksumError('Response length checksum did not match length!')
         # Check frame checksum value matches bytes.
         checksum = sum(response[offset+2:offset+2+frame_len+1]) & 0xFF
         if checksum != 0:
-            raise RuntimeError('Response checksum did not match expected value: ', checksum)
+            raise ChecksumError('Response checksum did not match expected value: ', checksum)
         # Return frame data.
         return response[offset+2:offset+2+frame_len]
 
@@ -296,8 +495,9 @@ class PN532:
         bytes back in a response.  Note that less than the expected bytes might
         be returned!  Params can optionally specify an array of bytes to send as
         parameters to the function call.  Will wait up to timeout seconds
-        for a response and return a bytearray of response bytes, or None if no
-        response is available within the timeout.
+        for a response and return a bytearray of response bytes; raises
+        AckTimeoutError or ResponseTimeoutError (both BusyError) if the PN532
+        does not answer within the timeout.
         """
         # Build frame data with command and parameters.
         if params is None:
@@ -307,34 +507,144 @@ class PN532:
         data[1] = command & 0xFF
         for i, val in enumerate(params):
             data[2+i] = val
-        # Send frame and wait for response.
+        if not self._hooks:
+            return self._exchange(data, command, response_length, timeout, None)
+        # Profiling path: time the ACK and response waits for the hooks.
+        for hook in self._hooks:
+            hook.before_command(command, len(params))
+        timing = [time.perf_counter()]
+        response = error = None
+        try:
+            response = self._exchange(data, command, response_length, timeout, timing)
+            return response
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            end = time.perf_counter()
+            written, acked = (timing[1:] + [end, end])[:2]
+            for hook in self._hooks:
+                hook.after_command(command, len(params), acked - written, end - acked,
+                                   end - timing[0], response, error)
+
+    def _exchange(self, data, command, response_length, timeout, timing):
+        # Send frame and wait for response.  Appends the time the frame was
+        # written and the time the ACK was read to timing, if given.  Raises
+        # AckTimeoutError if the PN532 does not acknowledge the command and
+        # ResponseTimeoutError if it does but does not answer in time.
         try:
             self._write_frame(data)
         except OSError:
+            # Usually a sleeping PN532; wake it for the next command
             self._wakeup()
-            return None
+            raise
+        if timing is not None:
+            timing.append(time.perf_counter())
         if not self._wait_ready(timeout):
-            return None
+            raise AckTimeoutError('No ACK from PN532')
         # Verify ACK response and wait to be ready for function response.
         if not _ACK == self._read_data(len(_ACK)):
-            raise RuntimeError('Did not receive expected ACK from PN532!')
+            raise AckError('Did not receive expected ACK from PN532!')
+        if timing is not None:
+            timing.append(time.perf_counter())
         if not self._wait_ready(timeout):
-            return None
+            raise ResponseTimeoutError('No response from PN532')
         # Read response bytes.
         response = self._read_frame(response_length+2)
         # Check that response is for the called function.
         if not (response[0] == _PN532TOHOST and response[1] == (command+1)):
-            raise RuntimeError('Received unexpected command response!')
+            raise FrameError('Received unexpected command response!')
         # Return response data.
         return response[2:]
 
+    def call_functions(self, calls, timeout=1):
+        """Run several commands back to back.  calls is a list of (command,
+        params, response_length) tuples; returns the list of their responses.
+        Transports that can have several commands in flight (pn532.tcp) send
+        them all before waiting for the first response.
+        """
+        return [self.call_function(command, response_length=response_length,
+                                   params=params, timeout=timeout)
+                for command, params, response_length in calls]
+
+    def add_hook(self, hook):
+        """Register a profiling hook (see pn532.profiler.CommandHook) that is
+        called before and after every call_function.  Without hooks
+        call_function takes no timestamps at all.
+        """
+        if hook not in self._hooks:
+            self._hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        """Unregister a hook added with add_hook"""
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def resync(self):
+        """Abort whatever command the PN532 is processing and drop any stale
+        bytes, so the next command starts on a frame boundary.  Sending an
+        ACK frame to the PN532 aborts the current command.
+        """
+        try:
+            self._write_data(_ACK)
+        except OSError:
+            self._wakeup()
+        time.sleep(0.01)
+        self._discard_input()
+
+    @property
+    def link_baudrate(self):
+        """Current speed of the serial link to the PN532, None if the
+        transport is not serial"""
+        return self._link_baudrate()
+
+    def set_serial_baudrate(self, baudrate):
+        """Switch the serial link to baudrate (one of SERIAL_BAUD_RATES) with
+        SetSerialBaudRate.  The new speed is verified with a firmware query;
+        if the link does not carry it, the previous speed is restored, by a
+        hardware reset if necessary.  Returns the speed in use afterwards.
+        """
+        if baudrate not in SERIAL_BAUD_RATES:
+            raise ValueError('Unsupported baud rate %d, expected one of %s'
+                             % (baudrate, ', '.join(str(b) for b in sorted(SERIAL_BAUD_RATES))))
+        previous = self._link_baudrate()
+        if previous is None:
+            raise RuntimeError('SetSerialBaudRate needs a serial transport')
+        if baudrate == previous:
+            return previous
+        response = self.call_function(_COMMAND_SETSERIALBAUDRATE,
+                                      params=[SERIAL_BAUD_RATES[baudrate]])
+        # The PN532 changes speed once the host acknowledges the response.
+        self._write_data(_ACK)
+        self._link_baudrate(baudrate)
+        time.sleep(0.001)
+        try:
+            self.get_firmware_version()
+            return baudrate
+        except (BusyError, RuntimeError, OSError):
+            pass
+        # Maybe the PN532 never switched.
+        self._link_baudrate(previous)
+        try:
+            self.get_firmware_version()
+            return previous
+        except (BusyError, RuntimeError, OSError):
+            pass
+        # It did, but the link does not carry the new speed: a reset brings
+        # the PN532 back to its power-up speed.
+        if not self._reset_pin:
+            raise RuntimeError('PN532 lost after switching to %d baud' % baudrate)
+        self._reset(self._reset_pin)
+        self._wakeup()
+        self.get_firmware_version()
+        return self._link_baudrate()
+
     def get_firmware_version(self):
         """Call PN532 GetFirmwareVersion function and return a tuple with the IC,
         Ver, Rev, and Support values.
         """
         response = self.call_function(_COMMAND_GETFIRMWAREVERSION, 4, timeout=0.5)
-        if response is None:
-            raise RuntimeError('Failed to detect the PN532')
         return tuple(response)
 
     def SAM_configuration(self):   # pylint: disable=invalid-name
@@ -347,6 +657,42 @@ class PN532:
         # check the command was executed as expected.
         self.call_function(_COMMAND_SAMCONFIGURATION, params=[0x01, 0x14, 0x01])
 
+    def rf_configure(self, item, data):
+        """Send an RFConfiguration command: item is one of the RFCONFIG_*
+        configuration items, data its configuration bytes."""
+        self.call_function(_COMMAND_RFCONFIGURATION, params=bytes([item]) + bytes(data))
+
+    def rf_field(self, on=True, auto_rfca=False):
+        """Switch the RF field on or off, optionally with RF collision avoidance"""
+        self.rf_configure(RFCONFIG_FIELD, [(0x02 if auto_rfca else 0x00) | (0x01 if on else 0x00)])
+
+    def rf_timeouts(self, atr_res=0.1024, retry=0.0512):
+        """Set the ATR_RES timeout and the timeout of InDataExchange and
+        InCommunicateThru, in seconds (rounded up to what the chip supports)."""
+        self.rf_configure(RFCONFIG_TIMINGS, [0x00, rf_timeout_code(atr_res), rf_timeout_code(retry)])
+
+    def rf_max_retries(self, atr=RF_RETRY_FOREVER, psl=0x01, passive_activation=RF_RETRY_FOREVER):
+        """Set the retries of ATR_REQ, PSL_REQ and passive activation
+        (InListPassiveTarget).  0 means one try, RF_RETRY_FOREVER no limit."""
+        self.rf_configure(RFCONFIG_MAX_RETRIES, [atr, psl, passive_activation])
+
+    def rf_analog_106a(self, settings=RF_ANALOG_106A_DEFAULT):
+        """Set the 11 analog register values used at 106 kbps type A"""
+        if len(settings) != 11:
+            raise ValueError('106 kbps type A analog settings are 11 bytes')
+        self.rf_configure(RFCONFIG_ANALOG_106A, settings)
+
+    def rf_profile(self, name):
+        """Apply one of the RF_PROFILES by name"""
+        try:
+            profile = RF_PROFILES[name]
+        except KeyError:
+            raise ValueError('Unknown RF profile %r, expected one of %s'
+                             % (name, ', '.join(sorted(RF_PROFILES))))
+        self.rf_max_retries(*profile['max_retries'])
+        self.rf_timeouts(*profile['timeouts'])
+        self.rf_analog_106a(profile['analog_106a'])
+
     def read_passive_target(self, card_baud=_MIFARE_ISO14443A, timeout=1):
         """Wait for a MiFare card to be available and return its UID when found.
         Will wait up to timeout seconds and return None if no card is found,
@@ -358,19 +704,65 @@ class PN532:
                                           params=[0x01, card_baud],
                                           response_length=19,
                                           timeout=timeout)
-        except BusyError:
+        except ResponseTimeoutError:
+            # The PN532 took the command but found no card within timeout.
+            # A PN532 that does not acknowledge it at all raises instead.
+            self._target_uid = None
             return None # no card found!
-        # If no response is available return None to indicate no card is present.
-        if response is None:
+        # With limited MxRtyPassiveActivation retries the PN532 answers with
+        # zero targets instead.
+        if response[0] == 0x00:
+            self._target_uid = None
             return None
         # Check only 1 card with up to a 7 byte UID is present.
         if response[0] != 0x01:
             raise RuntimeError('More than one card detected!')
         if response[5] > 7:
             raise RuntimeError('Found card with unexpectedly long UID!')
+        # Remember the selected card for target_present().
+        self._target_uid = bytes(response[6:6+response[5]])
+        self._target_sak = response[4]
         # Return UID of card.
         return response[6:6+response[5]]
 
+    def target_present(self, timeout=0.1):
+        """Check whether the card selected by the last read_passive_target call
+        is still in the field, without running a full anticollision loop.
+        Depending on the card type this sends a Diagnose attention request
+        (ISO14443-4), a READ of page 0 (Ultralight/NTAG) or selects the card
+        directly by its UID (Mifare Classic).  Returns True if the card
+        answered, otherwise False; callers should then fall back to
+        read_passive_target.
+        """
+        uid = self._target_uid
+        if uid is None:
+            return False
+        sak = self._target_sak
+        try:
+            if sak & 0x20:
+                # ISO/IEC14443-4 card presence detection.
+                response = self.call_function(_COMMAND_DIAGNOSE, params=[0x06],
+                                              response_length=1, timeout=timeout)
+                present = response[0] == 0x00
+            elif sak == 0x00:
+                # Ultralight/NTAG: reading a page keeps the card active.
+                response = self.call_function(_COMMAND_INDATAEXCHANGE,
+                                              params=[0x01, MIFARE_CMD_READ, 0x00],
+                                              response_length=17, timeout=timeout)
+                present = response[0] == 0x00
+            else:
+                # Mifare Classic: select the known UID, skipping anticollision.
+                response = self.call_function(_COMMAND_INLISTPASSIVETARGET,
+                                              params=bytes([0x01, _MIFARE_ISO14443A]) + uid,
+                                              response_length=19, timeout=timeout)
+                present = (response[0] == 0x01
+                           and bytes(response[6:6+response[5]]) == uid)
+        except (BusyError, RuntimeError):
+            present = False
+        if not present:
+            self._target_uid = None
+        return present
+
     def mifare_classic_authenticate_block(self, uid, block_number, key_number, key):   # pylint: disable=invalid-name
         """Authenticate specified block number for a MiFare classic card.  Uid
         should be a byte array with the UID of the card, block number should be
@@ -434,6 +826,108 @@ class PN532:
             raise PN532Error(response[0])
         return response[0] == 0x0
 
+    @staticmethod
+    def mifare_classic_sector_blocks(sector):
+        """Return the range of block numbers that make up a Mifare Classic
+        sector.  Sectors 0-31 hold 4 blocks, sectors 32-39 (4K cards only)
+        hold 16 blocks.  The last block of each range is the sector trailer.
+        """
+        if sector < 32:
+            return range(sector * 4, sector * 4 + 4)
+        first = 128 + (sector - 32) * 16
+        return range(first, first + 16)
+
+    def mifare_classic_read_sector(self, uid, sector, keys=MIFARE_DEFAULT_KEYS,
+                                   key_numbers=(MIFARE_CMD_AUTH_A,)):
+        """Authenticate a Mifare Classic sector once and read all of its blocks
+        back to back.  Uid should be the byte array returned by
+        read_passive_target, keys an iterable of 6 byte candidate keys and
+        key_numbers the key types to try (MIFARE_CMD_AUTH_A and/or
+        MIFARE_CMD_AUTH_B).  A failed authentication halts the card, so the
+        card is selected again before the next candidate is tried.
+
+        Never raises on card errors.  Returns a dict with the keys 'sector',
+        'key_number', 'key' (None if no candidate worked), 'blocks' (a list of
+        16 byte bytearrays, or None for blocks that could not be read) and
+        'error' (None, or the error message of the last failure).
+        """
+        candidates = [(key_number, bytes(key)) for key_number in key_numbers for key in keys]
+        result, _ = self._mifare_classic_read_sector(uid, sector, candidates, True)
+        return result
+
+    def mifare_classic_read_all(self, uid, keys=MIFARE_DEFAULT_KEYS,
+                                key_numbers=(MIFARE_CMD_AUTH_A,), sectors=16):
+        """Dump a whole Mifare Classic card sector by sector (16 sectors for
+        1K cards, 40 for 4K cards).  The key that opened a sector is cached
+        for that sector of the card and tried first the next time it is read.
+        A sector without a cached key tries the key that opened most sectors
+        so far first, then the others in the configured order, so a card
+        using a single key needs exactly one authentication frame plus one
+        read frame per block, and a sector on another key does not make the
+        next one pay for it.  Returns a list with one
+        mifare_classic_read_sector result per sector.
+        """
+        configured = [(key_number, bytes(key)) for key_number in key_numbers for key in keys]
+        uid = bytes(uid)
+        cached = self._classic_keys.pop(uid, {})
+        # Most recently read card last; a handful of cards is plenty
+        self._classic_keys[uid] = cached
+        while len(self._classic_keys) > _CLASSIC_KEY_CACHE_CARDS:
+            del self._classic_keys[next(iter(self._classic_keys))]
+        opened = {}
+        results = []
+        selected = True
+        for sector in range(sectors):
+            first = [cached[sector]] if sector in cached else []
+            if opened:
+                first.append(max(opened, key=opened.get))
+            candidates = [key for key in dict.fromkeys(first + configured) if key in configured]
+            result, selected = self._mifare_classic_read_sector(uid, sector, candidates, selected)
+            if result['key'] is not None:
+                working = (result['key_number'], result['key'])
+                cached[sector] = working
+                opened[working] = opened.get(working, 0) + 1
+            results.append(result)
+        return results
+
+    def _mifare_classic_read_sector(self, uid, sector, candidates, selected):
+        # Returns the sector result and whether the card is still selected.
+        blocks = self.mifare_classic_sector_blocks(sector)
+        result = {'sector': sector, 'key_number': None, 'key': None,
+                  'blocks': [None] * len(blocks), 'error': None}
+        for key_number, key in candidates:
+            if not selected and not self._mifare_classic_reselect(uid):
+                result['error'] = 'Card left the field'
+                return result, False
+            try:
+                self.mifare_classic_authenticate_block(uid, blocks[0], key_number, key)
+            except (PN532Error, BusyError, RuntimeError) as err:
+                result['error'] = _error_message(err)
+                selected = False
+                continue
+            result['key_number'] = key_number
+            result['key'] = key
+            result['error'] = None
+            for i, block_number in enumerate(blocks):
+                try:
+                    result['blocks'][i] = self.mifare_classic_read_block(block_number)
+                except (PN532Error, BusyError, RuntimeError) as err:
+                    # The card drops its authentication after an error.
+                    result['error'] = _error_message(err)
+                    return result, False
+            return result, True
+        return result, selected
+
+    def _mifare_classic_reselect(self, uid):
+        """Select the card again after it was halted by a failed command.
+        Returns True if the same card answered.
+        """
+        try:
+            found = self.read_passive_target(timeout=0.2)
+        except RuntimeError:
+            return False
+        return found is not None and bytes(found) == bytes(uid)
+
     def ntag2xx_write_block(self, block_number, data):
         """Write a block of data to the card.  Block number should be the block
         to write and data should be a byte array of length 4 with the data to
@@ -463,6 +957,52 @@ class PN532:
         """
         return self.mifare_classic_read_block(block_number)[0:4] # only 4 bytes per page
 
+    def ntag2xx_fast_read(self, start, end):
+        """Read the NTAG21x pages start to end (inclusive) with FAST_READ, up
+        to 60 pages per frame instead of 4 per READ.  Returns a bytearray of
+        4 bytes per page.
+        """
+        calls = []
+        for first in range(start, end + 1, _NTAG_PAGES_PER_FAST_READ):
+            last = min(first + _NTAG_PAGES_PER_FAST_READ - 1, end)
+            calls.append((_COMMAND_INCOMMUNICATETHRU,
+                          bytes([NTAG_CMD_FAST_READ, first & 0xFF, last & 0xFF]),
+                          1 + (last - first + 1) * 4))
+        data = bytearray()
+        for (_, params, response_length), response in zip(calls, self.call_functions(calls)):
+            if response[0]:
+                raise PN532Error(response[0])
+            if len(response) != response_length:
+                raise RuntimeError(f'FAST_READ of pages {params[1]}-{params[2]} returned '
+                                   f'{len(response) - 1} bytes')
+            data += response[1:]
+        return data
+
+    def ntag2xx_write_pages(self, start, data, current=None):
+        """Write data, padded with zeros to whole pages, to the NTAG pages
+        from start on.  If current holds what those pages contain now (as read
+        by ntag2xx_fast_read), pages that already hold their new bytes are not
+        written.  The first page (for NDEF the TLV header with the message
+        length) is written on its own once all others are written, so it
+        changes only if everything after it is in place; the others go out
+        last to first in one batch.  Returns the numbers of the pages written.
+        """
+        data = bytes(data) + bytes(-len(data) % 4)
+        pages = [(start + offset // 4, data[offset:offset + 4])
+                 for offset in range(0, len(data), 4)
+                 if current is None or bytes(current[offset:offset + 4]) != data[offset:offset + 4]]
+        calls = [(_COMMAND_INDATAEXCHANGE,
+                  bytes([0x01, MIFARE_ULTRALIGHT_CMD_WRITE, page & 0xFF]) + chunk, 1)
+                 for page, chunk in reversed(pages)]
+        # A pipelining transport runs a whole batch even if a write in it
+        # fails, so the header page waits for the answers to the rest
+        batches = [calls[:-1], calls[-1:]] if pages and pages[0][0] == start else [calls]
+        for batch in batches:
+            for response in self.call_functions(batch):
+                if response[0]:
+                    raise PN532Error(response[0])
+        return [page for page, _ in pages]
+
     def read_gpio(self, pin=None):
         """Read the state of the PN532's GPIO pins.
         :params pin: <str> specified the pin to read
@@ -479,6 +1019,7 @@ class PN532:
         If 'pin' is not None, returns the specified pin state.
         """
         response = self.call_function(_COMMAND_READGPIO, response_length=3)
+        self._gpio_shadow = [response[0], response[1]]
         if not pin:
             return tuple(response[:3])
         pins = {'p3': response[0], 'p7': response[1], 'i': response[2]}
@@ -508,33 +1049,68 @@ class PN532:
         the port P32 without applying a value to the ports P30, P31, P33, P34
         and P35.
 
-        If p3 and p7 are None, set one pin with the params 'pin' and 'state'
+        If p3 and p7 are None, set one pin with the params 'pin' and 'state'.
+        The other pins of the port keep the levels last read or written,
+        from a shadow copy, so only the first single pin write needs a
+        read_gpio() round trip.  The shadow survives a chip reset, so the
+        next write restores the levels the application had set.
         """
         params = bytearray(2)
         if (p3 is not None) or (p7 is not None):
             # 0x80, the validation bit.
-            params[0] = 0x80 | p3 & 0xFF if p3 else 0x00
-            params[1] = 0x80 | p7 & 0xFF if p7 else 0x00
+            params[0] = _GPIO_VALIDATIONBIT | p3 & 0xFF if p3 is not None else 0x00
+            params[1] = _GPIO_VALIDATIONBIT | p7 & 0xFF if p7 is not None else 0x00
             self.call_function(_COMMAND_WRITEGPIO, params=params)
         else:
-            if pin[:-1].lower() not in ('p3', 'p7'):
+            port = pin[:-1].lower()
+            if port not in ('p3', 'p7'):
                 return
-            p3, p7, _ = self.read_gpio()
-            if pin[:-1].lower() == 'p3':
-                if state:
-                    # 0x80, the validation bit.
-                    params[0] = 0x80 | p3 | (1 << int(pin[-1])) & 0xFF
-                else:
-                    params[0] = 0x80 | p3 & ~(1 << int(pin[-1])) & 0xFF
-                params[1] = 0x00    # leave p7 unchanged
-            if pin[:-1].lower() == 'p7':
-                if state:
-                    # 0x80, the validation bit.
-                    params[1] = 0x80 | p7 | (1 << int(pin[-1])) & 0xFF
-                else:
-                    params[1] = 0x80 | p7 & ~(1 << int(pin[-1])) & 0xFF
-                params[0] = 0x00    # leave p3 unchanged
+            if self._gpio_shadow is None:
+                self.read_gpio()
+            index = 0 if port == 'p3' else 1
+            value = self._gpio_shadow[index]
+            if state:
+                value |= 1 << int(pin[-1])
+            else:
+                value &= ~(1 << int(pin[-1]))
+            # Only the validated port is changed, the other keeps its levels
+            params[index] = _GPIO_VALIDATIONBIT | value & 0xFF
             self.call_function(_COMMAND_WRITEGPIO, params=params)
+        shadow = self._gpio_shadow or [None, None]
+        for index, value in enumerate(params):
+            if value & _GPIO_VALIDATIONBIT:
+                shadow[index] = value & ~_GPIO_VALIDATIONBIT
+        self._gpio_shadow = shadow if None not in shadow else None
+
+    def read_registers(self, addresses):
+        """Read many 16 bit register addresses with as few ReadRegister
+        commands as the frame size allows.  Returns the values in the order
+        of addresses."""
+        addresses = list(addresses)
+        values = bytearray()
+        for start in range(0, len(addresses), _REGISTERS_PER_READ):
+            chunk = addresses[start:start + _REGISTERS_PER_READ]
+            params = bytearray()
+            for address in chunk:
+                params += bytes([(address >> 8) & 0xFF, address & 0xFF])
+            response = self.call_function(_COMMAND_READREGISTER, response_length=len(chunk),
+                                          params=params)
+            if len(response) < len(chunk):
+                raise RuntimeError('Short response from PN532')
+            values += response[:len(chunk)]
+        return list(values)
+
+    def write_registers(self, values):
+        """Write many 16 bit registers with as few WriteRegister commands as
+        the frame size allows.  values is a dict {address: value} or an
+        iterable of (address, value) pairs, written in order."""
+        items = list(values.items() if isinstance(values, dict) else values)
+        for start in range(0, len(items), _REGISTERS_PER_WRITE):
+            params = bytearray()
+            for address, value in items[start:start + _REGISTERS_PER_WRITE]:
+                params += bytes([(address >> 8) & 0xFF, address & 0xFF, value & 0xFF])
+            self.call_function(_COMMAND_WRITEREGISTER, params=params)
+
 
     def tg_init_as_target(self,
         mode,
@@ -564,6 +1140,7 @@ class PN532:
         activated.
         :returns initiator_command: an array containing the first valid frame
         received by the PN532 once the PN532 has been initialized.
+        Returns None if no initiator activated the PN532 within timeout.
         """
         if not mifare_params:
             mifare_params = [0] * 6
@@ -587,7 +1164,11 @@ class PN532:
         else:
             params.append(0x00)
         # Try to read 64 bytes although the response length is not fixed
-        response = self.call_function(_COMMAND_TGINITASTARGET, 64, params=params, timeout=timeout)
+        try:
+            response = self.call_function(_COMMAND_TGINITASTARGET, 64, params=params,
+                                          timeout=timeout)
+        except ResponseTimeoutError:
+            return None
         if response:
             mode_activated = response[0]
             initiator_command = response[1:]
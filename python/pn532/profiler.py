@@ -0,0 +1,158 @@
+# Haptic Collection Media Player - PN532 command profiling
+#
+# The MIT License (MIT)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Profiling hooks for PN532.call_function.
+
+    profiler = pn532.add_hook(CommandProfiler())
+    ...
+    print(profiler.report())
+"""
+
+import time
+
+from .pn532 import AckTimeoutError, ResponseTimeoutError
+
+
+# pylint: disable=bad-whitespace
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, float('inf'))
+# pylint: enable=bad-whitespace
+
+
+def command_status(response, error):
+    """'ok', 'no_ack' (AckTimeoutError), 'timeout' (ResponseTimeoutError) or
+    the name of the exception a call ended with"""
+    if error is None:
+        return 'ok'
+    if isinstance(error, AckTimeoutError):
+        return 'no_ack'
+    if isinstance(error, ResponseTimeoutError):
+        return 'timeout'
+    return type(error).__name__
+
+
+class CommandHook:
+    """Base class for call_function hooks.  Override what you need."""
+
+    def before_command(self, command, param_length):
+        """Called before the command frame is written"""
+        pass
+
+    def after_command(self, command, param_length, ack_wait, response_wait,
+                      duration, response, error):
+        """Called when call_function returns or raises.  ack_wait is the time
+        from writing the frame to reading the ACK, response_wait the time from
+        the ACK to the response and duration the whole call, all in seconds.
+        response is the response bytes, None if the call raised; error is the
+        exception raised, if any: AckTimeoutError if the PN532 did not
+        acknowledge the command, ResponseTimeoutError if it did not answer in
+        time (command_status() tells these apart).
+        """
+        pass
+
+
+class DebugHook(CommandHook):
+    """One line per command, installed by PN532(debug=True)"""
+
+    def after_command(self, command, param_length, ack_wait, response_wait,
+                      duration, response, error):
+        status = command_status(response, error)
+        if status == 'ok':
+            status = '%d bytes' % len(response)
+        print('PN532 cmd 0x%02X params=%d ack=%.1fms response=%.1fms total=%.1fms %s'
+              % (command, param_length, ack_wait * 1000, response_wait * 1000,
+                 duration * 1000, status))
+
+
+class CommandProfiler(CommandHook):
+    """Per-command counters and latency histograms, plus the most recent
+    `size` calls in a fixed-size ring.  Calls that timed out waiting for
+    the ACK (no_acks) or the response (timeouts) are counted apart from
+    other errors; an empty InListPassiveTarget poll is a timeout."""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.ring = [None] * size
+        self.position = 0
+        self.stats = {}
+
+    def after_command(self, command, param_length, ack_wait, response_wait,
+                      duration, response, error):
+        stats = self.stats.get(command)
+        if stats is None:
+            stats = self.stats[command] = {
+                'calls': 0, 'no_acks': 0, 'timeouts': 0, 'errors': 0, 'total': 0.0,
+                'max': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS)}
+        stats['calls'] += 1
+        status = command_status(response, error)
+        if status == 'no_ack':
+            stats['no_acks'] += 1
+        elif status == 'timeout':
+            stats['timeouts'] += 1
+        elif status != 'ok':
+            stats['errors'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                stats['buckets'][i] += 1
+                break
+        self.ring[self.position % self.size] = (
+            time.monotonic(), command, param_length, ack_wait, response_wait, duration, status)
+        self.position += 1
+
+    def recent(self):
+        """The calls in the ring, oldest first, as (monotonic time, command,
+        param_length, ack_wait, response_wait, duration, status) tuples,
+        status as from command_status()"""
+        if self.position <= self.size:
+            return self.ring[:self.position]
+        start = self.position % self.size
+        return self.ring[start:] + self.ring[:start]
+
+    def reset(self):
+        self.ring = [None] * self.size
+        self.position = 0
+        self.stats = {}
+
+    def summary(self):
+        """{command: {'calls', 'no_acks', 'timeouts', 'errors', 'mean', 'max',
+        'buckets'}}"""
+        return {command: {'calls': stats['calls'],
+                          'no_acks': stats['no_acks'],
+                          'timeouts': stats['timeouts'],
+                          'errors': stats['errors'],
+                          'mean': stats['total'] / stats['calls'],
+                          'max': stats['max'],
+                          'buckets': dict(zip(LATENCY_BUCKETS, stats['buckets']))}
+                for command, stats in self.stats.items()}
+
+    def report(self):
+        """Human readable table of the summary"""
+        lines = ['cmd    calls  no ACK  timeouts  errors   mean ms    max ms']
+        for command, stats in sorted(self.summary().items()):
+            lines.append('0x%02X %7d %7d %9d %7d %9.2f %9.2f'
+                         % (command, stats['calls'], stats['no_acks'], stats['timeouts'],
+                            stats['errors'],
+                            stats['mean'] * 1000, stats['max'] * 1000))
+        return '\n'.join(lines)
@@ -0,0 +1,515 @@
+# Haptic Collection Media Player - PN532 simulator
+#
+# The MIT License (MIT)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module emulates a PN532 and the tags in its field without any hardware.
+The PN532_Sim transport speaks the real frame protocol (ACK, checksums,
+response frames) so the whole driver runs unchanged on any host, with
+scriptable tag placement, configurable latency and injectable faults.
+"""
+
+import random
+import time
+from .pn532 import (PN532, BusyError, RF_RETRY_FOREVER, RFCONFIG_MAX_RETRIES,
+                    RFCONFIG_TIMINGS, SERIAL_BAUD_RATES, _ACK)
+
+
+# pylint: disable=bad-whitespace
+NTAG213                        = 'ntag213'
+NTAG215                        = 'ntag215'
+NTAG216                        = 'ntag216'
+MIFARE_CLASSIC_1K              = 'mifare_classic_1k'
+ISO14443_4                     = 'iso14443_4'
+
+FIRMWARE_VERSION               = (0x32, 0x01, 0x06, 0x07)
+
+# Faults that can be injected with PN532_Sim.inject_fault()
+FAULT_NO_ACK                   = 'no_ack'        # command is ignored
+FAULT_BAD_ACK                  = 'bad_ack'       # garbage instead of the ACK
+FAULT_CHECKSUM                 = 'checksum'      # response with a bad checksum
+FAULT_NO_RESPONSE              = 'no_response'   # ACK but no response
+FAULT_SYNTAX_ERROR             = 'syntax_error'  # PN532 error frame
+
+_SYNTAX_ERROR_FRAME            = b'\x00\x00\xFF\x01\xFF\x7F\x81\x00'
+# Returned by a command handler to answer with the syntax error frame
+_SYNTAX_ERROR                  = object()
+
+# Number of 4 byte pages and capability container size byte per NTAG type
+_NTAG_LAYOUT = {
+    NTAG213: (45, 0x12),
+    NTAG215: (135, 0x3E),
+    NTAG216: (231, 0x6D),
+}
+# pylint: enable=bad-whitespace
+
+
+class SimTag:
+    """A tag in the simulated RF field, with its own memory.
+
+    NTAG memory is a bytearray of 4 byte pages, Mifare Classic memory a
+    bytearray of 16 byte blocks whose sector trailers hold the keys.
+    """
+
+    def __init__(self, uid, kind=NTAG215, memory=None):
+        self.uid = bytes(uid)
+        self.kind = kind
+        if kind in _NTAG_LAYOUT:
+            self.sak, self.atqa = 0x00, b'\x00\x44'
+        elif kind == MIFARE_CLASSIC_1K:
+            self.sak, self.atqa = 0x08, b'\x00\x04'
+        else:
+            self.sak, self.atqa = 0x20, b'\x03\x44'
+        self.memory = bytearray(memory) if memory is not None else self._blank_memory()
+
+    def _blank_memory(self):
+        if self.kind in _NTAG_LAYOUT:
+            pages, cc_size = _NTAG_LAYOUT[self.kind]
+            memory = bytearray(pages * 4)
+            memory[0:3] = self.uid[0:3]
+            memory[4:8] = self.uid[3:7].ljust(4, b'\x00')
+            memory[12:16] = bytes([0xE1, 0x10, cc_size, 0x00])
+            memory[16:20] = b'\x03\x00\xFE\x00'   # empty NDEF message
+            return memory
+        if self.kind == MIFARE_CLASSIC_1K:
+            memory = bytearray(64 * 16)
+            bcc = 0
+            for byte in self.uid[:4]:
+                bcc ^= byte
+            memory[0:8] = self.uid[:4] + bytes([bcc, self.sak]) + self.atqa[::-1]
+            for sector in range(16):
+                trailer = sector * 64 + 48
+                memory[trailer:trailer+16] = (b'\xFF' * 6 + b'\xFF\x07\x80\x69' + b'\xFF' * 6)
+            return memory
+        return bytearray()
+
+    def sector_keys(self, block):
+        """Key A and key B of the sector holding a Mifare Classic block"""
+        trailer = (block // 4) * 64 + 48
+        return bytes(self.memory[trailer:trailer+6]), bytes(self.memory[trailer+10:trailer+16])
+
+
+class PN532_Sim(PN532):
+    """Simulated PN532.  Tags are placed and removed with place()/remove()
+    or scripted ahead of time with schedule().  Latency is modelled from the
+    serial baud rate plus fixed command and RF times; time_scale multiplies
+    all of them (0 answers instantly).  Faults are queued with inject_fault()
+    or drawn at random with fault_rate.
+
+    baudrate is the power-up speed of the serial link; SetSerialBaudRate
+    switches it.  Frames sent while host and chip disagree on the speed, or
+    above max_baudrate (what the wiring carries), are lost.
+    """
+    def __init__(self, tags=None, baudrate=115200, command_latency=0.0005,
+                 rf_latency=0.003, time_scale=1.0, fault_rate=0.0, seed=None,
+                 max_baudrate=None, reset=None, debug=False):
+        self.debug = debug
+        self.baudrate = baudrate
+        self.max_baudrate = max_baudrate
+        self._power_up_baudrate = baudrate
+        self._host_baudrate = baudrate
+        self._next_baudrate = None
+        self.command_latency = command_latency
+        self.rf_latency = rf_latency
+        self.time_scale = time_scale
+        self.fault_rate = fault_rate
+        self._random = random.Random(seed)
+        self._faults = []
+        self._schedule = []
+        self._tag = None
+        self._output = []           # (ready_at, bytes) chunks
+        self._pending = None        # InListPassiveTarget waiting for a tag
+        self._selected = None
+        self._authenticated = None  # Mifare Classic sector
+        self.gpio = [0x3F, 0x06, 0x03]   # P3, P7, I0I1
+        self.registers = {}
+        self.rf_config = {}
+        self.command_counts = {}
+        self.frames_written = 0
+        self._gpio_init(reset=reset)
+        for tag in tags or []:
+            self.place(tag)
+        super().__init__(debug=debug, reset=reset)
+
+    # Scripting ---------------------------------------------------------------
+
+    def place(self, tag):
+        """Put a tag (SimTag) into the field, replacing any other tag"""
+        self._tag = tag
+        self._selected = None
+
+    def remove(self):
+        """Take the tag out of the field"""
+        self._tag = None
+        self._selected = None
+        self._authenticated = None
+
+    def schedule(self, delay, tag):
+        """Place tag (or remove the current one if tag is None) delay seconds
+        from now, in simulated time"""
+        self._schedule.append((time.monotonic() + delay * self.time_scale, tag))
+        self._schedule.sort(key=lambda item: item[0])
+
+    def inject_fault(self, fault, count=1):
+        """Apply fault to the next count commands"""
+        self._faults.extend([fault] * count)
+
+    @property
+    def tag(self):
+        """The tag currently in the field, after applying the schedule"""
+        now = time.monotonic()
+        while self._schedule and self._schedule[0][0] <= now:
+            _, tag = self._schedule.pop(0)
+            if tag is None:
+                self.remove()
+            else:
+                self.place(tag)
+        return self._tag
+
+    # Transport ---------------------------------------------------------------
+
+    def _gpio_init(self, **kwargs):
+        self._reset_pin = kwargs.get('reset')
+
+    def _reset(self, pin):
+        """Simulated hardware reset: drops all state"""
+        self._output = []
+        self._pending = None
+        self._selected = None
+        self._authenticated = None
+        self.rf_config = {}
+        self.baudrate = self._host_baudrate = self._power_up_baudrate
+        self._next_baudrate = None
+        self._sleep(0.1)
+
+    def _link_baudrate(self, baudrate=None):
+        """Host side speed of the simulated serial link"""
+        if baudrate is not None:
+            self._host_baudrate = baudrate
+        return self._host_baudrate
+
+    def _wakeup(self):
+        """Nothing to wake up in the simulator"""
+        self._output = []
+
+    def _discard_input(self):
+        """Drop response bytes that have already arrived"""
+        now = time.monotonic()
+        self._output = [chunk for chunk in self._output if chunk[0] > now]
+
+    def _wait_ready(self, timeout=1):
+        """Wait for response bytes, up to `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._complete_pending()
+            now = time.monotonic()
+            if self._output and self._output[0][0] <= now:
+                return True
+            if now >= deadline:
+                return False
+            if self._output:
+                wake = min(self._output[0][0], deadline)
+            else:
+                wake = min(now + 0.005, deadline)
+            time.sleep(max(wake - now, 0))
+
+    def _read_data(self, count):
+        """Read up to count bytes that have already arrived"""
+        now = time.monotonic()
+        frame = bytearray()
+        while self._output and self._output[0][0] <= now and len(frame) < count:
+            ready_at, chunk = self._output.pop(0)
+            take = count - len(frame)
+            frame += chunk[:take]
+            if len(chunk) > take:
+                self._output.insert(0, (ready_at, chunk[take:]))
+        if not frame:
+            raise BusyError("No data read from PN532")
+        return bytes(frame)
+
+    def _write_data(self, framebytes):
+        """Receive a frame from the host and queue the ACK and response"""
+        self._output = []   # like clearing the UART FIFO
+        self._pending = None
+        self.frames_written += 1
+        if self._host_baudrate != self.baudrate or (
+                self.max_baudrate and self.baudrate > self.max_baudrate):
+            # Garbage on the wire
+            self._next_baudrate = None
+            return
+        if framebytes == _ACK:
+            # An ACK from the host aborts the current command, or confirms
+            # SetSerialBaudRate
+            if self._next_baudrate:
+                self.baudrate, self._next_baudrate = self._next_baudrate, None
+            return
+        self._next_baudrate = None
+        data = self._parse_frame(framebytes)
+        if data is None:
+            self._send(_SYNTAX_ERROR_FRAME, self._wire_time(len(framebytes)))
+            return
+
+        fault = self._next_fault()
+        if fault == FAULT_NO_ACK:
+            return
+        arrived = self._wire_time(len(framebytes))
+        if fault == FAULT_BAD_ACK:
+            self._send(b'\x00\x00\xFF\xFF\x00\x00', arrived)
+            return
+        self._send(_ACK, arrived)
+        if fault == FAULT_NO_RESPONSE:
+            return
+        if fault == FAULT_SYNTAX_ERROR:
+            self._send(_SYNTAX_ERROR_FRAME, arrived + self.command_latency)
+            return
+
+        command, params = data[1], bytes(data[2:])
+        self.command_counts[command] = self.command_counts.get(command, 0) + 1
+        handler = getattr(self, '_cmd_%02x' % command, None)
+        response = handler(params) if handler is not None else _SYNTAX_ERROR
+        if response is _SYNTAX_ERROR:
+            self._send(_SYNTAX_ERROR_FRAME, arrived + self.command_latency)
+            return
+        if response is None:
+            # Command completes later (InListPassiveTarget without a tag)
+            self._pending = (command, params, self._activation_deadline(arrived))
+            return
+        response, rf_time = response
+        self._respond(command, response, arrived + self.command_latency + rf_time,
+                      corrupt=fault == FAULT_CHECKSUM)
+
+    # Frame helpers -----------------------------------------------------------
+
+    def _sleep(self, seconds):
+        if self.time_scale:
+            time.sleep(seconds * self.time_scale)
+
+    def _wire_time(self, count):
+        # 10 bits per byte on the serial line
+        return count * 10.0 / self.baudrate
+
+    def _next_fault(self):
+        if self._faults:
+            return self._faults.pop(0)
+        if self.fault_rate and self._random.random() < self.fault_rate:
+            return self._random.choice([FAULT_NO_ACK, FAULT_BAD_ACK, FAULT_CHECKSUM,
+                                        FAULT_NO_RESPONSE])
+        return None
+
+    def _send(self, chunk, delay):
+        self._output.append((time.monotonic() + delay * self.time_scale, bytes(chunk)))
+
+    def _respond(self, command, response, delay, corrupt=False):
+        data = bytes([0xD5, (command + 1) & 0xFF]) + bytes(response)
+        length = len(data)
+        frame = bytearray(b'\x00\x00\xFF')
+        frame += bytes([length & 0xFF, (~length + 1) & 0xFF])
+        frame += data
+        frame += bytes([(~sum(data) + 1) & 0xFF, 0x00])
+        if corrupt:
+            frame[-2] ^= 0x5A
+        self._send(frame, delay + self._wire_time(len(frame)))
+
+    @staticmethod
+    def _parse_frame(framebytes):
+        offset = framebytes.find(b'\x00\xFF')
+        if offset < 0 or offset + 4 > len(framebytes):
+            return None
+        length = framebytes[offset + 2]
+        if (length + framebytes[offset + 3]) & 0xFF:
+            return None
+        data = framebytes[offset + 4:offset + 4 + length]
+        if len(data) != length or length < 2 or data[0] != 0xD4:
+            return None
+        if (sum(data) + framebytes[offset + 4 + length]) & 0xFF:
+            return None
+        return data
+
+    def _complete_pending(self):
+        if self._pending is None:
+            return
+        command, params, deadline = self._pending
+        tag = self._find_target(params)
+        if tag is not None:
+            self._pending = None
+            self._respond(command, self._select(tag), self.rf_latency)
+        elif deadline is not None and time.monotonic() >= deadline:
+            # Out of MxRtyPassiveActivation retries: no target found
+            self._pending = None
+            self._respond(command, b'\x00', 0)
+
+    def _activation_deadline(self, arrived):
+        """When a passive activation without a tag gives up: each of the
+        MxRtyPassiveActivation + 1 attempts takes rf_latency; never with
+        the default of retrying forever"""
+        retries = self.rf_config.get(RFCONFIG_MAX_RETRIES, b'\xFF\x01\xFF')[2:3]
+        if not retries or retries[0] == RF_RETRY_FOREVER:
+            return None
+        busy = arrived + self.command_latency + (retries[0] + 1) * self.rf_latency
+        return time.monotonic() + busy * self.time_scale
+
+    def _rf_timeout(self):
+        """How long the chip waits for a card that does not answer, from
+        the RFConfiguration retry timeout (default 51.2 ms)"""
+        code = self.rf_config.get(RFCONFIG_TIMINGS, b'\x00\x0B\x0A')[2:3]
+        code = code[0] if code else 0x0A
+        return 0.0001 * 2 ** (code - 1) if code else 0.0
+
+    # Commands ----------------------------------------------------------------
+
+    def _cmd_02(self, params):   # GetFirmwareVersion
+        return bytes(FIRMWARE_VERSION), 0
+
+    def _cmd_10(self, params):   # SetSerialBaudRate
+        rates = {code: rate for rate, code in SERIAL_BAUD_RATES.items()}
+        if len(params) != 1 or params[0] not in rates:
+            return _SYNTAX_ERROR
+        # Takes effect once the host acknowledges the response
+        self._next_baudrate = rates[params[0]]
+        return b'', 0
+
+    def _cmd_14(self, params):   # SAMConfiguration
+        return b'', 0
+
+    def _cmd_00(self, params):   # Diagnose
+        if params[:1] == b'\x06':
+            present = self._selected is not None and self.tag is self._selected
+            if present:
+                return b'\x00', self.rf_latency
+            return b'\x01', self._rf_timeout()
+        return b'\x00', 0
+
+    def _cmd_0c(self, params):   # ReadGPIO
+        return bytes(self.gpio), 0
+
+    def _cmd_0e(self, params):   # WriteGPIO
+        if len(params) > 0 and params[0] & 0x80:
+            self.gpio[0] = params[0] & 0x3F
+        if len(params) > 1 and params[1] & 0x80:
+            self.gpio[1] = params[1] & 0x06
+        return b'', 0
+
+    def _cmd_06(self, params):   # ReadRegister
+        values = bytearray()
+        for i in range(0, len(params) - 1, 2):
+            values.append(self.registers.get((params[i] << 8) | params[i + 1], 0))
+        return bytes(values), 0
+
+    def _cmd_08(self, params):   # WriteRegister
+        for i in range(0, len(params) - 2, 3):
+            self.registers[(params[i] << 8) | params[i + 1]] = params[i + 2]
+        return b'', 0
+
+    def _cmd_32(self, params):   # RFConfiguration
+        if params:
+            self.rf_config[params[0]] = bytes(params[1:])
+        return b'', 0
+
+    def _cmd_4a(self, params):   # InListPassiveTarget
+        tag = self._find_target(params)
+        if tag is None:
+            return None
+        return self._select(tag), self.rf_latency
+
+    def _cmd_40(self, params):   # InDataExchange
+        tag = self.tag
+        if tag is None or tag is not self._selected or len(params) < 2:
+            self._selected = None
+            return b'\x01', self._rf_timeout()   # timeout, the card did not answer
+        command, args = params[1], params[2:]
+        if command in (0x60, 0x61):
+            return self._authenticate(tag, command, args), self.rf_latency * 2
+        if command == 0x30:
+            return self._read(tag, args[0]), self.rf_latency
+        if command == 0xA2 and tag.kind in _NTAG_LAYOUT:
+            return self._write(tag, args[0], args[1:5], 4), self.rf_latency * 2
+        if command == 0xA0 and tag.kind == MIFARE_CLASSIC_1K:
+            return self._write(tag, args[0], args[1:17], 16), self.rf_latency * 2
+        return b'\x27', self.rf_latency   # command not acceptable in this context
+
+    def _cmd_42(self, params):   # InCommunicateThru
+        tag = self.tag
+        if tag is None or tag is not self._selected or not params:
+            self._selected = None
+            return b'\x01', self._rf_timeout()
+        if params[0] == 0x3A and tag.kind in _NTAG_LAYOUT and len(params) == 3:
+            return self._fast_read(tag, params[1], params[2]), self.rf_latency * 2
+        return b'\x27', self.rf_latency
+
+    # Tag behaviour -----------------------------------------------------------
+
+    def _find_target(self, params):
+        tag = self.tag
+        if tag is None:
+            return None
+        # Initiator data selects one specific UID
+        if len(params) > 2 and bytes(params[2:]) != tag.uid:
+            return None
+        return tag
+
+    def _select(self, tag):
+        self._selected = tag
+        self._authenticated = None
+        return (bytes([0x01, 0x01]) + tag.atqa + bytes([tag.sak, len(tag.uid)]) + tag.uid)
+
+    def _authenticate(self, tag, command, args):
+        if tag.kind != MIFARE_CLASSIC_1K or len(args) < 7:
+            return b'\x14'
+        block, key = args[0], bytes(args[1:7])
+        key_a, key_b = tag.sector_keys(block)
+        if key == (key_a if command == 0x60 else key_b):
+            self._authenticated = block // 4
+            return b'\x00'
+        # A failed authentication halts the card
+        self._selected = None
+        self._authenticated = None
+        return b'\x14'
+
+    def _read(self, tag, block):
+        if tag.kind in _NTAG_LAYOUT:
+            pages = len(tag.memory) // 4
+            data = bytearray()
+            for page in range(block, block + 4):
+                start = (page % pages) * 4
+                data += tag.memory[start:start + 4]
+            return b'\x00' + bytes(data)
+        if tag.kind == MIFARE_CLASSIC_1K and self._authenticated == block // 4:
+            return b'\x00' + bytes(tag.memory[block * 16:block * 16 + 16])
+        self._selected = None
+        return b'\x14'
+
+    def _fast_read(self, tag, start, end):
+        if start > end or (end + 1) * 4 > len(tag.memory):
+            # NAK: the tag stays silent until it is selected again
+            self._selected = None
+            return b'\x01'
+        return b'\x00' + bytes(tag.memory[start * 4:end * 4 + 4])
+
+    def _write(self, tag, block, data, size):
+        if len(data) != size or (block + 1) * size > len(tag.memory):
+            return b'\x27'
+        if tag.kind == MIFARE_CLASSIC_1K and self._authenticated != block // 4:
+            self._selected = None
+            return b'\x14'
+        if tag.kind in _NTAG_LAYOUT and block < 4:
+            return b'\x27'   # UID and lock pages are read only here
+        tag.memory[block * size:block * size + size] = data
+        return b'\x00'
@@ -32,7 +32,7 @@ using SPI on the Raspberry Pi.
 
 import time
 import spidev
-import RPi.GPIO as GPIO
+from .gpio import default_pins
 from .pn532 import PN532
 
 # pylint: disable=bad-whitespace
@@ -44,44 +44,45 @@ _SPI_READY                     = 0x01
 
 class SPIDevice:
     """Implements SPI device on spidev"""
-    def __init__(self, cs=None):
+    def __init__(self, cs=None, pins=None):
         self.spi = spidev.SpiDev(0, 0)
-        GPIO.setmode(GPIO.BCM)
         self._cs = cs
+        self._pins = pins
         if cs:
-            GPIO.setup(self._cs, GPIO.OUT)
-            GPIO.output(self._cs, GPIO.HIGH)
+            if self._pins is None:
+                self._pins = default_pins()
+            self._pins.setup_output(self._cs, True)
         self.spi.max_speed_hz = 1000000
         self.spi.mode = 0b10    # CPOL=1 & CPHA=0
 
     def writebytes(self, buf):
         if self._cs:
-            GPIO.output(self._cs, GPIO.LOW)
+            self._pins.output(self._cs, False)
             time.sleep(0.001);
         ret = self.spi.writebytes(list(buf))
         if self._cs:
             time.sleep(0.001);
-            GPIO.output(self._cs, GPIO.HIGH)
+            self._pins.output(self._cs, True)
         return ret
 
     def readbytes(self, count):
         if self._cs:
-            GPIO.output(self._cs, GPIO.LOW)
+            self._pins.output(self._cs, False)
             time.sleep(0.001);
         ret = bytearray(self.spi.readbytes(count))
         if self._cs:
             time.sleep(0.001);
-            GPIO.output(self._cs, GPIO.HIGH)
+            self._pins.output(self._cs, True)
         return ret
 
     def xfer(self, buf):
         if self._cs:
-            GPIO.output(self._cs, GPIO.LOW)
+            self._pins.output(self._cs, False)
             time.sleep(0.001);
         buf = bytearray(self.spi.xfer(buf))
         if self._cs:
             time.sleep(0.001);
-            GPIO.output(self._cs, GPIO.HIGH)
+            self._pins.output(self._cs, True)
         return buf
 
 
@@ -99,41 +100,45 @@ def reverse_bit(num):
 class PN532_SPI(PN532):
     """Driver for the PN532 connected over SPI. Pass in a hardware SPI device
     & chip select digitalInOut pin. Optional IRQ pin (not used), reset pin and
-    debugging output."""
-    def __init__(self, cs=None, irq=None, reset=None, debug=False):
+    debugging output. pins is the gpio.Pins driving them, gpio.default_pins()
+    if None."""
+    def __init__(self, cs=None, irq=None, reset=None, debug=False, pins=None):
         """Create an instance of the PN532 class using SPI"""
         self.debug = debug
+        self._pins = pins
         self._gpio_init(cs=cs, irq=irq, reset=reset)
-        self._spi = SPIDevice(cs)
+        self._spi = SPIDevice(cs, self._pins)
         super().__init__(debug=debug, reset=reset)
 
+    def close(self):
+        self._spi.spi.close()
+
     def _gpio_init(self, reset=None, cs=None, irq=None):
         self._cs = cs
         self._irq = irq
-        GPIO.setmode(GPIO.BCM)
+        if (reset or cs or irq) and self._pins is None:
+            self._pins = default_pins()
         if reset:
-            GPIO.setup(reset, GPIO.OUT)
-            GPIO.output(reset, True)
+            self._pins.setup_output(reset, True)
         if cs:
-            GPIO.setup(cs, GPIO.OUT)
-            GPIO.output(cs, True)
+            self._pins.setup_output(cs, True)
         if irq:
-            GPIO.setup(irq, GPIO.IN)
+            self._pins.setup_input(irq)
 
     def _reset(self, pin):
         """Perform a hardware reset toggle"""
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
-        GPIO.output(pin, False)
+        self._pins.output(pin, False)
         time.sleep(0.5)
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
 
     def _wakeup(self):
         """Send any special commands/data to wake up PN532"""
         time.sleep(1)
         if self._cs:
-            GPIO.output(self._cs, GPIO.LOW)
+            self._pins.output(self._cs, False)
         time.sleep(0.002)   # T_osc_start
         self._spi.writebytes(bytearray([0x00])) #pylint: disable=no-member
         time.sleep(1)
@@ -162,8 +167,6 @@ class PN532_SPI(PN532):
         frame = self._spi.xfer(frame) #pylint: disable=no-member
         for i, val in enumerate(frame):
             frame[i] = reverse_bit(val) # turn LSB data to MSB
-        if self.debug:
-            print("Reading: ", [hex(i) for i in frame[1:]])
         return frame[1:]
 
     def _write_data(self, framebytes):
@@ -171,7 +174,5 @@ class PN532_SPI(PN532):
         # start by making a frame with data write in front,
         # then rest of bytes, and LSBify it
         rev_frame = [reverse_bit(x) for x in bytes([_SPI_DATAWRITE]) + framebytes]
-        if self.debug:
-            print("Writing: ", [hex(i) for i in rev_frame])
         time.sleep(0.02)   # required
         self._spi.writebytes(bytes(rev_frame))
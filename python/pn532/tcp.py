@@ -0,0 +1,292 @@
+"""
+This module will let you communicate with a PN532 on another host, through
+nfc_bridge.py running next to the reader.
+
+Protocol: one JSON object per line in both directions. The host sends
+{"id": n, "op": "call", "command": c, "params": hex, "response_length": n,
+"timeout": s} to run one PN532 command, or {"id": n, "op": "reset"|"wakeup"|
+"resync"}; the bridge answers each request with {"id": n, "response": hex or
+null, "error": null or {"type", "message"}, "elapsed": s}, elapsed being the
+time the bridge spent on it. Requests carry ids, so several can be in flight
+on one connection (pipelining); the bridge runs them in order.
+
+A bridge started with a token only serves connections whose first request
+is {"id": n, "op": "auth", "token": token}; it answers any other first
+request with an error and closes the connection.
+"""
+
+import itertools
+import json
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from .pn532 import (PN532, AckError, AckTimeoutError, BusyError, ChecksumError, FrameError,
+                    ResponseTimeoutError)
+
+
+# pylint: disable=bad-whitespace
+BRIDGE_PORT         = 7532
+
+# Errors raised by the bridge's reader, raised again on this side. The
+# bridge's own I/O errors (its serial port or bus failing, or its reader
+# not open) mean the remote reader is not answering, like a timeout; errors
+# from a request the bridge could not make sense of are protocol errors.
+# Anything else is raised as a FrameError.
+REMOTE_ERRORS = {
+    'BusyError': BusyError,
+    'AckError': AckError,
+    'AckTimeoutError': AckTimeoutError,
+    'ResponseTimeoutError': ResponseTimeoutError,
+    'FrameError': FrameError,
+    'ChecksumError': ChecksumError,
+    'OSError': BusyError,
+    'IOError': BusyError,
+    'ConnectionError': BusyError,
+    'TimeoutError': BusyError,
+    'SerialException': BusyError,
+    'SerialTimeoutException': BusyError,
+    'ValueError': FrameError,
+    'TypeError': FrameError,
+    'KeyError': FrameError,
+    'IndexError': FrameError,
+    # A bridge refusing a connection without its token
+    'PermissionError': PermissionError,
+}
+
+
+class BridgeConnection:
+    """One TCP connection to a bridge. submit() sends a request and returns
+    a Future that a background thread resolves with the bridge's answer.
+    When the connection drops, all requests in flight fail with
+    ConnectionError and closed becomes True. With a token the connection
+    authenticates before it is used."""
+
+    def __init__(self, host, port=BRIDGE_PORT, connect_timeout=3.0, token=None):
+        self.address = (host, port)
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._sock = socket.create_connection(self.address, timeout=connect_timeout)
+        self._sock.settimeout(None)
+        # Requests are single small lines; do not wait to coalesce them
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=self._run, daemon=True).start()
+        if token is not None:
+            self._authenticate(token, connect_timeout)
+
+    def _authenticate(self, token, timeout):
+        try:
+            error = self.submit('auth', token=token).result(timeout).get('error')
+        except Exception as e:   # pylint: disable=broad-except
+            error = {'message': str(e) or type(e).__name__}
+        if error:
+            self.close()
+            raise ConnectionError(f'Bridge {self.address} refused the token: {error.get("message")}')
+
+    def submit(self, op, **fields):
+        future = Future()
+        with self._lock:
+            if self.closed:
+                raise ConnectionError(f'Connection to bridge {self.address} is closed')
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            line = json.dumps(dict(fields, id=request_id, op=op), separators=(',', ':')) + '\n'
+            try:
+                self._sock.sendall(line.encode('utf-8'))
+            except OSError as e:
+                self._pending.pop(request_id, None)
+                self._close(e)
+                raise ConnectionError(f'Lost bridge {self.address}: {e}') from e
+        return future
+
+    def close(self):
+        with self._lock:
+            self._close(None)
+
+    def _close(self, error):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        for future in self._pending.values():
+            future.set_exception(ConnectionError(f'Lost bridge {self.address}: {error}'))
+        self._pending.clear()
+
+    def _run(self):
+        error = 'connection closed'
+        try:
+            with self._sock.makefile('r', encoding='utf-8') as stream:
+                for line in stream:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    with self._lock:
+                        future = self._pending.pop(message.get('id'), None)
+                    if future is not None:
+                        future.set_result(message)
+        except (OSError, ValueError) as e:
+            error = e
+        with self._lock:
+            self._close(error)
+
+
+class ConnectionPool:
+    """Open bridge connections by address, shared by every PN532_TCP (and
+    thread) talking to the same bridge, so reopening a reader reuses the
+    connection. A connection that dropped is replaced on the next get(),
+    but not more often than every retry_interval seconds."""
+
+    def __init__(self, connect_timeout=3.0, retry_interval=1.0):
+        self.connect_timeout = connect_timeout
+        self.retry_interval = retry_interval
+        self._connections = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, port=BRIDGE_PORT, token=None):
+        address = (host, port)
+        with self._lock:
+            connection = self._connections.get(address)
+            if connection is not None and not connection.closed:
+                return connection
+            wait = self._failed_at.get(address, 0) + self.retry_interval - time.monotonic()
+            if wait > 0:
+                raise ConnectionError(f'Bridge {host}:{port} unreachable, retrying in {wait:.1f}s')
+            try:
+                connection = BridgeConnection(host, port, self.connect_timeout, token)
+            except OSError as e:
+                self._failed_at[address] = time.monotonic()
+                raise ConnectionError(f'Cannot connect to bridge {host}:{port}: {e}') from e
+            self._connections[address] = connection
+            return connection
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+
+
+POOL = ConnectionPool()
+
+
+class PN532_TCP(PN532):
+    """Driver for a PN532 served by nfc_bridge.py on host:port.
+
+    Commands run on the bridge's reader; everything above call_function
+    (target selection, presence checks, NTAG/Mifare helpers) runs here.
+    The reader is not reset on opening; a reset (as the watchdog does)
+    asks the bridge to reset its reader with its own reset pin.
+    token is the bridge's shared secret, if it was started with one.
+    submit() sends a command without waiting for its response, so several
+    commands cost one network round trip instead of one each.
+
+    network_time is the total time spent in transit: the round trip of
+    every request minus the time the bridge spent running it (for pipelined
+    requests, counted from the answer to the one before).
+    """
+    def __init__(self, host, port=BRIDGE_PORT, debug=False,
+                 pool=None, margin=2.0, token=None):
+        self.debug = debug
+        self.host = host
+        self.port = port
+        self.token = token
+        self.margin = margin
+        self.network_time = 0.0
+        self.requests = 0
+        self._answered_at = 0.0
+        self._pool = pool or POOL
+        super().__init__(debug=debug)
+        # The bridge knows its reset pin; any true value lets _reset be used
+        self._reset_pin = 'bridge'
+
+    def _gpio_init(self, **kwargs):
+        pass
+
+    def _request(self, op, timeout=1, **fields):
+        """Send a request and return a Future of the bridge's raw answer"""
+        sent = time.perf_counter()
+        future = self._pool.get(self.host, self.port, self.token).submit(op, timeout=timeout, **fields)
+        future.sent_at = sent
+        return future
+
+    def _result(self, future, timeout):
+        """The response bytes of an answer, raising the bridge's error"""
+        try:
+            answer = future.result(timeout + self.margin)
+        except FutureTimeout as e:
+            raise BusyError(f'No answer from bridge {self.host}:{self.port}') from e
+        # A pipelined request waits at the bridge behind the previous one;
+        # only the time since that one was answered is its own
+        now = time.perf_counter()
+        start = max(future.sent_at, self._answered_at)
+        self._answered_at = now
+        self.requests += 1
+        self.network_time += max(now - start - answer.get('elapsed', 0.0), 0.0)
+        error = answer.get('error')
+        if error:
+            name, message = error.get('type'), error.get('message')
+            error_type = REMOTE_ERRORS.get(name, FrameError)
+            if error_type.__name__ != name:
+                message = f'{name} on bridge {self.host}:{self.port}: {message}'
+            raise error_type(message)
+        response = answer.get('response')
+        return None if response is None else bytearray.fromhex(response)
+
+    def submit(self, command, response_length=0, params=None, timeout=1):
+        """Send a command without waiting; returns a Future of what
+        call_function would return"""
+        result = Future()
+        future = self._request('call', timeout=timeout, command=command,
+                               params=bytes(params or []).hex(),
+                               response_length=response_length)
+
+        def resolve(done):
+            try:
+                result.set_result(self._result(done, timeout))
+            except Exception as e:   # pylint: disable=broad-except
+                result.set_exception(e)
+        future.add_done_callback(resolve)
+        return result
+
+    def call_functions(self, calls, timeout=1):
+        """Send all commands before waiting for the first response, so the
+        whole list costs one network round trip"""
+        requests = [self._request('call', timeout=timeout, command=command,
+                                  params=bytes(params or []).hex(),
+                                  response_length=response_length)
+                    for command, params, response_length in calls]
+        return [self._result(request, timeout) for request in requests]
+
+    def _exchange(self, data, command, response_length, timeout, timing):
+        future = self._request('call', timeout=timeout, command=command,
+                               params=bytes(data[2:]).hex(),
+                               response_length=response_length)
+        if timing is not None:
+            # The bridge acknowledges nothing separately; the whole wait
+            # counts as response time
+            timing += [time.perf_counter()] * 2
+        return self._result(future, timeout)
+
+    def _control(self, op, timeout=5):
+        self._result(self._request(op, timeout=timeout), timeout)
+
+    def _reset(self, pin):
+        """Have the bridge reset its reader"""
+        self._control('reset')
+
+    def _wakeup(self):
+        """Have the bridge wake up its reader"""
+        self._control('wakeup')
+
+    def resync(self):
+        """Have the bridge abort the current command of its reader"""
+        self._control('resync')
@@ -32,8 +32,8 @@ using UART (ttyS0) on the Raspberry Pi.
 
 import time
 import serial
-import RPi.GPIO as GPIO
-from .pn532 import PN532, BusyError
+from .gpio import default_pins
+from .pn532 import PN532, BusyError, FrameParser
 
 
 # pylint: disable=bad-whitespace
@@ -43,10 +43,14 @@ BAUD_RATE           = 115200
 
 class PN532_UART(PN532):
     """Driver for the PN532 connected over UART. Pass in a hardware UART device.
-    Optional IRQ pin (not used), reset pin and debugging output. 
+    Optional IRQ pin (not used), reset pin and debugging output.  baudrate
+    is the PN532's power-up speed; use set_serial_baudrate() to go faster.
+    pins is the gpio.Pins driving reset and irq, gpio.default_pins() if None.
+    Responses are read through a FrameParser, so a frame still arriving
+    when the first bytes are seen is read once it is complete.
     """
     def __init__(self, dev=DEV_SERIAL, baudrate=BAUD_RATE,
-                irq=None, reset=None, debug=False):
+                irq=None, reset=None, debug=False, pins=None):
         """Create an instance of the PN532 class using UART
         before running __init__, you should
         1.  disable serial login shell
@@ -55,58 +59,83 @@ class PN532_UART(PN532):
         """
 
         self.debug = debug
+        self._pins = pins
         self._gpio_init(irq=irq, reset=reset)
+        self._parser = FrameParser()
+        self._frames = []
         self._uart = serial.Serial(dev, baudrate)
         if not self._uart.is_open:
             raise RuntimeError('cannot open {0}'.format(dev))
         super().__init__(debug=debug, reset=reset)
 
+    def close(self):
+        self._uart.close()
+
     def _gpio_init(self, reset=None,irq=None):
         self._irq = irq
-        GPIO.setmode(GPIO.BCM)
+        if (reset or irq) and self._pins is None:
+            self._pins = default_pins()
         if reset:
-            GPIO.setup(reset, GPIO.OUT)
-            GPIO.output(reset, True)
+            self._pins.setup_output(reset, True)
         if irq:
-            GPIO.setup(irq, GPIO.IN)
+            self._pins.setup_input(irq)
 
     def _reset(self, pin):
         """Perform a hardware reset toggle"""
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
-        GPIO.output(pin, False)
+        self._pins.output(pin, False)
         time.sleep(0.5)
-        GPIO.output(pin, True)
+        self._pins.output(pin, True)
         time.sleep(0.1)
+        # The PN532 is back at its power-up speed
+        self._link_baudrate(BAUD_RATE)
+
+    def _link_baudrate(self, baudrate=None):
+        """Speed of the serial port, reconfigured to baudrate if given"""
+        if baudrate is not None and baudrate != self._uart.baudrate:
+            self._uart.flush()   # let pending bytes leave at the old speed
+            self._uart.baudrate = baudrate
+            self._discard_input()
+        return self._uart.baudrate
+
+    def _discard_input(self):
+        self._uart.reset_input_buffer()
+        self._parser.reset()
+        self._frames.clear()
 
     def _wakeup(self):
         """Send any special commands/data to wake up PN532"""
         self._uart.write(b'\x55\x55\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00') # wake up!
         self.SAM_configuration()
 
+    def _receive(self):
+        """Parse whatever the UART has buffered; True if a frame is ready"""
+        waiting = self._uart.in_waiting
+        if waiting:
+            self._frames += self._parser.feed(self._uart.read(waiting))
+        return bool(self._frames)
+
     def _wait_ready(self, timeout=0.001):
-        """Wait for response frame, up to `timeout` seconds"""
+        """Wait for a complete response frame, up to `timeout` seconds"""
         timestamp = time.monotonic()
-        while (time.monotonic() - timestamp) < timeout:
-            if self._uart.in_waiting:
+        while True:
+            if self._receive():
                 return True
-            else:
-                time.sleep(0.05)  # lets ask again soon!
-        # Timed out!
-        return False
+            if (time.monotonic() - timestamp) >= timeout:
+                return False
+            time.sleep(0.002)  # lets ask again soon!
 
     def _read_data(self, count):
-        """Read a specified count of bytes from the PN532."""
-        frame = self._uart.read(min(self._uart.in_waiting, count))
-        if not frame:
+        """Return the next complete frame from the PN532; count is ignored,
+        frames are delimited by the parser."""
+        if not self._frames and not self._receive():
             raise BusyError("No data read from PN532")
-        if self.debug:
-            print("Reading: ", [hex(i) for i in frame])
-        else:
-            time.sleep(0.005)
-        return frame
+        return self._frames.pop(0)
 
     def _write_data(self, framebytes):
         """Write a specified count of bytes to the PN532"""
-        self._uart.read(self._uart.in_waiting)    # clear FIFO queue of UART
+        # Drop stale bytes and frames (clear FIFO queue of UART), so the
+        # next frame read answers this command
+        self._discard_input()
         self._uart.write(framebytes)
@@ -0,0 +1,171 @@
+"""
+This module will let you communicate with a PN532 RFID/NFC chip behind a
+USB-serial adapter (CH340, FTDI, CP210x, PL2303), without host GPIO.
+Reset and wake go over the adapter's modem-control lines, and readers are
+found by USB vendor/product ID, so one host can run several of them.
+"""
+
+
+import time
+import serial
+from serial.tools import list_ports
+from .pn532 import PN532, BusyError, FrameParser, _WAKEUP
+
+
+# pylint: disable=bad-whitespace
+BAUD_RATE           = 115200
+
+# (vendor id, product id) of the USB-serial bridges PN532 boards ship with
+USB_SERIAL_ADAPTERS = {
+    (0x1A86, 0x7523): 'CH340',
+    (0x1A86, 0x5523): 'CH341',
+    (0x0403, 0x6001): 'FT232R',
+    (0x0403, 0x6015): 'FT231X',
+    (0x10C4, 0xEA60): 'CP210x',
+    (0x067B, 0x2303): 'PL2303',
+}
+
+MODEM_LINES         = ('dtr', 'rts')
+
+
+def find_readers(vid=None, pid=None, serial_number=None, location=None):
+    """Serial ports of USB-serial adapters that may carry a PN532, sorted by
+    USB location (hub port path), which stays the same across reboots.
+    Without vid/pid, any adapter in USB_SERIAL_ADAPTERS matches; the other
+    arguments narrow the result to one adapter."""
+    found = []
+    for port in list_ports.comports():
+        if port.vid is None:
+            continue
+        if vid is not None or pid is not None:
+            if (vid is not None and port.vid != vid) or (pid is not None and port.pid != pid):
+                continue
+        elif (port.vid, port.pid) not in USB_SERIAL_ADAPTERS:
+            continue
+        if serial_number is not None and port.serial_number != serial_number:
+            continue
+        if location is not None and port.location != location:
+            continue
+        found.append(port)
+    return sorted(found, key=lambda port: (port.location or '', port.device))
+
+
+class PN532_USBSerial(PN532):
+    """Driver for the PN532 behind a USB-serial adapter.
+
+    dev is the serial device; if None, the first adapter find_readers()
+    returns for vid/pid/serial_number/location is used. reset names the
+    modem-control line wired to RSTPDN ('dtr' or 'rts', asserted = reset)
+    or is None when it is not wired; wake optionally names a line pulsed
+    before the HSU wake-up preamble. Responses are read through a
+    FrameParser, so a frame split across USB packets or preceded by noise
+    is still found.
+    """
+    def __init__(self, dev=None, baudrate=BAUD_RATE, reset='dtr', wake=None,
+                 vid=None, pid=None, serial_number=None, location=None, debug=False):
+        for line in (reset, wake):
+            if line is not None and line not in MODEM_LINES:
+                raise ValueError(f'Modem-control line must be one of {MODEM_LINES}, not {line!r}')
+        if dev is None:
+            ports = find_readers(vid, pid, serial_number, location)
+            if not ports:
+                raise RuntimeError('No USB-serial adapter for a PN532 found')
+            dev = ports[0].device
+        self.debug = debug
+        self.device = dev
+        self._wake_line = wake
+        self._parser = FrameParser()
+        self._frames = []
+        self._uart = serial.Serial()
+        self._uart.port = dev
+        self._uart.baudrate = baudrate
+        self._uart.timeout = 0
+        # pyserial asserts DTR and RTS on open, which would hold a PN532
+        # wired to them in reset
+        self._uart.dtr = False
+        self._uart.rts = False
+        self._uart.open()
+        super().__init__(debug=debug, reset=reset)
+
+    def close(self):
+        self._uart.close()
+
+    def _gpio_init(self, **kwargs):
+        pass
+
+    def _set_line(self, line, asserted):
+        setattr(self._uart, line, asserted)
+
+    def _reset(self, pin):
+        """Perform a hardware reset toggle on the modem-control line pin"""
+        self._set_line(pin, False)
+        time.sleep(0.1)
+        self._set_line(pin, True)
+        time.sleep(0.5)
+        self._set_line(pin, False)
+        time.sleep(0.1)
+        # The PN532 is back at its power-up speed
+        self._link_baudrate(BAUD_RATE)
+        self._discard_input()
+
+    def _link_baudrate(self, baudrate=None):
+        """Speed of the serial port, reconfigured to baudrate if given"""
+        if baudrate is not None and baudrate != self._uart.baudrate:
+            self._uart.flush()   # let pending bytes leave at the old speed
+            self._uart.baudrate = baudrate
+            self._discard_input()
+        return self._uart.baudrate
+
+    def _discard_input(self):
+        self._uart.reset_input_buffer()
+        self._parser.reset()
+        self._frames.clear()
+
+    def _wakeup(self):
+        """Send any special commands/data to wake up PN532"""
+        if self._wake_line:
+            self._set_line(self._wake_line, True)
+            time.sleep(0.01)
+            self._set_line(self._wake_line, False)
+        self._uart.write(bytes([_WAKEUP, _WAKEUP]) + bytes(12))
+        self.SAM_configuration()
+
+    def _receive(self):
+        """Parse whatever the adapter has buffered; True if a frame is ready"""
+        waiting = self._uart.in_waiting
+        if waiting:
+            self._frames += self._parser.feed(self._uart.read(waiting))
+        return bool(self._frames)
+
+    def _wait_ready(self, timeout=0.001):
+        """Wait for a complete frame, up to `timeout` seconds"""
+        timestamp = time.monotonic()
+        while True:
+            if self._receive():
+                return True
+            if (time.monotonic() - timestamp) >= timeout:
+                return False
+            # USB adapters deliver bytes in packets every 1-16 ms
+            time.sleep(0.001)
+
+    def _read_data(self, count):
+        """Return the next complete frame from the PN532; count is ignored,
+        frames are delimited by the parser."""
+        if not self._frames and not self._receive():
+            raise BusyError("No data read from PN532")
+        return self._frames.pop(0)
+
+    def _write_data(self, framebytes):
+        """Write a specified count of bytes to the PN532"""
+        # Drop stale frames, so the next one read answers this command
+        self._receive()
+        self._frames.clear()
+        self._uart.write(framebytes)
+
+
+if __name__ == '__main__':
+    # python3 -m pn532.usb lists the adapters a reader may be behind
+    for port in find_readers():
+        adapter = USB_SERIAL_ADAPTERS.get((port.vid, port.pid), 'unknown')
+        print(f'{port.device}  {port.vid:04x}:{port.pid:04x} {adapter:<7} '
+              f'serial {port.serial_number or "-"}  location {port.location or "-"}')
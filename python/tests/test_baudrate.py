@@ -0,0 +1,37 @@
+"""set_serial_baudrate negotiation and fallback against the simulator"""
+
+import pytest
+
+from pn532.sim import FIRMWARE_VERSION, PN532_Sim
+
+
+def test_switches_when_the_link_carries_the_speed():
+    reader = PN532_Sim(time_scale=0)
+    assert reader.set_serial_baudrate(921600) == 921600
+    assert reader.link_baudrate == reader.baudrate == 921600
+    assert reader.get_firmware_version() == FIRMWARE_VERSION
+
+
+def test_same_speed_sends_nothing():
+    reader = PN532_Sim(time_scale=0)
+    written = reader.frames_written
+    assert reader.set_serial_baudrate(115200) == 115200
+    assert reader.frames_written == written
+
+
+def test_falls_back_with_a_reset_when_the_link_is_too_slow():
+    reader = PN532_Sim(time_scale=0, max_baudrate=230400, reset=20)
+    assert reader.set_serial_baudrate(921600) == 115200
+    assert reader.link_baudrate == reader.baudrate == 115200
+    assert reader.get_firmware_version() == FIRMWARE_VERSION
+
+
+def test_lost_without_a_reset_line():
+    reader = PN532_Sim(time_scale=0, max_baudrate=230400)
+    with pytest.raises(RuntimeError, match='921600'):
+        reader.set_serial_baudrate(921600)
+
+
+def test_unsupported_speed_is_rejected():
+    with pytest.raises(ValueError):
+        PN532_Sim(time_scale=0).set_serial_baudrate(100000)
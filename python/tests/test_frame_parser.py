@@ -0,0 +1,53 @@
+"""FrameParser splitting a PN532 byte stream into whole frames"""
+
+from pn532.pn532 import FrameParser, _ACK
+
+
+def frame(data):
+    """Normal information frame from the PN532 (TFI D5) around `data`"""
+    body = b'\xD5' + data
+    return (b'\x00\x00\xFF' + bytes([len(body), -len(body) & 0xFF]) + body
+            + bytes([-sum(body) & 0xFF, 0x00]))
+
+
+def test_ack_and_response_in_one_read():
+    parser = FrameParser()
+    response = frame(b'\x03\x32\x01\x06\x07')
+    assert parser.feed(_ACK + response) == [_ACK, response]
+    assert parser.discarded == 0
+
+
+def test_frame_fed_one_byte_at_a_time():
+    parser = FrameParser()
+    response = frame(bytes(range(0x41, 0x41 + 40)))
+    frames = []
+    for byte in response:
+        frames += parser.feed(bytes([byte]))
+    assert frames == [response]
+
+
+def test_nack_is_recognised():
+    assert FrameParser().feed(FrameParser.NACK) == [FrameParser.NACK]
+
+
+def test_noise_before_a_frame_is_discarded_and_counted():
+    parser = FrameParser()
+    response = frame(b'\x4B\x00')
+    assert parser.feed(b'\x12\x34' + response) == [response]
+    assert parser.discarded == 2
+
+
+def test_bad_length_checksum_skips_to_the_next_frame():
+    parser = FrameParser()
+    response = frame(b'\x4B\x00')
+    assert parser.feed(b'\x00\x00\xFF\x05\x05' + response) == [response]
+    assert parser.discarded > 0
+
+
+def test_reset_drops_a_partial_frame():
+    parser = FrameParser()
+    response = frame(b'\x03\x32\x01\x06\x07')
+    assert parser.feed(response[:6]) == []
+    parser.reset()
+    assert parser.discarded == 5   # 00 FF, the length pair and the TFI
+    assert parser.feed(response) == [response]
@@ -0,0 +1,38 @@
+"""mifare_classic_read_all key order against the simulator"""
+
+from pn532.pn532 import MIFARE_DEFAULT_KEYS
+from pn532.sim import MIFARE_CLASSIC_1K, PN532_Sim, SimTag
+
+UID = b'\xDE\xAD\xBE\xEF'
+NDEF_KEY = MIFARE_DEFAULT_KEYS[2]
+IN_DATA_EXCHANGE = 0x40
+IN_LIST_PASSIVE_TARGET = 0x4A
+
+
+def exchanges(reader, dump):
+    """(InDataExchange, InListPassiveTarget) frames sent during dump()"""
+    counts = reader.command_counts
+    before = (counts.get(IN_DATA_EXCHANGE, 0), counts.get(IN_LIST_PASSIVE_TARGET, 0))
+    results = dump()
+    after = (counts.get(IN_DATA_EXCHANGE, 0), counts.get(IN_LIST_PASSIVE_TARGET, 0))
+    return results, (after[0] - before[0], after[1] - before[1])
+
+
+def test_one_sector_on_another_key_costs_nothing_on_the_next_dump():
+    tag = SimTag(UID, kind=MIFARE_CLASSIC_1K)
+    tag.memory[3 * 64 + 48:3 * 64 + 54] = NDEF_KEY
+    reader = PN532_Sim(tags=[tag], time_scale=0)
+    reader.SAM_configuration()
+    assert bytes(reader.read_passive_target(timeout=0.5)) == UID
+
+    dump = lambda: reader.mifare_classic_read_all(UID)
+    results, (frames, reselects) = exchanges(reader, dump)
+    assert [result['key'] for result in results].count(NDEF_KEY) == 1
+    assert all(result['error'] is None for result in results)
+    # Two failed keys on sector 3, each followed by a reselect; sector 4
+    # goes straight back to the default key
+    assert (frames, reselects) == (16 + 2 + 64, 2)
+
+    results, (frames, reselects) = exchanges(reader, dump)
+    assert all(result['error'] is None for result in results)
+    assert (frames, reselects) == (16 + 64, 0)
@@ -0,0 +1,49 @@
+"""ntag2xx_write_pages batching against the simulator"""
+
+import pytest
+
+from pn532.pn532 import PN532Error
+from pn532.sim import NTAG213, PN532_Sim, SimTag
+
+UID = b'\x04\x01\x02\x03\x04\x05\x06'
+
+
+@pytest.fixture
+def tag():
+    return SimTag(UID, kind=NTAG213)
+
+
+@pytest.fixture
+def reader(tag):
+    reader = PN532_Sim(tags=[tag], time_scale=0)
+    reader.SAM_configuration()
+    assert bytes(reader.read_passive_target(timeout=0.5)) == UID
+    return reader
+
+
+def page(tag, number):
+    return bytes(tag.memory[number * 4:number * 4 + 4])
+
+
+def test_data_is_padded_to_whole_pages(reader, tag):
+    assert reader.ntag2xx_write_pages(4, b'\x03\x06ABCDEF\xFE') == [4, 5, 6]
+    assert page(tag, 4) + page(tag, 5) + page(tag, 6) == b'\x03\x06ABCDEF\xFE\x00\x00\x00'
+
+
+def test_pages_that_already_match_are_skipped(reader, tag):
+    data = b'\x03\x06ABCDEF\xFE'
+    assert reader.ntag2xx_write_pages(4, data, reader.ntag2xx_fast_read(4, 6)) == [4, 5, 6]
+    writes = reader.command_counts[0x40]
+    changed = data[:8] + b'\xFF'
+    assert reader.ntag2xx_write_pages(4, changed, reader.ntag2xx_fast_read(4, 6)) == [6]
+    assert reader.command_counts[0x40] == writes + 1
+    assert reader.ntag2xx_write_pages(4, changed, reader.ntag2xx_fast_read(4, 6)) == []
+
+
+def test_header_page_is_not_written_when_a_later_page_fails(reader, tag):
+    # NTAG213 ends at page 44, so the write of page 45 is rejected
+    header = page(tag, 43)
+    with pytest.raises(PN532Error):
+        reader.ntag2xx_write_pages(43, b'HEAD' + b'TAIL' + b'LOST')
+    assert page(tag, 44) == b'TAIL'
+    assert page(tag, 43) == header
@@ -0,0 +1,56 @@
+"""CommandProfiler counting against the simulator"""
+
+import pytest
+
+from pn532.pn532 import AckTimeoutError, ChecksumError, ResponseTimeoutError
+from pn532.profiler import CommandProfiler
+from pn532.sim import FAULT_CHECKSUM, FAULT_NO_ACK, FAULT_NO_RESPONSE, PN532_Sim
+
+GET_FIRMWARE_VERSION = 0x02
+
+
+@pytest.fixture
+def reader():
+    return PN532_Sim(time_scale=0)
+
+
+@pytest.fixture
+def profiler(reader):
+    return reader.add_hook(CommandProfiler())
+
+
+def call(reader):
+    return reader.call_function(GET_FIRMWARE_VERSION, 4, timeout=0.05)
+
+
+def test_timeouts_and_errors_are_counted_apart(reader, profiler):
+    call(reader)
+    reader.inject_fault(FAULT_NO_ACK)
+    with pytest.raises(AckTimeoutError):
+        call(reader)
+    reader.inject_fault(FAULT_NO_RESPONSE)
+    with pytest.raises(ResponseTimeoutError):
+        call(reader)
+    reader.inject_fault(FAULT_CHECKSUM)
+    with pytest.raises(ChecksumError):
+        call(reader)
+
+    stats = profiler.summary()[GET_FIRMWARE_VERSION]
+    assert (stats['calls'], stats['no_acks'], stats['timeouts'], stats['errors']) == (4, 1, 1, 1)
+    assert [entry[-1] for entry in profiler.recent()] == ['ok', 'no_ack', 'timeout', 'ChecksumError']
+    assert profiler.report().splitlines()[1].split()[:5] == ['0x02', '4', '1', '1', '1']
+
+
+def test_empty_poll_is_a_timeout(reader, profiler):
+    reader.SAM_configuration()
+    assert reader.read_passive_target(timeout=0.05) is None
+    stats = profiler.summary()[0x4A]
+    assert (stats['timeouts'], stats['errors']) == (1, 0)
+
+
+def test_ring_keeps_the_most_recent_calls(reader):
+    profiler = reader.add_hook(CommandProfiler(size=3))
+    for _ in range(5):
+        call(reader)
+    assert len(profiler.recent()) == 3
+    assert profiler.summary()[GET_FIRMWARE_VERSION]['calls'] == 5
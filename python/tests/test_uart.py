@@ -0,0 +1,71 @@
+"""PN532_UART against a serial port that delivers a few bytes at a time"""
+
+import pytest
+
+from pn532 import uart
+from pn532.sim import PN532_Sim, SimTag
+
+
+class DrippingSerial:
+    """Serial port in front of a simulated PN532 whose answers arrive
+    `chunk` bytes per look at in_waiting, like a slow link does"""
+
+    def __init__(self, dev, baudrate, chunk=3):
+        self.baudrate = baudrate
+        self.is_open = True
+        self.chunk = chunk
+        self.sim = PN532_Sim(time_scale=0)
+        self._received = bytearray()
+        self._arrived = 0
+
+    @property
+    def in_waiting(self):
+        try:
+            self._received += self.sim._read_data(1024)
+        except uart.BusyError:
+            pass
+        self._arrived = min(self._arrived + self.chunk, len(self._received))
+        return self._arrived
+
+    def read(self, count):
+        data = bytes(self._received[:min(count, self._arrived)])
+        del self._received[:len(data)]
+        self._arrived -= len(data)
+        return data
+
+    def write(self, data):
+        if not data.startswith(b'\x55'):   # the HSU wake-up preamble
+            self.sim._write_data(bytes(data))
+
+    def reset_input_buffer(self):
+        self._received.clear()
+        self._arrived = 0
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    monkeypatch.setattr(uart.serial, 'Serial', DrippingSerial)
+    return uart.PN532_UART(dev='/dev/null')
+
+
+def test_frames_arriving_in_pieces_are_read_whole(reader):
+    assert reader.get_firmware_version() == (0x32, 0x01, 0x06, 0x07)
+    reader.SAM_configuration()
+    tag = SimTag(b'\x04\x01\x02\x03\x04\x05\x06')
+    reader._uart.sim.place(tag)
+    assert bytes(reader.read_passive_target(timeout=0.5)) == tag.uid
+    # 240 data bytes, 80 pieces on the wire
+    assert bytes(reader.ntag2xx_fast_read(4, 63)) == bytes(tag.memory[16:256])
+
+
+def test_resync_drops_a_partial_frame(reader):
+    reader._uart._received += b'\x00\x00\xff\x03'
+    reader._receive()
+    reader.resync()
+    assert reader.get_firmware_version() == (0x32, 0x01, 0x06, 0x07)
@@ -11,7 +11,7 @@ echo "Updating package list..."
 sudo apt update
 
 echo "Installing Python packages via apt..."
-sudo apt install -y python3-flask python3-serial python3-spidev
+sudo apt install -y python3-flask python3-waitress python3-serial python3-spidev
 
 echo "Installing RPi.GPIO if not already installed..."
 sudo apt install -y python3-rpi.gpio
@@ -30,4 +30,4 @@ echo "✅ System packages installed!"
 echo ""
 echo "You can now run the system directly with:"
 echo "  python3 nfc_web_server.py  (in one terminal)"
-echo "  python3 nfc_player.py      (in another terminal)"
+echo "  python3 nfc_reader_daemon.py      (in another terminal)"
@@ -16,30 +16,21 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Add the python directory to the path
 sys.path.append(os.path.join(BASE_DIR, 'python'))
 
+from nfc_config import load_config
+from nfc_serve import run_app
+from nfc_supervisor import ReaderSupervisor, READY, init_reader
+
+config = load_config()
+
 # Initialize Flask app
 app = Flask(__name__)
 
 # Global variables
-nfc_reader = None
 last_uid = None
 last_read_time = None
-nfc_available = False
 
-# Try to initialize NFC reader
-print("Attempting to initialize NFC reader...")
-try:
-    import RPi.GPIO as GPIO
-    from pn532 import *
-    
-    nfc_reader = PN532_UART(debug=False, reset=20)
-    ic, ver, rev, support = nfc_reader.get_firmware_version()
-    print(f'Found PN532 with firmware version: {ver}.{rev}')
-    nfc_reader.SAM_configuration()
-    nfc_available = True
-    print("NFC reader initialized successfully!")
-except Exception as e:
-    print(f"Could not initialize NFC reader: {e}")
-    nfc_available = False
+# The reader is opened in the background so the server listens right away
+supervisor = ReaderSupervisor(lambda: init_reader(config))
 
 @app.route('/')
 def index():
@@ -82,8 +73,12 @@ def index():
 @app.route('/api/status')
 def get_status():
     """Get current NFC status"""
+    reader = supervisor.reader
     return jsonify({
-        'nfc_available': nfc_available,
+        'nfc_available': supervisor.state == READY,
+        'reader': supervisor.state,
+        'error': supervisor.error,
+        'baudrate': reader.link_baudrate if reader else None,
         'last_uid': last_uid,
         'last_read_time': last_read_time
     })
@@ -93,8 +88,9 @@ def read_once():
     """Try to read NFC once"""
     global last_uid, last_read_time
     
-    if not nfc_available:
-        return jsonify({'status': 'NFC not available', 'uid': None})
+    nfc_reader = supervisor.reader
+    if nfc_reader is None:
+        return jsonify({'status': f'NFC not available ({supervisor.state})', 'uid': None})
     
     try:
         # Try to read for up to 5 seconds
@@ -116,4 +112,7 @@ if __name__ == '__main__':
     print("Access at: http://localhost:5000")
     print("This version does NOT use threading\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    print("Initializing NFC reader in the background...")
+    supervisor.start()
+    
+    run_app(app, config, config['server']['port'])
@@ -15,10 +15,10 @@ sleep 3
 
 # Start NFC player in background
 echo ""
-echo "Starting NFC Player..."
-python3 nfc_player.py &
+echo "Starting NFC Reader Daemon..."
+python3 nfc_reader_daemon.py &
 PLAYER_PID=$!
-echo "NFC Player started with PID: $PLAYER_PID"
+echo "NFC Reader Daemon started with PID: $PLAYER_PID"
 
 # Open browser
 sleep 2
@@ -33,7 +33,7 @@ echo "========================================="
 echo "SYSTEM RUNNING"
 echo "========================================="
 echo "Web Interface: http://localhost:5000"
-echo "NFC Player: Active (watching for chips)"
+echo "NFC Reader Daemon: Active (publishing tag events)"
 echo ""
 echo "To stop: Press Ctrl+C or close this terminal"
 echo "========================================="
@@ -59,10 +59,10 @@ while true; do
         cleanup
     fi
     if ! kill -0 $PLAYER_PID 2>/dev/null; then
-        echo "NFC Player stopped unexpectedly!"
+        echo "NFC Reader Daemon stopped unexpectedly!"
         # Optionally restart it
-        echo "Restarting NFC Player..."
-        python3 nfc_player.py &
+        echo "Restarting NFC Reader Daemon..."
+        python3 nfc_reader_daemon.py &
         PLAYER_PID=$!
     fi
     sleep 5
@@ -16,13 +16,22 @@ if lsof -i:8080 > /dev/null 2>&1; then
     exit 1
 fi
 
+# The reader daemon owns the NFC hardware; the display subscribes to it
+if ! pgrep -f "nfc_reader_daemon.py" > /dev/null; then
+    echo "Starting NFC reader daemon..."
+    python3 nfc_reader_daemon.py &
+fi
+
 # Start the display system
 echo "Starting display system on port 8080..."
 python3 nfc_display.py &
 DISPLAY_PID=$!
 
-# Wait for it to start
-sleep 3
+# Wait until the display server answers (it no longer blocks on the reader)
+for i in $(seq 1 50); do
+    curl -s -o /dev/null http://localhost:8080 && break
+    sleep 0.2
+done
 
 # Open in browser (fullscreen if possible)
 echo "Opening display interface..."
@@ -4,13 +4,22 @@ echo "========================================="
 echo "NFC Display System - Simple Mode"
 echo "========================================="
 
+# The reader daemon owns the NFC hardware; the display subscribes to it
+if ! pgrep -f "nfc_reader_daemon.py" > /dev/null; then
+    echo "Starting NFC reader daemon..."
+    python3 nfc_reader_daemon.py &
+fi
+
 # Start the display system
 echo "Starting display system..."
 python3 nfc_display.py &
 DISPLAY_PID=$!
 
-# Wait for startup
-sleep 2
+# Wait until the display server answers (it no longer blocks on the reader)
+for i in $(seq 1 50); do
+    curl -s -o /dev/null http://localhost:8080 && break
+    sleep 0.2
+done
 
 # Open in regular browser window
 echo "Opening in browser..."
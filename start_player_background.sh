@@ -1,29 +1,29 @@
 #!/bin/bash
 
 echo "========================================="
-echo "Starting NFC Player in Background"
+echo "Starting NFC Reader Daemon in Background"
 echo "========================================="
 
 # Check if already running
-if pgrep -f "nfc_player.py" > /dev/null; then
-    echo "NFC Player is already running!"
-    echo "PID(s): $(pgrep -f 'nfc_player.py')"
+if pgrep -f "nfc_reader_daemon.py" > /dev/null; then
+    echo "NFC Reader Daemon is already running!"
+    echo "PID(s): $(pgrep -f 'nfc_reader_daemon.py')"
     echo ""
-    echo "To stop it: pkill -f nfc_player.py"
+    echo "To stop it: pkill -f nfc_reader_daemon.py"
     exit 1
 fi
 
 # Start in background with logging
-echo "Starting NFC Player..."
-nohup python3 nfc_player.py > nfc_player.log 2>&1 &
+echo "Starting NFC Reader Daemon..."
+nohup python3 nfc_reader_daemon.py > nfc_reader_daemon.log 2>&1 &
 PLAYER_PID=$!
 
-echo "✓ NFC Player started in background"
+echo "✓ NFC Reader Daemon started in background"
 echo "  PID: $PLAYER_PID"
-echo "  Log file: nfc_player.log"
+echo "  Log file: nfc_reader_daemon.log"
 echo ""
 echo "The player will continue running even if you close this terminal."
 echo ""
-echo "To monitor logs: tail -f nfc_player.log"
-echo "To stop player: pkill -f nfc_player.py"
+echo "To monitor logs: tail -f nfc_reader_daemon.log"
+echo "To stop player: pkill -f nfc_reader_daemon.py"
 echo "To check status: ./check_status.sh"
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The application modules live in the project directory, the pn532 package
+# under python/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'python'))
+sys.path.insert(0, ROOT)
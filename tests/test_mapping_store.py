@@ -0,0 +1,51 @@
+"""MappingStore revisions and changes_since()"""
+
+import json
+
+from mapping_store import MappingStore
+
+
+def mapping(name):
+    return {'html_file': f'{name}.html', 'description': name}
+
+
+def test_changes_since_returns_only_newer_changes(tmp_path):
+    store = MappingStore(str(tmp_path / 'mappings.json'))
+    start = store.current_revision()
+    first = store.update({'A': mapping('a'), 'B': mapping('b')})
+    assert store.changes_since(start) == (first, {'A': mapping('a'), 'B': mapping('b')})
+
+    second = store.delete('A')
+    assert second > first
+    assert store.changes_since(first) == (second, {'A': None})
+    assert store.changes_since(second) == (second, {})
+
+
+def test_unchanged_update_keeps_the_revision(tmp_path):
+    store = MappingStore(str(tmp_path / 'mappings.json'))
+    revision = store.update({'A': mapping('a')})
+    assert store.update({'A': mapping('a')}) == revision
+    assert store.delete('missing') is None
+
+
+def test_client_beyond_the_changelog_has_to_reload(tmp_path):
+    store = MappingStore(str(tmp_path / 'mappings.json'), changelog_size=2)
+    start = store.current_revision()
+    for uid in 'ABC':
+        store.update({uid: mapping(uid)})
+    revision, changes = store.changes_since(start)
+    assert changes is None
+    assert store.changes_since(revision + 1) == (revision, None)
+    assert store.changes_since(revision - 1) == (revision, {'C': mapping('C')})
+
+
+def test_edits_by_other_programs_are_logged(tmp_path):
+    path = tmp_path / 'mappings.json'
+    path.write_text(json.dumps({'A': mapping('a')}))
+    store = MappingStore(str(path))
+    start = store.current_revision()
+    # A different size, so the edit is seen even within one mtime tick
+    path.write_text(json.dumps({'B': mapping('bb')}))
+    revision, changes = store.changes_since(start)
+    assert revision > start
+    assert changes == {'A': None, 'B': mapping('bb')}
@@ -0,0 +1,52 @@
+"""PresenceTracker hysteresis and its configuration"""
+
+import json
+
+from nfc_config import load_config
+from nfc_presence import PLACED, REMOVED, SWAPPED, PresenceTracker
+
+
+def test_single_missed_poll_does_not_remove_the_tag():
+    tracker = PresenceTracker(remove_reads=2, remove_time_ms=500)
+    assert tracker.update('A', now=0.0).kind == PLACED
+    assert tracker.update(None, now=0.1) is None
+    assert tracker.update('A', now=0.2) is None
+    assert tracker.current_uid == 'A'
+
+
+def test_removal_needs_both_the_reads_and_the_time():
+    tracker = PresenceTracker(remove_reads=2, remove_time_ms=500)
+    tracker.update('A', now=0.0)
+    assert tracker.update(None, now=1.0) is None
+    assert tracker.update(None, now=1.2) is None    # 2 reads, only 200 ms
+    event = tracker.update(None, now=1.5)
+    assert (event.kind, event.uid, event.previous_uid) == (REMOVED, None, 'A')
+
+
+def test_placing_needs_the_configured_reads():
+    tracker = PresenceTracker(place_reads=3)
+    assert tracker.update('A', now=0.0) is None
+    assert tracker.update('A', now=0.1) is None
+    assert tracker.update('A', now=0.2).kind == PLACED
+
+
+def test_a_flicker_restarts_the_count():
+    tracker = PresenceTracker(place_reads=2)
+    assert tracker.update('A', now=0.0) is None
+    assert tracker.update('B', now=0.1) is None
+    assert tracker.update('A', now=0.2) is None
+    assert tracker.update('A', now=0.3).kind == PLACED
+
+
+def test_another_tag_is_a_swap():
+    tracker = PresenceTracker()
+    tracker.update('A', now=0.0)
+    event = tracker.update('B', now=0.1)
+    assert (event.kind, event.uid, event.previous_uid) == (SWAPPED, 'B', 'A')
+
+
+def test_legacy_debounce_time_sets_the_remove_time(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'nfc': {'debounce_time': 1.5}}))
+    tracker = PresenceTracker.from_config(load_config(str(path))['nfc'])
+    assert tracker.remove_time == 1.5
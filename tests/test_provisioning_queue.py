@@ -0,0 +1,74 @@
+"""ProvisioningQueue events and events_since()"""
+
+import threading
+
+from nfc_provisioning import ProvisioningQueue
+
+
+def kinds(events):
+    return [event['type'] for event in events]
+
+
+def test_unmapped_tags_are_queued_only_while_active():
+    queue = ProvisioningQueue()
+    assert queue.tag('A', mapped=False) is False
+    queue.set_active(True)
+    queue.tag(None, mapped=False)
+    assert queue.tag('B', mapped=True) is False
+    assert queue.tag('C', mapped=False) is True
+    assert [entry['uid'] for entry in queue.pending] == ['C']
+
+
+def test_placing_a_queued_tag_again_counts_a_read():
+    queue = ProvisioningQueue()
+    queue.set_active(True)
+    seq = queue.snapshot()['seq']
+    queue.tag('A', mapped=False)
+    assert queue.tag('A', mapped=False) is False    # same placement
+    queue.tag(None, mapped=False)
+    queue.tag('A', mapped=False)
+    latest, events = queue.events_since(seq)
+    assert kinds(events) == ['tag', 'queued', 'tag', 'tag', 'seen']
+    assert events[-1]['reads'] == 2
+    assert latest == events[-1]['seq']
+
+
+def test_remove_publishes_only_what_was_queued():
+    queue = ProvisioningQueue()
+    queue.set_active(True)
+    queue.tag('A', mapped=False)
+    seq = queue.snapshot()['seq']
+    assert queue.remove(['A', 'B'], 'assigned') == ['A']
+    _, events = queue.events_since(seq)
+    assert [(e['type'], e['uid'], e['reason']) for e in events] == [('dequeued', 'A', 'assigned')]
+    assert queue.pending == []
+
+
+def test_events_since_times_out_with_no_events():
+    queue = ProvisioningQueue()
+    seq = queue.snapshot()['seq']
+    assert queue.events_since(seq, timeout=0.01) == (seq, [])
+
+
+def test_dropped_events_make_the_client_start_over():
+    queue = ProvisioningQueue(max_events=3)
+    queue.set_active(True)
+    for uid in 'ABCD':
+        queue.tag(uid, mapped=True)
+    latest, events = queue.events_since(0)
+    assert events is None
+    assert queue.events_since(latest + 5, timeout=0) == (latest, None)
+    assert kinds(queue.events_since(latest - 3)[1]) == ['tag', 'tag', 'tag']
+
+
+def test_long_poll_wakes_up_on_a_new_event():
+    queue = ProvisioningQueue()
+    seq = queue.snapshot()['seq']
+    timer = threading.Timer(0.05, queue.set_active, (True,))
+    timer.start()
+    try:
+        latest, events = queue.events_since(seq, timeout=5)
+    finally:
+        timer.join()
+    assert latest == seq + 1
+    assert [(e['type'], e['active']) for e in events] == [('mode', True)]
@@ -0,0 +1,50 @@
+"""ReaderWatchdog error classes and recovery escalation"""
+
+from nfc_watchdog import (BAD_ACK, CARD, CHECKSUM, FRAME, IO, REOPEN, RESET, RESYNC,
+                          TIMEOUT, WAKEUP, ReaderWatchdog, classify_error)
+from pn532.pn532 import (AckError, AckTimeoutError, ChecksumError, FrameError,
+                         PN532Error, ResponseTimeoutError)
+from pn532.sim import PN532_Sim
+
+
+class Supervisor:
+    def __init__(self, reader):
+        self.reader = reader
+        self.lost = []
+
+    def reader_lost(self, err):
+        self.lost.append(err)
+
+
+def test_errors_are_classified():
+    assert classify_error(AckTimeoutError('no ACK')) == TIMEOUT
+    assert classify_error(ResponseTimeoutError('no response')) == TIMEOUT
+    assert classify_error(PN532Error(0x01)) == TIMEOUT
+    assert classify_error(PN532Error(0x14)) == CARD
+    assert classify_error(AckError('bad ACK')) == BAD_ACK
+    assert classify_error(ChecksumError('bad checksum')) == CHECKSUM
+    assert classify_error(FrameError('bad frame')) == FRAME
+    assert classify_error(OSError('gone')) == IO
+
+
+def test_recovery_escalates_and_starts_over_after_a_reopen():
+    reader = PN532_Sim(time_scale=0, reset=20)
+    supervisor = Supervisor(reader)
+    watchdog = ReaderWatchdog(supervisor, configure=lambda reader: None)
+    error = AckTimeoutError('no ACK')
+    actions = [watchdog.record_failure(error) for _ in range(9)]
+    assert actions == [RESYNC, RESYNC, WAKEUP, WAKEUP, RESET, RESET, RESET, REOPEN, RESYNC]
+    assert supervisor.lost == [error]
+    assert watchdog.metrics()['recovery_actions'] == {RESYNC: 3, WAKEUP: 2, RESET: 3, REOPEN: 1}
+
+
+def test_an_outage_ends_with_the_next_success():
+    watchdog = ReaderWatchdog(Supervisor(PN532_Sim(time_scale=0)))
+    watchdog.record_success()
+    assert watchdog.metrics()['outages'] == 0
+    watchdog.record_failure(ChecksumError('bad checksum'))
+    watchdog.record_success()
+    metrics = watchdog.metrics()
+    assert (metrics['outages'], metrics['consecutive_failures']) == (1, 0)
+    assert metrics['errors'] == {CHECKSUM: 1}
+    assert metrics['last_error'].startswith(CHECKSUM)